@@ -3,33 +3,51 @@ import asyncio
 import hashlib
 import logging
 import re
+from functools import lru_cache
 from typing import Optional
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from app.core.config import settings
 from app.models.chat import ChatRequest, ChatResponse
 from app.services.chat_service import (
     run_chat,
     build_parallel_context,
-    needs_external_web_fallback,
     extract_founded_year_answer,
-    upgrade_low_confidence_answer,
+    record_session_turn,
+    stream_answer_with_fallback,
+    stream_external_answer,
+    uses_session_context,
+)
+from app.rag.graph import RAGState, CAPACITY_FALLBACK_ANSWER
+from app.utils.intent_engine import (
+    GREETING_RESPONSE,
+    SELF_ID_RESPONSE,
+    SERVICES_LIST,
+    SUB_SERVICE_MAP,
+    get_intent_response,
 )
-from app.rag.graph import RAGState, answer_node_streaming
-from app.utils.intent_engine import get_intent_response
 from app.utils.intent_engine import is_external_query
-import json
+from app.utils.cancellation import CancellationToken, begin_cancellation_scope
+from app.utils.deadline import Deadline, begin_deadline
+from app.utils.llm_gate import get_gate
+from app.utils.metrics import metrics, span
+from app.utils.request_timing import RequestTimings, begin_request_timings, context_bound
+from app.utils.shared_cache import TieredCache
+from app.utils.sse import coalesce_sse, final_payload, render_answer_frames, sse_event
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1", tags=["chat"])
 
-# âœ… Simple in-memory cache (max 50 entries)
-_cache: dict = {}
+# Answer cache: per-process LRU in front of the shared tier (SHARED_CACHE_URL),
+# so an answer computed by one worker is served by all of them.
 MAX_CACHE_ENTRIES = 200
+ANSWER_CACHE_TTL_SECONDS = 6 * 60 * 60
+_cache = TieredCache("answers", max_entries=MAX_CACHE_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS)
 
 # Website URL for web search
-WEBSITE_URL = "https://ritzmediaworld.com"
+WEBSITE_URL = settings.WEBSITE_URL
 CHAT_TIMEOUT_SECONDS = 30.0
 SSE_HEADERS = {
     "Cache-Control": "no-cache",
@@ -85,6 +103,18 @@ def get_cache_key(message: str, developer_context: str = "") -> str:
     return hashlib.md5(raw.encode()).hexdigest()
 
 
+async def _cache_get(key: str) -> object:
+    """Answer-cache lookup: L1 inline, the shared tier (SQLite/Redis I/O) off the event loop."""
+    cached = _cache.get_local(key)
+    if cached is None:
+        cached = await asyncio.to_thread(_cache.get_shared, key)
+    return cached
+
+
+async def _cache_set(key: str, answer: str) -> None:
+    await asyncio.to_thread(_cache.set, key, {"answer": answer})
+
+
 def _extract_answer_from_cache(cached: object) -> str:
     """
     Normalize cache payload across endpoints.
@@ -98,11 +128,66 @@ def _extract_answer_from_cache(cached: object) -> str:
     return str(cached) if cached is not None else ""
 
 
+def _is_cacheable(result: dict, answer: str, session_scoped: bool) -> bool:
+    """Only real answers built without session context are shared through the cache."""
+    return (
+        bool(result.get("has_answer"))
+        and answer != CAPACITY_FALLBACK_ANSWER
+        and not session_scoped
+        and not result.get("session_context")
+    )
+
+
+async def _cancel_on_disconnect(request: Request, token: CancellationToken) -> None:
+    # Wait on receive() itself: the non-blocking request.is_disconnected()
+    # never reports the disconnect behind the HTTP middleware in app.main.
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            token.cancel("disconnect")
+            return
+
+
+async def _run_chat_cancellable(
+    request: Request,
+    token: CancellationToken,
+    deadline: Deadline,
+    endpoint: str,
+    *args: Optional[str],
+) -> dict:
+    """
+    run_chat in an executor, bounded by the request deadline. The request's
+    token is cancelled when the deadline passes or the client disconnects, so
+    the pipeline stops instead of finishing work nobody will read.
+    """
+    loop = asyncio.get_running_loop()
+    watcher = asyncio.ensure_future(_cancel_on_disconnect(request, token))
+    try:
+        with span("rag_total", endpoint=endpoint):
+            return await asyncio.wait_for(
+                loop.run_in_executor(None, context_bound(run_chat), *args),
+                timeout=max(0.0, deadline.remaining()),
+            )
+    except asyncio.TimeoutError:
+        token.cancel("deadline")
+        raise
+    finally:
+        watcher.cancel()
+
+
 # ================= NEW REQUEST/RESPONSE MODELS =================
 class MessageRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     developer_context: Optional[str] = None
+    # Emit SSE timing events (context-ready and final breakdown).
+    include_timing: bool = False
+    # Leave the answer out of the final SSE frame when it matches the
+    # streamed chunks (the client already holds the text).
+    omit_final_answer: bool = False
+    # Instant answers (intents, pricing, cache hits) arrive as a single
+    # final frame when the client does not need simulated typing.
+    simulate_typing: bool = True
 
 
 class MessageResponse(BaseModel):
@@ -118,12 +203,16 @@ class MessageResponse(BaseModel):
 async def message_endpoint(
     req: MessageRequest,
     request: Request,
+    response: Response,
     stream: bool = False,
 ):
     """
     POST /v1/message â€” Intent detection + RAG chat
     Handles intent detection and returns structured response
     """
+    timings = begin_request_timings()
+    token = begin_cancellation_scope()
+    deadline = begin_deadline(CHAT_TIMEOUT_SECONDS)
     try:
         accept_header = (request.headers.get("accept") or "").lower()
         if stream or "text/event-stream" in accept_header:
@@ -131,6 +220,7 @@ async def message_endpoint(
         logger.info(f"ðŸ“¨ /v1/message received: {req.message[:80]}")
 
         if _is_pricing_query(req.message):
+            metrics.inc("fast_path_hits_total", rule="pricing")
             answer = _pricing_enquiry_answer()
             return MessageResponse(
                 answer=answer,
@@ -141,11 +231,13 @@ async def message_endpoint(
             )
         
         # Check if intent engine can handle it
-        intent_response = get_intent_response(req.message)
+        with span("intent"):
+            intent_response = get_intent_response(req.message)
         
         if intent_response:
             # Intent matched - return predefined response
             logger.info(f"ðŸŽ¯ Intent matched: {intent_response.get('intent')}")
+            metrics.inc("fast_path_hits_total", rule=f"intent_{intent_response.get('intent')}")
             return MessageResponse(
                 answer=intent_response["answer"],
                 intent=intent_response["intent"],
@@ -157,10 +249,14 @@ async def message_endpoint(
         logger.info(f"ðŸ”„ No intent match, routing to RAG...")
         
         # Intent type is "general" - use RAG
-        cache_key = get_cache_key(req.message, req.developer_context or "")
-        if cache_key in _cache:
+        with span("cache"):
+            cache_key = get_cache_key(req.message, req.developer_context or "")
+            session_scoped = uses_session_context(req.message, req.session_id)
+            cached = None if session_scoped else await _cache_get(cache_key)
+        if cached is not None:
             logger.info(f"âš¡ Cache hit: {req.message[:50]}")
-            answer = _extract_answer_from_cache(_cache[cache_key])
+            metrics.inc("answer_cache_requests_total", endpoint="message", result="hit")
+            answer = _extract_answer_from_cache(cached)
             return MessageResponse(
                 answer=answer,
                 intent="general",
@@ -169,11 +265,11 @@ async def message_endpoint(
                 enquiry_message=None,
             )
 
-        # Run with 12s timeout
-        loop = asyncio.get_running_loop()
-        result = await asyncio.wait_for(
-            loop.run_in_executor(None, run_chat, req.message, req.developer_context or ""),
-            timeout=CHAT_TIMEOUT_SECONDS
+        metrics.inc("answer_cache_requests_total", endpoint="message", result="session" if session_scoped else "miss")
+
+        # Run with the endpoint timeout
+        result = await _run_chat_cancellable(
+            request, token, deadline, "message", req.message, req.developer_context or "", req.session_id
         )
 
         # Extract answer from result dict
@@ -184,11 +280,10 @@ async def message_endpoint(
         
         logger.info(f"âœ… RAG result: has_answer={has_answer}, answer starts with: {answer[:100] if answer else 'None'}")
 
-        # Cache only meaningful answers, not fallback error text.
-        if has_answer:
-            if len(_cache) >= MAX_CACHE_ENTRIES:
-                del _cache[next(iter(_cache))]
-            _cache[cache_key] = {"answer": answer}
+        # Cache only meaningful answers, not fallback error text, and never
+        # answers built from one session's earlier turns.
+        if _is_cacheable(result, answer, session_scoped):
+            await _cache_set(cache_key, answer)
 
         return MessageResponse(
             answer=answer,
@@ -200,6 +295,7 @@ async def message_endpoint(
 
     except asyncio.TimeoutError:
         logger.warning(f"? Timeout: {req.message[:50]}")
+        metrics.inc("chat_timeouts_total", endpoint="message")
         return MessageResponse(
             answer=_timeout_answer(),
             intent="error",
@@ -216,43 +312,49 @@ async def message_endpoint(
             intent="error",
             show_lead_form=False,
         )
+    finally:
+        response.headers["Server-Timing"] = timings.server_timing_header()
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(req: ChatRequest) -> ChatResponse:
+async def chat_endpoint(req: ChatRequest, request: Request, response: Response) -> ChatResponse:
     """
     POST /v1/chat — Legacy endpoint (RAG only, no intent detection)
     """
+    timings = begin_request_timings()
+    token = begin_cancellation_scope()
+    deadline = begin_deadline(CHAT_TIMEOUT_SECONDS)
     try:
-        cache_key = get_cache_key(req.message)
-        if cache_key in _cache:
+        with span("cache"):
+            cache_key = get_cache_key(req.message)
+            session_scoped = uses_session_context(req.message, req.session_id)
+            cached = None if session_scoped else await _cache_get(cache_key)
+        if cached is not None:
             logger.info(f"âš¡ Cache hit: {req.message[:50]}")
-            answer = _extract_answer_from_cache(_cache[cache_key])
+            metrics.inc("answer_cache_requests_total", endpoint="chat", result="hit")
+            answer = _extract_answer_from_cache(cached)
             return ChatResponse(answer=answer)
+        metrics.inc("answer_cache_requests_total", endpoint="chat", result="session" if session_scoped else "miss")
 
-        # âœ… Run with 8s timeout (prevents hanging)
-        loop = asyncio.get_running_loop()
-        result = await asyncio.wait_for(
-            loop.run_in_executor(None, run_chat, req.message),
-            timeout=CHAT_TIMEOUT_SECONDS
+        # âœ… Run with the endpoint timeout (prevents hanging)
+        result = await _run_chat_cancellable(
+            request, token, deadline, "chat", req.message, "", req.session_id
         )
 
         # Extract answer from result dict
         answer = result.get("answer", "")
-        has_answer = bool(result.get("has_answer", False))
         if not isinstance(answer, str):
             answer = str(answer) if answer is not None else ""
 
-        # âœ… Store in cache only for successful answers.
-        if has_answer:
-            if len(_cache) >= MAX_CACHE_ENTRIES:
-                del _cache[next(iter(_cache))]
-            _cache[cache_key] = {"answer": answer}
+        # âœ… Store in cache only for successful answers outside session context.
+        if _is_cacheable(result, answer, session_scoped):
+            await _cache_set(cache_key, answer)
 
         return ChatResponse(answer=answer)
 
     except asyncio.TimeoutError:
         logger.warning(f"? Timeout: {req.message[:50]}")
+        metrics.inc("chat_timeouts_total", endpoint="chat")
         return ChatResponse(answer=_timeout_answer())
     except Exception as e:
         logger.error(f"? Endpoint error: {str(e)}")
@@ -263,6 +365,8 @@ async def chat_endpoint(req: ChatRequest) -> ChatResponse:
                 "?? info@ritzmediaworld.com"
             )
         )
+    finally:
+        response.headers["Server-Timing"] = timings.server_timing_header()
 
 
 # ================= STREAMING ENDPOINT WITH WEB SEARCH =================
@@ -295,26 +399,115 @@ def _is_brand_work_query(question: str) -> bool:
     )
 
 
-async def stream_rag_response(question: str, developer_context: str = ""):
+# Static intent answers plus the answer cache, in each render variant.
+RENDERED_ANSWER_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=RENDERED_ANSWER_CACHE_SIZE)
+def _rendered_answer(answer: str, simulate_typing: bool = True, omit_final_answer: bool = False) -> bytes:
+    """SSE bytes for an answer that is already known in full."""
+    if not simulate_typing:
+        return sse_event({"final": True, "answer": answer})
+    return render_answer_frames(_iter_word_chunks(answer), final_payload(answer, answer, omit_final_answer))
+
+
+def _instant_answer_response(answer: str, req: MessageRequest) -> Response:
+    return Response(
+        content=_rendered_answer(answer, req.simulate_typing, req.omit_final_answer),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+def _prerender_static_answers() -> None:
+    """
+    Fill _rendered_answer for the fixed intent answers. Run by the startup
+    warmup; until it has, they are rendered (and cached) on first use.
+    """
+    answers = [SERVICES_LIST, GREETING_RESPONSE, SELF_ID_RESPONSE, _pricing_enquiry_answer(), *SUB_SERVICE_MAP.values()]
+    for answer in answers:
+        for simulate_typing in (True, False):
+            for omit_final_answer in (False, True):
+                _rendered_answer(answer, simulate_typing, omit_final_answer)
+
+
+def _sse_response(events, omit_final_answer: bool = False) -> StreamingResponse:
+    return StreamingResponse(
+        coalesce_sse(events, omit_final_answer=omit_final_answer),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+async def stream_rag_response(
+    question: str,
+    developer_context: str = "",
+    include_timing: bool = False,
+    timings: Optional[RequestTimings] = None,
+    session_id: Optional[str] = None,
+):
+    """
+    Yield the RAG SSE events, optionally interleaved with timing events:
+    one before the first chunk (context-ready time) and one with the full
+    stage breakdown right before the final event.
     """
-    Generator function that yields streaming response chunks.
+    timings = begin_request_timings(timings)
+    # Closing this generator early means the client went away: cancel the
+    # request so executor work and Gemini streams stop with it.
+    token = begin_cancellation_scope()
+    # Every Gemini, page and search call below is bounded by this deadline.
+    begin_deadline(CHAT_TIMEOUT_SECONDS)
+    first_chunk_seen = False
+    completed = False
+    try:
+        async for event in _rag_stream_events(question, developer_context, timings, session_id):
+            if event.get("final") and event.get("answer"):
+                record_session_turn(session_id, question, event["answer"])
+            if include_timing:
+                if not first_chunk_seen and "chunk" in event:
+                    first_chunk_seen = True
+                    yield {"timing": {**timings.marks(), "first_chunk_ms": timings.elapsed_ms()}}
+                elif event.get("final"):
+                    yield {"timing": {**timings.marks(), **timings.breakdown()}}
+            yield event
+        completed = True
+    finally:
+        if not completed:
+            token.cancel("disconnect")
+
+
+async def _rag_stream_events(
+    question: str,
+    developer_context: str,
+    timings: RequestTimings,
+    session_id: Optional[str] = None,
+):
+    """
+    Generator function that yields streaming response events.
     Includes web search from ritzmediaworld.com
     """
     try:
         # Open the SSE stream immediately so the client doesn't wait for
         # context building before the response stream starts.
-        yield f"data: {json.dumps({'status': 'starting'})}\n\n"
+        yield {"status": "starting"}
         await asyncio.sleep(0)
 
+        if get_gate("generate").is_open():
+            logger.warning("Gemini circuit open, streaming capacity fallback")
+            yield {"final": True, "answer": CAPACITY_FALLBACK_ANSWER}
+            return
+
         loop = asyncio.get_running_loop()
         context_bundle = await loop.run_in_executor(
             None,
-            build_parallel_context,
+            context_bound(build_parallel_context),
             question,
             WEBSITE_URL,
             True,
             developer_context or "",
+            session_id,
         )
+        timings.mark("context_ready_ms")
         
         # Build initial state with web context
         state: RAGState = {
@@ -342,27 +535,18 @@ async def stream_rag_response(question: str, developer_context: str = ""):
         )
         if founded_year_answer:
             for word in _iter_word_chunks(founded_year_answer):
-                yield f"data: {json.dumps({'chunk': word})}\n\n"
-            yield f"data: {json.dumps({'final': True, 'answer': founded_year_answer})}\n\n"
+                yield {"chunk": word}
+            yield {"final": True, "answer": founded_year_answer}
             return
         
-        # For clearly external/brand queries, build answer via service
-        # and stream that directly word-by-word.
+        # Clearly external/brand queries stream through the service's web
+        # fallback chain; everything else streams from the answer node. Both
+        # switch to the fallback chain as soon as an answer starts out
+        # low-confidence.
         if is_external_query(question) or _is_brand_work_query(question):
-            loop = asyncio.get_running_loop()
-            merged_result = await loop.run_in_executor(
-                None,
-                run_chat,
-                question,
-                developer_context or "",
-            )
-            merged_answer = (merged_result.get("answer") or "").strip()
-            for word in _iter_word_chunks(merged_answer):
-                yield f"data: {json.dumps({'chunk': word})}\n\n"
-            yield f"data: {json.dumps({'final': True, 'answer': merged_answer})}\n\n"
-            return
-
-        # Non-external query: stream directly from generator.
+            answer_stream = stream_external_answer(question, context_bundle, developer_context or "")
+        else:
+            answer_stream = stream_answer_with_fallback(state, developer_context or "")
         defer_chunks = False
 
         # Stream directly from the answer generator so custom stream fields
@@ -370,7 +554,10 @@ async def stream_rag_response(question: str, developer_context: str = ""):
         pending_buffer = ""
         assembled_answer = ""
         final_sent = False
-        async for payload in answer_node_streaming(state):
+        async for payload in answer_stream:
+            if "status" in payload:
+                yield {"status": payload["status"]}
+                continue
             answer_chunk = payload.get("answer", "")
             is_chunk = bool(payload.get("is_chunk", False))
             final_answer = payload.get("final_answer", "")
@@ -378,28 +565,11 @@ async def stream_rag_response(question: str, developer_context: str = ""):
             if final_answer and not is_chunk:
                 if pending_buffer:
                     if not defer_chunks:
-                        yield f"data: {json.dumps({'chunk': pending_buffer})}\n\n"
+                        yield {"chunk": pending_buffer}
                     assembled_answer += pending_buffer
                     pending_buffer = ""
-                if needs_external_web_fallback(final_answer):
-                    logger.info("ðŸ” Low-confidence final detected, running external fallback.")
-                    loop = asyncio.get_running_loop()
-                    upgraded = await loop.run_in_executor(
-                        None,
-                        upgrade_low_confidence_answer,
-                        question,
-                        final_answer,
-                        developer_context or "",
-                        state.get("web_context", ""),
-                    )
-                    if upgraded:
-                        for word in _iter_word_chunks(upgraded):
-                            yield f"data: {json.dumps({'chunk': word})}\n\n"
-                        yield f"data: {json.dumps({'final': True, 'answer': upgraded})}\n\n"
-                        final_sent = True
-                        continue
                 logger.info("âœ… Sending final answer (%d chars)", len(final_answer))
-                yield f"data: {json.dumps({'final': True, 'answer': final_answer})}\n\n"
+                yield {"final": True, "answer": final_answer}
                 final_sent = True
                 continue
 
@@ -409,24 +579,24 @@ async def stream_rag_response(question: str, developer_context: str = ""):
                 for word_chunk in word_chunks:
                     assembled_answer += word_chunk
                     if not defer_chunks:
-                        yield f"data: {json.dumps({'chunk': word_chunk})}\n\n"
+                        yield {"chunk": word_chunk}
 
         if not final_sent:
             if pending_buffer:
                 assembled_answer += pending_buffer
                 if not defer_chunks:
-                    yield f"data: {json.dumps({'chunk': pending_buffer})}\n\n"
+                    yield {"chunk": pending_buffer}
             final_text = assembled_answer.strip()
             if final_text:
                 logger.info("âœ… Sending synthesized final answer (%d chars)", len(final_text))
-                yield f"data: {json.dumps({'final': True, 'answer': final_text})}\n\n"
+                yield {"final": True, "answer": final_text}
             else:
                 fallback = "Something went wrong. Please try again."
-                yield f"data: {json.dumps({'final': True, 'answer': fallback})}\n\n"
+                yield {"final": True, "answer": fallback}
                     
     except Exception as e:
         logger.error(f"âŒ Streaming error: {str(e)}")
-        yield f"data: {json.dumps({'error': 'Something went wrong. Please try again.'})}\n\n"
+        yield {"error": "Something went wrong. Please try again."}
 
 
 @router.post("/message/stream")
@@ -436,74 +606,55 @@ async def message_stream_endpoint(req: MessageRequest):
     Returns SSE (Server-Sent Events) stream for real-time response
     Includes web search from ritzmediaworld.com
     """
+    timings = begin_request_timings()
     try:
-        cache_key = get_cache_key(req.message, req.developer_context or "")
-        if cache_key in _cache:
-            cached_answer = _extract_answer_from_cache(_cache[cache_key])
-
-            async def cache_stream():
-                for word in _iter_word_chunks(cached_answer):
-                    yield f"data: {json.dumps({'chunk': word})}\n\n"
-                yield f"data: {json.dumps({'final': True, 'answer': cached_answer})}\n\n"
-
-            return StreamingResponse(
-                cache_stream(),
-                media_type="text/event-stream",
-                headers=SSE_HEADERS,
-            )
+        with span("cache"):
+            cache_key = get_cache_key(req.message, req.developer_context or "")
+            session_scoped = uses_session_context(req.message, req.session_id)
+            cached = None if session_scoped else await _cache_get(cache_key)
+        if cached is not None:
+            metrics.inc("answer_cache_requests_total", endpoint="stream", result="hit")
+            cached_answer = _extract_answer_from_cache(cached)
+            return _instant_answer_response(cached_answer, req)
+        metrics.inc("answer_cache_requests_total", endpoint="stream", result="session" if session_scoped else "miss")
         logger.info(f"ðŸ“¨ /v1/message/stream received: {req.message[:80]}")
 
         if _is_pricing_query(req.message):
+            metrics.inc("fast_path_hits_total", rule="pricing")
             answer = _pricing_enquiry_answer()
-
-            async def pricing_stream():
-                for word in _iter_word_chunks(answer):
-                    yield f"data: {json.dumps({'chunk': word})}\n\n"
-                yield f"data: {json.dumps({'final': True, 'answer': answer})}\n\n"
-
-            return StreamingResponse(
-                pricing_stream(),
-                media_type="text/event-stream",
-                headers=SSE_HEADERS,
-            )
+            return _instant_answer_response(answer, req)
         
         # Check intent engine first (for quick responses)
-        intent_response = get_intent_response(req.message)
+        with span("intent"):
+            intent_response = get_intent_response(req.message)
         
         if intent_response:
             # Return instant response for intents
             logger.info(f"ðŸŽ¯ Intent matched (streaming): {intent_response.get('intent')}")
+            metrics.inc("fast_path_hits_total", rule=f"intent_{intent_response.get('intent')}")
             answer = intent_response["answer"]
-            # Stream response word-by-word for consistency.
-            async def intent_stream():
-                for word in _iter_word_chunks(answer):
-                    yield f"data: {json.dumps({'chunk': word})}\n\n"
-                yield f"data: {json.dumps({'final': True, 'answer': answer})}\n\n"
-            
-            return StreamingResponse(
-                intent_stream(),
-                media_type="text/event-stream",
-                headers=SSE_HEADERS,
-            )
+            return _instant_answer_response(answer, req)
         
         # No intent match - use RAG streaming with web search
         logger.info(f"ðŸ”„ No intent match, routing to RAG streaming with web search...")
         
-        return StreamingResponse(
-            stream_rag_response(req.message, req.developer_context or ""),
-            media_type="text/event-stream",
-            headers=SSE_HEADERS,
+        return _sse_response(
+            stream_rag_response(
+                req.message,
+                req.developer_context or "",
+                include_timing=req.include_timing,
+                timings=timings,
+                session_id=req.session_id,
+            ),
+            req.omit_final_answer,
         )
         
     except Exception as e:
         logger.error(f"âŒ Stream endpoint error: {str(e)}")
         async def error_stream():
-            yield f"data: {json.dumps({'error': 'Something went wrong. Please try again.'})}\n\n"
+            yield sse_event({"error": "Something went wrong. Please try again."})
         
         return StreamingResponse(
             error_stream(),
             media_type="text/event-stream"
         )
-
-
-
@@ -2,10 +2,11 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr, Field, field_validator
 import logging
-import httpx
 import re
 from typing import Optional, List
 
+from app.services import lead_outbox
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -200,7 +201,7 @@ async def validate_lead(data: ValidationRequest):
 @router.post("")
 async def submit_lead(lead: LeadRequest):
     """
-    Forward lead submissions to RMW API endpoint
+    Queue a lead for delivery to the RMW API endpoint and acknowledge it
     Validates: Name (3+ letters), Phone (10 digits starting with 6/7/8/9), Email
     """
     try:
@@ -218,36 +219,15 @@ async def submit_lead(lead: LeadRequest):
             "resume": None
         }
         
-        logger.info(f"📤 Submitting lead: {lead.name} | {lead.phone} | {lead.email}")
-        
-        # Send POST request to RMW API
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "https://ritzmediaworld.com/api/system-settings/contact-enquiry",
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            # Check if request was successful
-            if response.status_code in [200, 201]:
-                logger.info(f"✅ Lead submitted successfully: {lead.name}")
-                return {
-                    "success": True,
-                    "message": "Thanks! Our team will reach out soon."
-                }
-            else:
-                logger.error(f"❌ RMW API Error {response.status_code}: {response.text}")
-                return {
-                    "success": False,
-                    "message": "Submission failed. Please try again."
-                }
-                
-    except httpx.TimeoutException:
-        logger.error("⏰ RMW API Timeout")
+        # Stored durably before answering; the background worker delivers
+        # it (with retries) to settings.LEAD_ENQUIRY_URL.
+        lead_id = await lead_outbox.submit_lead(payload)
+        logger.info(f"📥 Lead {lead_id} queued: {lead.name} | {lead.phone} | {lead.email}")
         return {
-            "success": False,
-            "message": "Request timeout. Please try again."
+            "success": True,
+            "message": "Thanks! Our team will reach out soon."
         }
+                
     except Exception as e:
         logger.error(f"💥 Lead submission error: {str(e)}")
         return {
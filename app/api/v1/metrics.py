@@ -0,0 +1,48 @@
+# app/api/v1/metrics.py - Prometheus metrics and rolling latency stats
+
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.lead_outbox import lead_outbox_stats
+from app.utils.metrics import metrics
+from app.utils.shared_cache import shared_backend_name
+from app.utils.web_scraper import get_scraper_cache_stats
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _refresh_runtime_gauges() -> None:
+    # Blocking: reads the lead outbox (SQLite) and may open the shared cache
+    # backend, so the async handlers run it with asyncio.to_thread.
+    for field, value in get_scraper_cache_stats().items():
+        metrics.set_gauge("scraper_cache", value, field=field)
+    metrics.set_gauge("shared_cache_backend", 1, backend=shared_backend_name())
+    outbox = lead_outbox_stats()
+    if outbox is not None:
+        metrics.set_gauge("lead_outbox_oldest_pending_seconds", outbox.pop("oldest_pending_seconds"))
+        for state, count in outbox.items():
+            metrics.set_gauge("lead_outbox_leads", count, state=state)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    GET /metrics
+    Prometheus text exposition of all counters, gauges and histograms
+    """
+    await asyncio.to_thread(_refresh_runtime_gauges)
+    return PlainTextResponse(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/v1/stats")
+async def latency_stats():
+    """
+    GET /v1/stats
+    Rolling p50/p95/p99 per stage without needing a Prometheus server
+    """
+    await asyncio.to_thread(_refresh_runtime_gauges)
+    return metrics.summary()
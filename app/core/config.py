@@ -10,6 +10,36 @@ class Settings(BaseSettings):
     CHROMA_PERSIST_DIR: str = Field(default="data/chroma_db", env="CHROMA_PERSIST_DIR")
     PDF_PATH: str = Field(default="docs/RMW.docx", env="PDF_PATH")
 
+    # Duplicate slow Gemini generations once they pass the adaptive latency
+    # percentile (bounded to a small share of calls).
+    GEMINI_HEDGING_ENABLED: bool = Field(default=True, env="GEMINI_HEDGING_ENABLED")
+
+    # RAG flow runner: "direct" (app.rag.pipeline) or "langgraph", which
+    # needs the optional langgraph package.
+    RAG_PIPELINE_ENGINE: str = Field(default="direct", env="RAG_PIPELINE_ENGINE")
+
+    # Cache tier shared by all workers behind the per-process caches:
+    # "" (off), sqlite:///path/to/cache.db or redis://host:6379/0.
+    SHARED_CACHE_URL: str = Field(default="", env="SHARED_CACHE_URL")
+
+    # Unix socket of the retrieval sidecar (python -m app.rag.retrieval_service).
+    # When set, workers query it instead of loading the FAISS index themselves.
+    RETRIEVAL_SERVICE_SOCKET: str = Field(default="", env="RETRIEVAL_SERVICE_SOCKET")
+
+    # Lead submissions are queued in this SQLite file and delivered to the
+    # contact-enquiry API in the background (app.services.lead_outbox).
+    LEAD_OUTBOX_PATH: str = Field(default="data/lead_outbox.db", env="LEAD_OUTBOX_PATH")
+
+    # Upstream overrides, used to point the app at local stand-ins
+    # (see benchmarks/). Empty GEMINI_BASE_URL keeps the SDK default.
+    GEMINI_BASE_URL: str = Field(default="", env="GEMINI_BASE_URL")
+    WEBSITE_URL: str = Field(default="https://ritzmediaworld.com", env="WEBSITE_URL")
+    DUCKDUCKGO_SEARCH_URL: str = Field(default="https://duckduckgo.com/html/", env="DUCKDUCKGO_SEARCH_URL")
+    BING_SEARCH_URL: str = Field(default="https://www.bing.com/search", env="BING_SEARCH_URL")
+    LEAD_ENQUIRY_URL: str = Field(
+        default="https://ritzmediaworld.com/api/system-settings/contact-enquiry", env="LEAD_ENQUIRY_URL"
+    )
+
     APP_ENV: str = Field(default="development", env="APP_ENV")
     DEBUG: bool = Field(default=False, env="DEBUG")
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
@@ -1,16 +1,25 @@
 # app/main.py
+import asyncio
 import traceback
 import logging
+import time
 from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.v1.chat import router as chat_router
+from app.api.v1.chat import _prerender_static_answers, router as chat_router
 from app.api.v1.leads import router as leads_router
+from app.api.v1.metrics import router as metrics_router
 from app.api.v1.ui import router as ui_router
 from app.core.config import settings
+from app.rag import prompts
+from app.rag.graph import get_rag_graph
+from app.services import chat_service
+from app.services.lead_outbox import start_lead_delivery, stop_lead_delivery
+from app.utils.metrics import metrics
+from app.utils.web_scraper import warmup_scraper
 
 # Logging
 logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
@@ -45,29 +54,50 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 def _warmup_runtime_dependencies() -> None:
     """
-    Preload heavy runtime dependencies once at startup so the first
-    real chat request does less work on the critical path.
+    Load the heavy runtime dependencies (the RAG pipeline, langchain prompts, the
+    FAISS index, the Gemini client, requests/bs4) that the app modules import
+    lazily, so the first real chat request does less work on the critical
+    path. Runs in a worker thread after startup; /healthz and instant
+    answers are served while it runs.
     """
-    try:
-        from app.rag.vectorstore import get_retriever
-
-        get_retriever(k=3)
-        log.info("Warmup complete: retriever loaded")
-    except Exception as exc:
-        log.warning("Warmup skipped for retriever: %s", exc)
-
-    try:
-        from app.utils.genai_adapter import get_genai_client
-
-        get_genai_client()
-        log.info("Warmup complete: Gemini client initialized")
-    except Exception as exc:
-        log.warning("Warmup skipped for Gemini client: %s", exc)
+    start = time.perf_counter()
+    steps = (
+        ("static answers", _prerender_static_answers),
+        ("retriever", lambda: chat_service._get_retriever_cached()),
+        ("rag graph", get_rag_graph),
+        ("prompts", lambda: prompts.STRICT_RAG_PROMPT),
+        ("Gemini client", _init_genai_client),
+        ("web scraper", warmup_scraper),
+    )
+    for name, step in steps:
+        try:
+            step()
+            log.info("Warmup complete: %s", name)
+        except Exception as exc:
+            log.warning("Warmup skipped for %s: %s", name, exc)
+    elapsed = time.perf_counter() - start
+    metrics.observe("startup_warmup_seconds", elapsed)
+    log.info("Background warmup finished in %.2fs", elapsed)
+
+
+def _init_genai_client() -> None:
+    from app.utils.genai_adapter import get_genai_client
+
+    get_genai_client()
 
 
 @app.on_event("startup")
 async def startup_warmup() -> None:
-    _warmup_runtime_dependencies()
+    # Not awaited: the server starts accepting requests immediately.
+    loop = asyncio.get_running_loop()
+    app.state.warmup = loop.run_in_executor(None, _warmup_runtime_dependencies)
+    # Deliver queued leads (including any left from a previous run).
+    start_lead_delivery()
+
+
+@app.on_event("shutdown")
+async def shutdown_lead_delivery() -> None:
+    await stop_lead_delivery()
 
 # Add middleware to catch and print ALL errors
 @app.middleware("http")
@@ -91,6 +121,9 @@ app.include_router(leads_router, prefix="/v1/submit-lead")
 # Include the UI router
 app.include_router(ui_router)
 
+# Include /metrics (Prometheus) and /v1/stats
+app.include_router(metrics_router)
+
 @app.get("/")
 async def root():
     # Serve the index.html file at the root URL
@@ -1,19 +1,33 @@
 # app/rag/graph.py
 import logging
 import re
+import time
 from functools import lru_cache
-from typing import TypedDict, List, AsyncGenerator
-
-from langgraph.graph import StateGraph, END
-from langchain_core.documents import Document
+from typing import Any, TypedDict, List, AsyncGenerator
 
+from app.rag import prompts
+from app.rag.pipeline import Node, Pipeline, record_node_stage
 from app.rag.vectorstore import get_retriever
-from app.rag.prompts import STRICT_RAG_PROMPT, WEB_RAG_PROMPT, EXTERNAL_FALLBACK_PROMPT
 from app.core.config import settings
-from app.utils.genai_adapter import GeminiChatModel
+from app.utils.cancellation import RequestCancelledError
+from app.utils.genai_adapter import GeminiChatModel, default_hedge_policy
+from app.utils.llm_gate import is_throttle_error
+from app.utils.metrics import record_stage, span
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for a single answer generation; kept below the endpoint's
+# CHAT_TIMEOUT_SECONDS so fallbacks still have time to run.
+ANSWER_GENERATION_TIMEOUT_SECONDS = 25.0
+
+# Degraded answer served while Gemini is throttling (429s or open circuit).
+CAPACITY_FALLBACK_ANSWER = (
+    "I'm temporarily at capacity 🙏 Please try again in a minute.\n\n"
+    "Or contact our team directly:\n"
+    "📞 +91-7290002168\n"
+    "📧 info@ritzmediaworld.com"
+)
+
 
 def _extract_text(content: object) -> str:
     """
@@ -59,7 +73,9 @@ def _looks_truncated(text: str) -> bool:
 
 class RAGState(TypedDict):
     question: str
-    docs: List[Document]
+    # langchain_core Documents; typed Any so LangGraph can resolve the
+    # schema without this module importing langchain at startup.
+    docs: List[Any]
     answer: str
     web_context: str
     developer_context: str
@@ -76,6 +92,7 @@ def _get_llm() -> GeminiChatModel:
         max_output_tokens=1600,
         top_p=0.95,
         top_k=40,
+        hedge_policy=default_hedge_policy(),
     )
 
 
@@ -120,14 +137,14 @@ def answer_node(state: RAGState) -> RAGState:
         # Use dedicated external fallback prompt when external context exists.
         if external_context:
             logger.info(f"🌍 Using external web context: {len(external_context)} chars")
-            messages = EXTERNAL_FALLBACK_PROMPT.format_messages(
+            messages = prompts.EXTERNAL_FALLBACK_PROMPT.format_messages(
                 external_context=external_context,
                 developer_context=developer_context,
                 question=state["question"],
             )
         elif web_context:
             logger.info(f"🌐 Using web context: {len(web_context)} chars")
-            messages = WEB_RAG_PROMPT.format_messages(
+            messages = prompts.WEB_RAG_PROMPT.format_messages(
                 context=context,
                 web_context=web_context,
                 developer_context=developer_context,
@@ -135,7 +152,7 @@ def answer_node(state: RAGState) -> RAGState:
                 question=state["question"],
             )
         else:
-            messages = STRICT_RAG_PROMPT.format_messages(
+            messages = prompts.STRICT_RAG_PROMPT.format_messages(
                 context=context,
                 developer_context=developer_context,
                 external_context=external_context,
@@ -144,7 +161,8 @@ def answer_node(state: RAGState) -> RAGState:
 
         logger.info(f"🤖 Calling Gemini for: {state['question'][:50]}")
         llm = _get_llm()
-        resp = llm.invoke(messages)
+        with span("llm"):
+            resp = llm.invoke(messages, deadline=time.monotonic() + ANSWER_GENERATION_TIMEOUT_SECONDS)
 
         # Parse response
         answer_text = _extract_text(getattr(resp, "content", resp))
@@ -166,21 +184,15 @@ def answer_node(state: RAGState) -> RAGState:
         logger.info(f"✅ Answer ready ({len(answer_text)} chars): {answer_text[:100]}")
         return {**state, "answer": answer_text}
 
+    except RequestCancelledError:
+        raise
     except Exception as e:
         error_str = str(e)
 
         # ✅ Instant quota fallback
-        if any(x in error_str for x in ["429", "RESOURCE_EXHAUSTED", "quota", "Quota"]):
+        if is_throttle_error(e):
             logger.warning("⚠️ Quota exceeded — instant fallback")
-            return {
-                **state,
-                "answer": (
-                    "I'm temporarily at capacity 🙏 Please try again in a minute.\n\n"
-                    "Or contact our team directly:\n"
-                    "📞 +91-7290002168\n"
-                    "📧 info@ritzmediaworld.com"
-                )
-            }
+            return {**state, "answer": CAPACITY_FALLBACK_ANSWER}
 
         logger.error(f"❌ LLM error: {error_str}")
         return {
@@ -215,14 +227,14 @@ async def answer_node_streaming(state: RAGState) -> AsyncGenerator[dict, None]:
         # Use dedicated external fallback prompt when external context exists.
         if external_context:
             logger.info(f"🌍 Using external web context (streaming): {len(external_context)} chars")
-            messages = EXTERNAL_FALLBACK_PROMPT.format_messages(
+            messages = prompts.EXTERNAL_FALLBACK_PROMPT.format_messages(
                 external_context=external_context,
                 developer_context=developer_context,
                 question=state["question"],
             )
         elif web_context:
             logger.info(f"🌐 Using web context (streaming): {len(web_context)} chars")
-            messages = WEB_RAG_PROMPT.format_messages(
+            messages = prompts.WEB_RAG_PROMPT.format_messages(
                 context=context,
                 web_context=web_context,
                 developer_context=developer_context,
@@ -230,7 +242,7 @@ async def answer_node_streaming(state: RAGState) -> AsyncGenerator[dict, None]:
                 question=state["question"],
             )
         else:
-            messages = STRICT_RAG_PROMPT.format_messages(
+            messages = prompts.STRICT_RAG_PROMPT.format_messages(
                 context=context,
                 developer_context=developer_context,
                 external_context=external_context,
@@ -243,12 +255,16 @@ async def answer_node_streaming(state: RAGState) -> AsyncGenerator[dict, None]:
         
         # Use astream to get streaming response
         llm = _get_llm()
-        async for chunk in llm.astream(messages):
+        llm_start = time.perf_counter()
+        async for chunk in llm.astream(messages, deadline=time.monotonic() + ANSWER_GENERATION_TIMEOUT_SECONDS):
             chunk_text = _extract_text(getattr(chunk, "content", chunk))
             
             if chunk_text:
+                if not full_answer:
+                    record_stage("llm_ttft", time.perf_counter() - llm_start)
                 full_answer += chunk_text
                 yield {"answer": chunk_text, "is_chunk": True}
+        record_stage("llm", time.perf_counter() - llm_start)
 
         full_answer = full_answer.strip()
         
@@ -265,18 +281,15 @@ async def answer_node_streaming(state: RAGState) -> AsyncGenerator[dict, None]:
         logger.info(f"✅ Streaming complete ({len(full_answer)} chars)")
         yield {"answer": "", "is_chunk": False, "final_answer": full_answer}
 
+    except RequestCancelledError:
+        raise
     except Exception as e:
         error_str = str(e)
 
         # ✅ Instant quota fallback
-        if any(x in error_str for x in ["429", "RESOURCE_EXHAUSTED", "quota", "Quota"]):
+        if is_throttle_error(e):
             logger.warning("⚠️ Quota exceeded — instant fallback")
-            fallback = (
-                "I'm temporarily at capacity 🙏 Please try again in a minute.\n\n"
-                "Or contact our team directly:\n"
-                "📞 +91-7290002168\n"
-                "📧 info@ritzmediaworld.com"
-            )
+            fallback = CAPACITY_FALLBACK_ANSWER
             yield {"answer": fallback, "is_chunk": False, "final_answer": fallback}
             return
 
@@ -295,41 +308,40 @@ def _guard_condition(state: RAGState) -> str:
     return "ok"
 
 
-# ================= GRAPH =================
+# ================= PIPELINE =================
 
-def build_rag_graph():
-    graph = StateGraph(RAGState)
+# Node order shared by both engines. retrieve is skipped when docs were
+# prepared upstream and generate when an answer is already set (a fast
+# path); the run stops after strict_guard when it rejects the question.
+_NODES = (
+    Node("retrieve", retrieve_node, skip_if=lambda state: bool(state.get("docs"))),
+    Node("strict_guard", strict_guard_node, stop_if=lambda state: _guard_condition(state) == "reject"),
+    Node("generate", answer_node, skip_if=lambda state: bool(state.get("answer"))),
+)
 
-    graph.add_node("retrieve", retrieve_node)
-    graph.add_node("strict_guard", strict_guard_node)
-    graph.add_node("generate", answer_node)
 
-    graph.set_entry_point("retrieve")
-    graph.add_edge("retrieve", "strict_guard")
-    graph.add_conditional_edges(
-        "strict_guard",
-        _guard_condition,
-        {"reject": END, "ok": "generate"},
-    )
-    graph.add_edge("generate", END)
+def build_rag_pipeline() -> Pipeline:
+    return Pipeline(_NODES)
 
-    return graph.compile()
 
+def _timed_node(node: Node):
+    def run(state: RAGState) -> RAGState:
+        start = time.perf_counter()
+        result = node.run(state)
+        record_node_stage(node.name, time.perf_counter() - start, result)
+        return result
 
-rag_graph = build_rag_graph()
+    return run
 
 
-# ================= STREAMING GRAPH =================
+def build_rag_graph():
+    """The same nodes as a LangGraph StateGraph (RAG_PIPELINE_ENGINE=langgraph)."""
+    from langgraph.graph import StateGraph, END
 
-def build_rag_graph_streaming():
-    """
-    Build a streaming version of the RAG graph.
-    """
     graph = StateGraph(RAGState)
 
-    graph.add_node("retrieve", retrieve_node)
-    graph.add_node("strict_guard", strict_guard_node)
-    graph.add_node("generate", answer_node_streaming)
+    for node in _NODES:
+        graph.add_node(node.name, _timed_node(node))
 
     graph.set_entry_point("retrieve")
     graph.add_edge("retrieve", "strict_guard")
@@ -343,4 +355,16 @@ def build_rag_graph_streaming():
     return graph.compile()
 
 
-rag_graph_streaming = build_rag_graph_streaming()
+@lru_cache(maxsize=1)
+def get_rag_graph():
+    """
+    The RAG flow runner, built on first use (or by the startup warmup): the
+    direct pipeline by default, or the compiled LangGraph when
+    RAG_PIPELINE_ENGINE=langgraph and langgraph is installed.
+    """
+    if settings.RAG_PIPELINE_ENGINE.strip().lower() == "langgraph":
+        try:
+            return build_rag_graph()
+        except ImportError as exc:
+            logger.warning("LangGraph unavailable (%s), using the direct pipeline", exc)
+    return build_rag_pipeline()
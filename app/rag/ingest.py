@@ -12,27 +12,37 @@ from langchain_community.vectorstores import FAISS
 
 from app.core.config import settings
 from app.core.logging import logger
-from app.utils.genai_adapter import GeminiEmbeddings
+from app.utils.genai_adapter import GeminiEmbeddings, register_langchain_embeddings
+from app.utils.llm_scheduler import Priority
 
-def build_vectorstore():
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+
+def load_chunks(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    """Load the source DOCX and split it the way the vector store is built."""
     logger.info("Loading document from %s", settings.PDF_PATH)
     loader = Docx2txtLoader(settings.PDF_PATH)
     docs = loader.load()
-    # ... rest unchanged
 
-    # 2. Split into smaller text chunks (better for retrieval)
+    # Split into smaller text chunks (better for retrieval)
     logger.info("Splitting document into chunks")
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
     )
-    chunks = splitter.split_documents(docs)
+    return splitter.split_documents(docs)
+
+
+def build_vectorstore():
+    chunks = load_chunks()
 
-    # 3. Create embeddings for each chunk
+    # Create embeddings for each chunk
     logger.info("Creating embeddings")
-    embeddings = GeminiEmbeddings(model="models/gemini-embedding-001")
+    register_langchain_embeddings()
+    embeddings = GeminiEmbeddings(model="models/gemini-embedding-001", priority=Priority.BACKGROUND)
 
-    # 4. Store in FAISS and persist to disk
+    # Store in FAISS and persist to disk
     logger.info("Building FAISS vector store in %s", settings.CHROMA_PERSIST_DIR)
     vectordb = FAISS.from_documents(
         chunks,
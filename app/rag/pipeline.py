@@ -0,0 +1,55 @@
+"""
+Minimal in-process runner for the RAG flow.
+
+The flow is a straight line of node functions (state dict in, state dict
+out) with two kinds of short-circuit: a node is skipped when its `skip_if`
+predicate holds on the incoming state, and the run ends early when a
+node's `stop_if` holds on its output. Each executed node is timed and
+passed to the pipeline's hooks; the default hook records it as the
+`node_<name>` stage (stage_duration_seconds and the request's timings).
+
+It runs the same node functions as the LangGraph build in app.rag.graph,
+without the graph framework's per-invoke channel and checkpoint machinery.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from app.utils.metrics import metrics, record_stage
+
+State = dict[str, Any]
+NodeHook = Callable[[str, float, State], None]
+
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    run: Callable[[State], State]
+    skip_if: Optional[Callable[[State], bool]] = None
+    stop_if: Optional[Callable[[State], bool]] = None
+
+
+def record_node_stage(name: str, seconds: float, state: State) -> None:
+    record_stage(f"node_{name}", seconds)
+
+
+class Pipeline:
+    def __init__(self, nodes: Sequence[Node], hooks: Sequence[NodeHook] = (record_node_stage,)) -> None:
+        self.nodes = tuple(nodes)
+        self.hooks = tuple(hooks)
+
+    def invoke(self, state: State) -> State:
+        """Run the nodes in order on a shallow copy of `state` and return the final state."""
+        state = dict(state)
+        for node in self.nodes:
+            if node.skip_if is not None and node.skip_if(state):
+                metrics.inc("pipeline_nodes_skipped_total", node=node.name)
+                continue
+            start = time.perf_counter()
+            state = node.run(state)
+            elapsed = time.perf_counter() - start
+            for hook in self.hooks:
+                hook(node.name, elapsed, state)
+            if node.stop_if is not None and node.stop_if(state):
+                break
+        return state
@@ -1,9 +1,16 @@
 # app/rag/prompts.py
-from langchain_core.prompts import ChatPromptTemplate
+"""
+Prompt templates for the answer node.
+
+The templates are kept as plain strings and turned into ChatPromptTemplate
+objects on first access (module __getattr__), so importing this module does
+not pull in langchain_core.prompts on the startup path.
+"""
+from typing import Any
 
 # Ultra-permissive prompt - answer everything except explicit harmful requests
-STRICT_RAG_PROMPT = ChatPromptTemplate.from_template(
-     """You are a helpful AI assistant. Answer every question directly.
+_STRICT_RAG_TEMPLATE = (
+    """You are a helpful AI assistant. Answer every question directly.
 
 ONLY refuse if user explicitly asks HOW TO:
 - Make/buy/use drugs
@@ -46,7 +53,7 @@ ANSWER:"""
 )
 
 # Prompt with web context from website search
-WEB_RAG_PROMPT = ChatPromptTemplate.from_template(
+_WEB_RAG_TEMPLATE = (
     """You are an AI assistant for Ritz Media. Answer questions using the provided context from the company website.
 
 IMPORTANT PRIORITY:
@@ -82,7 +89,7 @@ ANSWER:"""
 )
 
 
-EXTERNAL_FALLBACK_PROMPT = ChatPromptTemplate.from_template(
+_EXTERNAL_FALLBACK_TEMPLATE = (
     """You are an AI assistant for Ritz Media.
 
 You are handling an external web-search fallback because the internal company context was insufficient.
@@ -118,3 +125,20 @@ Question: {question}
 
 ANSWER:"""
 )
+
+_TEMPLATES = {
+    "STRICT_RAG_PROMPT": _STRICT_RAG_TEMPLATE,
+    "WEB_RAG_PROMPT": _WEB_RAG_TEMPLATE,
+    "EXTERNAL_FALLBACK_PROMPT": _EXTERNAL_FALLBACK_TEMPLATE,
+}
+
+
+def __getattr__(name: str) -> Any:
+    template = _TEMPLATES.get(name)
+    if template is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from langchain_core.prompts import ChatPromptTemplate
+
+    prompt = ChatPromptTemplate.from_template(template)
+    globals()[name] = prompt
+    return prompt
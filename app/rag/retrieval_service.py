@@ -0,0 +1,415 @@
+"""
+Retrieval sidecar: one local process holds the FAISS index, the docstore
+and the query-embedding cache, and serves top-k searches to every uvicorn
+worker over a Unix domain socket. With RETRIEVAL_SERVICE_SOCKET set, the
+app's retriever (app.rag.vectorstore.get_retriever) is a thin pooled client
+of this service instead of a per-worker copy of the index.
+
+Run it next to the app:
+    python -m app.rag.retrieval_service --socket /run/rmw/retrieval.sock
+    RETRIEVAL_SERVICE_SOCKET=/run/rmw/retrieval.sock uvicorn app.main:app --workers 4
+
+Hot swap: `kill -HUP <pid>` (or RetrievalClient.reload()) loads the index
+from CHROMA_PERSIST_DIR again and swaps it in once loaded; searches keep
+using the old index until then. Every response carries the index
+generation, so the workers' retrieval caches are keyed per generation and
+stop serving results from the replaced index.
+
+Wire format (big-endian), one request/response pair per frame, any
+number of frames per connection:
+
+    request   version:u8  op:u8      k:u16      body_len:u32  body
+    response  version:u8  status:u8  count:u16  body_len:u32  generation:u32  body
+
+SEARCH bodies are the UTF-8 query in, and `count` document records out,
+each `score:f32 id_len:u16 content_len:u32 meta_len:u32` followed by the
+id, page content and JSON metadata. RELOAD and STATS return a JSON object;
+an error status returns the message as the body.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.rag.vectorstore import BatchedSearch, get_vectorstore
+from app.utils.metrics import metrics, span
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+OP_SEARCH = 1
+OP_RELOAD = 2
+OP_STATS = 3
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_REQUEST = struct.Struct(">BBHI")
+_RESPONSE = struct.Struct(">BBHII")
+_RECORD = struct.Struct(">fHII")
+
+MAX_K = 50
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+SEARCH_THREADS = 8
+CLIENT_TIMEOUT_SECONDS = 10.0
+CLIENT_POOL_SIZE = 16
+# How long a client trusts the last generation it saw before asking again
+# (in the background; requests keep the last known value meanwhile).
+GENERATION_REFRESH_SECONDS = 5.0
+
+
+class RetrievalServiceError(Exception):
+    """The retrieval service could not be reached or rejected a request."""
+
+
+# ------------------------------------------------------------------ codec
+
+
+def encode_request(op: int, query: str = "", k: int = 0) -> bytes:
+    body = query.encode("utf-8")
+    return _REQUEST.pack(PROTOCOL_VERSION, op, k, len(body)) + body
+
+
+def encode_response(status: int, generation: int, count: int = 0, body: bytes = b"") -> bytes:
+    return _RESPONSE.pack(PROTOCOL_VERSION, status, count, len(body), generation) + body
+
+
+def encode_results(results: list[tuple[Any, float]]) -> bytes:
+    parts = []
+    for doc, score in results:
+        doc_id = str(getattr(doc, "id", None) or "").encode("utf-8")
+        content = doc.page_content.encode("utf-8")
+        meta = json.dumps(doc.metadata or {}, ensure_ascii=False, default=str).encode("utf-8")
+        parts.append(_RECORD.pack(float(score), len(doc_id), len(content), len(meta)))
+        parts.extend((doc_id, content, meta))
+    return b"".join(parts)
+
+
+def decode_results(body: bytes, count: int) -> list[tuple[Any, float]]:
+    from langchain_core.documents import Document
+
+    view = memoryview(body)
+    offset = 0
+    results = []
+    for _ in range(count):
+        score, id_len, content_len, meta_len = _RECORD.unpack_from(view, offset)
+        offset += _RECORD.size
+        doc_id = bytes(view[offset:offset + id_len]).decode("utf-8")
+        offset += id_len
+        content = bytes(view[offset:offset + content_len]).decode("utf-8")
+        offset += content_len
+        meta = json.loads(bytes(view[offset:offset + meta_len]))
+        offset += meta_len
+        results.append((Document(page_content=content, metadata=meta, id=doc_id or None), score))
+    return results
+
+
+# ----------------------------------------------------------------- server
+
+
+class RetrievalServer:
+    """Serves searches on one vector store; `reload()` swaps in a fresh copy."""
+
+    def __init__(self, socket_path: str, loader: Optional[Callable[[], Any]] = None, threads: int = SEARCH_THREADS):
+        self.socket_path = socket_path
+        self._loader = loader or get_vectorstore
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="retrieval")
+        self._reload_lock = threading.Lock()
+        # (batched search on the store, generation), replaced as a unit on reload.
+        self._current: tuple[Any, int] = (None, 0)
+        self.loaded_at = 0.0
+        self.searches = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    def reload(self) -> dict:
+        """Load the index and swap it in; in-flight searches finish on the old one."""
+        with self._reload_lock:
+            start = time.perf_counter()
+            searcher = BatchedSearch(self._loader())
+            # Monotonic across reloads and, being time-based, across restarts.
+            generation = max(self.generation + 1, int(time.time()) & 0xFFFFFFFF)
+            self._current, self.loaded_at = (searcher, generation), time.time()
+            elapsed = time.perf_counter() - start
+        logger.info("Retrieval index generation %d loaded in %.2fs", generation, elapsed)
+        return self.stats()
+
+    @property
+    def generation(self) -> int:
+        return self._current[1]
+
+    def _reload_logged(self) -> None:
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Retrieval index reload failed; still serving generation %d", self.generation)
+
+    def stats(self) -> dict:
+        searcher = self._current[0]
+        index = getattr(searcher.store, "index", None) if searcher is not None else None
+        return {
+            "generation": self.generation,
+            "index_dir": settings.CHROMA_PERSIST_DIR,
+            "vectors": int(getattr(index, "ntotal", 0)),
+            "loaded_at": self.loaded_at,
+            "searches": self.searches,
+        }
+
+    def search(self, query: str, k: int) -> tuple[int, list[tuple[Any, float]]]:
+        searcher, generation = self._current
+        results = searcher.search_with_scores(query, k)
+        self.searches += 1
+        return generation, results
+
+    async def _dispatch(self, op: int, k: int, body: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        if op == OP_SEARCH:
+            if not 0 < k <= MAX_K:
+                raise ValueError(f"k must be between 1 and {MAX_K}")
+            generation, results = await loop.run_in_executor(self._executor, self.search, body.decode("utf-8"), k)
+            return encode_response(STATUS_OK, generation, len(results), encode_results(results))
+        if op == OP_RELOAD:
+            stats = await loop.run_in_executor(self._executor, self.reload)
+            return encode_response(STATUS_OK, self.generation, body=json.dumps(stats).encode("utf-8"))
+        if op == OP_STATS:
+            return encode_response(STATUS_OK, self.generation, body=json.dumps(self.stats()).encode("utf-8"))
+        raise ValueError(f"unknown op {op}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_REQUEST.size)
+                except asyncio.IncompleteReadError:
+                    return
+                version, op, k, body_len = _REQUEST.unpack(header)
+                if version != PROTOCOL_VERSION or body_len > MAX_FRAME_BYTES:
+                    writer.write(encode_response(STATUS_ERROR, self.generation, body=b"bad request header"))
+                    await writer.drain()
+                    return
+                body = await reader.readexactly(body_len)
+                try:
+                    response = await self._dispatch(op, k, body)
+                except Exception as exc:
+                    logger.warning("Retrieval service op %d failed: %s", op, exc)
+                    response = encode_response(STATUS_ERROR, self.generation, body=str(exc).encode("utf-8"))
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self) -> None:
+        """Load the index and start listening on the socket."""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.reload)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        logger.info("Retrieval service listening on %s", self.socket_path)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        # wait_closed() also waits for connected clients (3.12+), and the
+        # workers keep pooled connections open, so drop them.
+        for writer in list(self._writers):
+            writer.close()
+
+    async def serve(self, handle_signals: bool = True) -> None:
+        """Serve until closed; SIGHUP reloads the index, SIGINT/SIGTERM stop."""
+        await self.start()
+        if handle_signals:
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGHUP, lambda: self._executor.submit(self._reload_logged))
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, self.close)
+        try:
+            await self._server.wait_closed()
+        finally:
+            self._executor.shutdown(wait=False)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+# ----------------------------------------------------------------- client
+
+
+class _Connection:
+    def __init__(self, path: str, timeout: float) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def recv_exactly(self, size: int) -> bytes:
+        buf = bytearray(size)
+        view = memoryview(buf)
+        got = 0
+        while got < size:
+            read = self.sock.recv_into(view[got:])
+            if not read:
+                raise ConnectionError("connection closed")
+            got += read
+        return bytes(buf)
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RetrievalClient:
+    """Pooled blocking client; safe to share between threads."""
+
+    def __init__(self, socket_path: str, timeout: float = CLIENT_TIMEOUT_SECONDS, pool_size: int = CLIENT_POOL_SIZE):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[_Connection]" = queue.LifoQueue(maxsize=pool_size)
+        self._generation = 0
+        self._generation_checked = 0.0
+        self._generation_lock = threading.Lock()
+
+    def _roundtrip(self, conn: _Connection, request: bytes) -> tuple[int, bytes]:
+        conn.sock.sendall(request)
+        version, status, count, body_len, generation = _RESPONSE.unpack(conn.recv_exactly(_RESPONSE.size))
+        if version != PROTOCOL_VERSION:
+            raise ConnectionError(f"unsupported protocol version {version}")
+        body = conn.recv_exactly(body_len) if body_len else b""
+        self._generation, self._generation_checked = generation, time.monotonic()
+        if status != STATUS_OK:
+            raise RetrievalServiceError(body.decode("utf-8", errors="replace"))
+        return count, body
+
+    def call(self, op: int, query: str = "", k: int = 0) -> tuple[int, bytes]:
+        request = encode_request(op, query, k)
+        # A pooled connection may have been closed by a service restart;
+        # retry once on a fresh one before giving up.
+        for attempt in range(2):
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = None
+            try:
+                if conn is None:
+                    conn = _Connection(self.socket_path, self.timeout)
+                reply = self._roundtrip(conn, request)
+            except RetrievalServiceError:
+                self._release(conn)
+                raise
+            except OSError as exc:
+                if conn is not None:
+                    conn.close()
+                if attempt:
+                    metrics.inc("retrieval_service_errors_total")
+                    raise RetrievalServiceError(f"retrieval service at {self.socket_path}: {exc}") from exc
+                continue
+            self._release(conn)
+            return reply
+        raise AssertionError("unreachable")
+
+    def _release(self, conn: _Connection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def search_with_scores(self, query: str, k: int) -> list[tuple[Any, float]]:
+        with span("retrieval_service"):
+            count, body = self.call(OP_SEARCH, query, k)
+        return decode_results(body, count)
+
+    def search(self, query: str, k: int) -> list[Any]:
+        return [doc for doc, _ in self.search_with_scores(query, k)]
+
+    def stats(self) -> dict:
+        return json.loads(self.call(OP_STATS)[1])
+
+    def reload(self) -> dict:
+        return json.loads(self.call(OP_RELOAD)[1])
+
+    @property
+    def generation(self) -> int:
+        """
+        Index generation last reported by the service. Only the first lookup
+        waits on the service; after that a stale value is refreshed on a
+        background thread and the last known one is returned meanwhile, also
+        while the service is down.
+        """
+        if not self._generation_checked:
+            self.stats()
+        elif time.monotonic() - self._generation_checked > GENERATION_REFRESH_SECONDS:
+            self._refresh_generation_in_background()
+        return self._generation
+
+    def _refresh_generation_in_background(self) -> None:
+        with self._generation_lock:
+            if time.monotonic() - self._generation_checked <= GENERATION_REFRESH_SECONDS:
+                return
+            # Claim this window so one refresh runs at a time and a failed one
+            # is retried a window later, not on every request.
+            self._generation_checked = time.monotonic()
+        threading.Thread(target=self._refresh_generation, name="retrieval-generation", daemon=True).start()
+
+    def _refresh_generation(self) -> None:
+        try:
+            self.stats()
+        except RetrievalServiceError as exc:
+            logger.warning("Retrieval generation refresh failed, keeping generation %d: %s", self._generation, exc)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RemoteRetriever:
+    """The `invoke(query) -> docs` retriever interface, served by the sidecar."""
+
+    def __init__(self, client: RetrievalClient, k: int) -> None:
+        self.client = client
+        self.k = k
+
+    def invoke(self, query: str) -> list[Any]:
+        return self.client.search(query, self.k)
+
+    @property
+    def index_tag(self) -> str:
+        return f"{self.client.socket_path}#{self.client.generation}"
+
+
+@lru_cache(maxsize=None)
+def get_retrieval_client(socket_path: str) -> RetrievalClient:
+    return RetrievalClient(socket_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=settings.RETRIEVAL_SERVICE_SOCKET or "/tmp/rmw-retrieval.sock")
+    parser.add_argument("--threads", type=int, default=SEARCH_THREADS, help="concurrent searches")
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+    asyncio.run(RetrievalServer(args.socket, threads=args.threads).serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,43 @@
-from langchain_community.vectorstores import FAISS
-from app.core.config import settings
-from app.utils.genai_adapter import GeminiEmbeddings
+import logging
 import os
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import settings
+from app.utils.batching import MicroBatcher
+from app.utils.cancellation import raise_if_cancelled
+from app.utils.genai_adapter import GeminiEmbeddings, register_langchain_embeddings
+from app.utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Concurrent searches arriving within a few milliseconds of each other
+# share one embedding call and one FAISS search.
+SEARCH_BATCH_MAX_SIZE = 16
+SEARCH_BATCH_MAX_WAIT_SECONDS = 0.004
+
+
+@lru_cache(maxsize=1)
+def _timed_faiss_class():
+    # langchain_community's FAISS (and numpy behind it) is only imported
+    # when the index is first loaded, not when this module is imported.
+    from langchain_community.vectorstores import FAISS
+
+    class TimedFAISS(FAISS):
+        """FAISS store that reports index search time separately from embedding."""
+
+        def similarity_search_with_score_by_vector(self, *args, **kwargs):
+            with span("faiss_search"):
+                return super().similarity_search_with_score_by_vector(*args, **kwargs)
+
+    return TimedFAISS
+
 
 def get_vectorstore():
     if os.path.exists(settings.CHROMA_PERSIST_DIR):
+        register_langchain_embeddings()
         local_embeddings = GeminiEmbeddings(model="models/gemini-embedding-001")
-        vectordb = FAISS.load_local(
+        vectordb = _timed_faiss_class().load_local(
             settings.CHROMA_PERSIST_DIR, local_embeddings, allow_dangerous_deserialization=True
         )
         return vectordb
@@ -16,7 +47,94 @@ def get_vectorstore():
             "Run: python -m scripts.ingest_pdf"
         )
 
+class BatchedSearch:
+    """
+    Top-k similarity search on a FAISS store, micro-batched across threads:
+    the group's uncached queries are embedded in one call and all of its
+    vectors are searched with one `index.search`.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        max_batch_size: int = SEARCH_BATCH_MAX_SIZE,
+        max_wait_seconds: float = SEARCH_BATCH_MAX_WAIT_SECONDS,
+    ) -> None:
+        self.store = store
+        self._batcher = MicroBatcher("vector_search", self._search_batch, max_batch_size, max_wait_seconds)
+
+    def search_with_scores(self, query: str, k: int) -> list[tuple[Any, float]]:
+        raise_if_cancelled("vector_search")
+        results = self._batcher.submit((query, k))
+        # The batch ran outside this request's context; honour its own token.
+        raise_if_cancelled("vector_search")
+        return results
+
+    def _embed(self, queries: list[str]) -> list[list[float]]:
+        embeddings = self.store.embedding_function
+        if hasattr(embeddings, "embed_queries"):
+            return embeddings.embed_queries(queries)
+        return [embeddings.embed_query(query) for query in queries]
+
+    def _search_batch(self, items: list[tuple[str, int]]) -> list[list[tuple[Any, float]]]:
+        import numpy as np
+
+        vectors = self._embed([query for query, _ in items])
+        results: list[list[tuple[Any, float]]] = [[] for _ in items]
+        rows = [index for index, vector in enumerate(vectors) if vector]
+        if not rows:
+            return results
+        matrix = np.asarray([vectors[index] for index in rows], dtype=np.float32)
+        if getattr(self.store, "_normalize_L2", False):
+            import faiss
+
+            faiss.normalize_L2(matrix)
+        k = max(items[index][1] for index in rows)
+        with span("faiss_search"):
+            scores, ids = self.store.index.search(matrix, k)
+        for row, index in enumerate(rows):
+            hits = results[index]
+            for score, position in zip(scores[row][:items[index][1]], ids[row][:items[index][1]]):
+                if position == -1:
+                    continue
+                doc = self.store.docstore.search(self.store.index_to_docstore_id[position])
+                if isinstance(doc, str):
+                    logger.warning("Vector %d has no document in the docstore: %s", position, doc)
+                    continue
+                hits.append((doc, float(score)))
+        return results
+
+
+def index_fingerprint(path: str) -> str:
+    """The index location plus index.faiss's mtime and size, which change on every re-ingest."""
+    try:
+        stat = os.stat(os.path.join(path, "index.faiss"))
+    except OSError:
+        return path
+    return f"{path}@{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class BatchedRetriever:
+    """
+    The `invoke(query) -> docs` retriever interface over a BatchedSearch.
+    `index_tag` identifies the index it searches, for keying cached results.
+    """
+
+    def __init__(self, search: BatchedSearch, k: int, index_tag: str = "") -> None:
+        self.search = search
+        self.k = k
+        self.index_tag = index_tag
+
+    def invoke(self, query: str) -> list[Any]:
+        return [doc for doc, _ in self.search.search_with_scores(query, self.k)]
+
+
 def get_retriever(k: int = 10):
-    vectordb = get_vectorstore()
-    return vectordb.as_retriever(search_kwargs={"k": k})
+    if settings.RETRIEVAL_SERVICE_SOCKET:
+        # The index lives in the retrieval sidecar (app.rag.retrieval_service).
+        from app.rag.retrieval_service import RemoteRetriever, get_retrieval_client
 
+        return RemoteRetriever(get_retrieval_client(settings.RETRIEVAL_SERVICE_SOCKET), k)
+    # Fingerprinted as loaded: a re-ingest does not change what this process serves.
+    index_tag = index_fingerprint(settings.CHROMA_PERSIST_DIR)
+    return BatchedRetriever(BatchedSearch(get_vectorstore()), k, index_tag)
@@ -2,33 +2,133 @@
 """
 Service layer that:
 - Receives a question string
-- Calls the LangGraph RAG workflow
+- Calls the RAG pipeline (app.rag.graph)
 - Returns answer string
 """
 
+import asyncio
+import contextlib
 import logging
 import time
 import re
 from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import Any
+from typing import Any, AsyncGenerator, Callable, Optional
 
-from app.rag.graph import rag_graph
+from app.rag.graph import get_rag_graph, answer_node_streaming, CAPACITY_FALLBACK_ANSWER
 from app.utils.web_scraper import search_website, search_web_general
 from app.rag.vectorstore import get_retriever
 from app.utils.intent_engine import is_external_query
 from app.core.config import settings
-from app.utils.genai_adapter import GeminiChatModel
+from app.utils.cancellation import RequestCancelledError, raise_if_cancelled
+from app.utils.genai_adapter import GeminiChatModel, default_hedge_policy
+from app.utils.llm_gate import get_gate
+from app.utils.metrics import metrics, span
+from app.utils.request_timing import context_bound
+from app.utils.session_store import SessionState, SessionStore, content_terms
+from app.utils.shared_cache import JSON_CODEC, Codec, TieredCache, cache_key
 
 logger = logging.getLogger(__name__)
 
 # Website URL to search
-WEBSITE_URL = "https://ritzmediaworld.com"
+WEBSITE_URL = settings.WEBSITE_URL
+
+# Per-call budget for the secondary Gemini generations in the fallback chain.
+FALLBACK_GENERATION_TIMEOUT_SECONDS = 12.0
+
+
+# Words that point back at the previous turn ("pricing for it?", "those
+# channels") and openers of an elliptical follow-up ("and for retail?").
+_ANAPHORS = frozenset("it its this that these those they them their there same above".split())
+_ELLIPTICAL_OPENERS = ("and ", "also ", "then ", "what about ", "how about ", "tell me more", "more ")
+_WORD_RE = re.compile(r"[a-z]+")
+# Topic terms a follow-up may add beyond the session's ("pricing" for it).
+FOLLOW_UP_MAX_NEW_TERMS = 2
+
+_sessions = SessionStore()
+
+
+RETRIEVAL_K = 3
+RETRIEVAL_CACHE_SIZE = 512
+RETRIEVAL_CACHE_TTL_SECONDS = 24 * 60 * 60
 
 
 @lru_cache(maxsize=1)
 def _get_retriever_cached():
-    return get_retriever(k=3)
+    return get_retriever(k=RETRIEVAL_K)
+
+
+def _encode_docs(docs: list) -> bytes:
+    return JSON_CODEC.encode(
+        [{"page_content": doc.page_content, "metadata": doc.metadata, "id": getattr(doc, "id", None)} for doc in docs]
+    )
+
+
+def _decode_docs(data: bytes) -> list:
+    from langchain_core.documents import Document
+
+    return [Document(**item) for item in JSON_CODEC.decode(data)]
+
+
+# Retrieval results per normalized query, shared across workers. The key
+# includes the retriever's index tag (the local index's fingerprint, or the
+# retrieval sidecar's generation) so a re-ingested or hot-swapped index is
+# not served stale.
+_retrieval_cache = TieredCache(
+    "retrieval",
+    max_entries=RETRIEVAL_CACHE_SIZE,
+    ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS,
+    codec=Codec(_encode_docs, _decode_docs),
+)
+
+
+def _retrieval_index_tag() -> str:
+    return _get_retriever_cached().index_tag
+
+
+def retrieve_docs(query: str) -> list:
+    """Top RETRIEVAL_K chunks for `query`, from the retrieval cache when possible."""
+    key = cache_key(_retrieval_index_tag(), RETRIEVAL_K, " ".join(query.lower().split()))
+    cached = _retrieval_cache.get(key)
+    if cached is not None:
+        return list(cached)
+    retriever = _get_retriever_cached()
+    with span("retrieve"):
+        docs = list(retriever.invoke(query) or [])
+    if docs:
+        _retrieval_cache.set(key, docs)
+    return docs
+
+
+def _is_follow_up(question: str, session: Optional[SessionState]) -> bool:
+    if session is None or not (session.docs or session.web_context):
+        return False
+    lowered = question.lower().strip()
+    terms = content_terms(lowered)
+    new_terms = terms - _ANAPHORS - frozenset(session.topic_terms)
+    if terms and not new_terms:
+        # Elliptical: only restates topics already in play.
+        return True
+    refers_back = not _ANAPHORS.isdisjoint(_WORD_RE.findall(lowered)) or lowered.startswith(_ELLIPTICAL_OPENERS)
+    return refers_back and len(new_terms) <= FOLLOW_UP_MAX_NEW_TERMS
+
+
+def _covers(text: str, terms: frozenset[str]) -> bool:
+    lowered = text.lower()
+    return bool(terms) and bool(lowered) and all(term in lowered for term in terms)
+
+
+def uses_session_context(question: str, session_id: Optional[str]) -> bool:
+    """
+    Whether `question` would be answered as a follow-up from its session's
+    earlier context; such answers must not be shared through the answer cache.
+    """
+    return _is_follow_up(question, _sessions.get(session_id))
+
+
+def record_session_turn(session_id: Optional[str], question: str, answer: str) -> None:
+    """Append a finished question/answer pair to the session's history."""
+    _sessions.record_turn(session_id, question, answer)
 
 
 def build_parallel_context(
@@ -36,14 +136,33 @@ def build_parallel_context(
     website_url: str = WEBSITE_URL,
     include_web: bool = True,
     developer_context: str = "",
+    session_id: Optional[str] = None,
 ) -> dict[str, Any]:
+    """
+    Retrieve documents and website passages for `question` concurrently.
+    With a session_id, a follow-up whose topic terms all appear in the
+    previous turn's context reuses that context instead of fetching again;
+    otherwise retrieval is run with the previous question prepended, so
+    "what about pricing for it?" still finds the right chunks.
+    """
     docs = []
     web_content = ""
+    session = _sessions.get(session_id)
+    follow_up = _is_follow_up(question, session)
+    terms = content_terms(question)
+    reuse_docs = follow_up and bool(session.docs) and _covers(
+        " ".join(doc.page_content for doc in session.docs), terms
+    )
+    reuse_web = follow_up and include_web and _covers(session.web_context, terms)
+    retrieval_query = f"{session.last_user_message()} {question}".strip() if follow_up else question
 
     def fetch_docs():
+        if reuse_docs:
+            return list(session.docs)
         try:
-            retriever = _get_retriever_cached()
-            return list(retriever.invoke(question) or [])
+            return retrieve_docs(retrieval_query)
+        except RequestCancelledError:
+            return []
         except Exception as exc:
             logger.warning(f"⚠️ Doc retrieval error: {exc}")
             return []
@@ -51,23 +170,36 @@ def build_parallel_context(
     def fetch_web():
         if not include_web:
             return ""
+        if reuse_web:
+            return session.web_context
         try:
-            return search_website(question, website_url)
+            with span("web_search"):
+                found = search_website(question, website_url)
+        except RequestCancelledError:
+            return ""
         except Exception as exc:
             logger.warning(f"⚠️ Web search error: {exc}")
-            return ""
+            found = ""
+        # Nothing new for a follow-up: keep answering from the passages already in play.
+        return found or (session.web_context if follow_up else "")
 
     with ThreadPoolExecutor(max_workers=2) as executor:
-        docs_future = executor.submit(fetch_docs)
-        web_future = executor.submit(fetch_web)
+        docs_future = executor.submit(context_bound(fetch_docs))
+        web_future = executor.submit(context_bound(fetch_web))
         docs = docs_future.result()
         web_content = web_future.result()
 
+    if session_id:
+        for part, reused in (("docs", reuse_docs), ("web", reuse_web)):
+            metrics.inc("session_context_total", part=part, result="reused" if reused else "fetched")
+        _sessions.save_context(session_id, question, docs, web_content)
+
     return {
         "docs": docs,
         "web_context": web_content,
         "developer_context": (developer_context or "").strip(),
         "external_context": "",
+        "session_context": follow_up,
     }
 
 
@@ -365,6 +497,25 @@ def _format_external_web_answer(external_context: str) -> str:
     return "\n".join(selected)
 
 
+def _fetch_external_context(question: str) -> str:
+    raise_if_cancelled("external_search")
+    with span("external_search"):
+        if not _is_agency_landscape_query(question):
+            return search_web_general(question, max_results=3)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            external_future = executor.submit(context_bound(search_web_general), question, 5)
+            names_future = executor.submit(
+                context_bound(search_web_general),
+                f"{question} company names list",
+                5,
+            )
+            external_context = external_future.result()
+            names_context = names_future.result()
+        if names_context:
+            external_context = f"{external_context}\n\n{names_context}"
+        return external_context
+
+
 def _extract_external_titles(external_context: str, max_titles: int = 5) -> list[str]:
     titles: list[str] = []
     for raw_line in external_context.splitlines():
@@ -391,6 +542,8 @@ def _get_company_extractor_llm() -> GeminiChatModel:
         model="gemini-2.5-flash",
         temperature=0.1,
         max_output_tokens=220,
+        hedge_policy=default_hedge_policy(),
+        purpose="extract",
     )
 
 
@@ -412,7 +565,7 @@ Rules:
 Snippets:
 {external_context[:7000]}
 """
-        resp = llm.invoke(prompt)
+        resp = llm.invoke(prompt, deadline=time.monotonic() + FALLBACK_GENERATION_TIMEOUT_SECONDS)
         content = getattr(resp, "content", str(resp))
         if isinstance(content, list):
             content = content[0].get("text", "") if content else ""
@@ -438,19 +591,13 @@ def _get_general_fallback_llm() -> GeminiChatModel:
         model="gemini-2.5-flash",
         temperature=0.4,
         max_output_tokens=700,
+        hedge_policy=default_hedge_policy(),
+        purpose="general",
     )
 
 
-def _answer_with_general_gemini(
-    question: str,
-    developer_context: str = "",
-    web_context: str = "",
-) -> str:
-    if not settings.GEMINI_API_KEY:
-        return ""
-    try:
-        llm = _get_general_fallback_llm()
-        prompt = f"""
+def _general_gemini_prompt(question: str, developer_context: str, web_context: str) -> str:
+    return f"""
 You are a helpful marketing and business assistant for Ritz Media World.
 
 When the website context is incomplete, still answer the user's query using your internal knowledge and practical best practices.
@@ -471,7 +618,19 @@ WEBSITE CONTEXT (optional):
 USER QUESTION:
 {question}
 """
-        resp = llm.invoke(prompt)
+
+
+def _answer_with_general_gemini(
+    question: str,
+    developer_context: str = "",
+    web_context: str = "",
+) -> str:
+    if not settings.GEMINI_API_KEY:
+        return ""
+    try:
+        llm = _get_general_fallback_llm()
+        prompt = _general_gemini_prompt(question, developer_context, web_context)
+        resp = llm.invoke(prompt, deadline=time.monotonic() + FALLBACK_GENERATION_TIMEOUT_SECONDS)
         text = (getattr(resp, "content", "") or "").strip()
         return text
     except Exception as exc:
@@ -479,6 +638,25 @@ USER QUESTION:
         return ""
 
 
+async def astream_general_gemini(
+    question: str,
+    developer_context: str = "",
+    web_context: str = "",
+) -> AsyncGenerator[str, None]:
+    """Streaming variant of _answer_with_general_gemini; yields text as it is generated."""
+    if not settings.GEMINI_API_KEY:
+        return
+    try:
+        llm = _get_general_fallback_llm()
+        prompt = _general_gemini_prompt(question, developer_context, web_context)
+        async for chunk in llm.astream(prompt, deadline=time.monotonic() + FALLBACK_GENERATION_TIMEOUT_SECONDS):
+            text = getattr(chunk, "content", "") or ""
+            if text:
+                yield text
+    except Exception as exc:
+        logger.warning("General Gemini fallback stream failed: %s", exc)
+
+
 def _fallback_india_agency_names(max_names: int = 8) -> list[str]:
     # Practical fallback list for India-focused media/advertising agency queries
     # when web snippets are unavailable/noisy.
@@ -589,62 +767,247 @@ def extract_founded_year_answer(question: str, docs: list[Any], web_context: str
     return f"Ritz Media World was founded in {year}."
 
 
-def upgrade_low_confidence_answer(
+def _blend_external_answer(question: str, answer: str) -> str:
+    external_context = _fetch_external_context(question)
+    logger.info("Running external web fallback for: %s", question[:60])
+    logger.info("External web context size: %d chars", len(external_context))
+    external_answer = _format_external_web_answer(external_context) if external_context else ""
+    return _compose_professional_blended_answer(
+        question=question,
+        internal_answer=answer,
+        external_context=external_answer,
+    )
+
+
+# How much of a streamed answer is held back and checked for
+# _LOW_CONFIDENCE_MARKERS before it is released to the client.
+LOW_CONFIDENCE_PREFIX_CHARS = 120
+
+
+class LeadingLowConfidenceDetector:
+    """
+    Incremental needs_external_web_fallback over the start of a stream.
+    `feed` returns None while undecided, True once a marker shows up in the
+    leading window and False once the window passes without one.
+    """
+
+    def __init__(self, window: int = LOW_CONFIDENCE_PREFIX_CHARS) -> None:
+        self.window = window
+        self.text = ""
+        self.verdict: Optional[bool] = None
+
+    def feed(self, chunk: str) -> Optional[bool]:
+        if self.verdict is None:
+            self.text += chunk
+            lowered = self.text.lower()
+            if any(marker in lowered for marker in _LOW_CONFIDENCE_MARKERS):
+                self.verdict = True
+            elif len(self.text) >= self.window:
+                self.verdict = False
+        return self.verdict
+
+
+async def stream_low_confidence_upgrade(
     question: str,
     answer: str,
     developer_context: str = "",
     web_context: str = "",
-) -> str:
+    allow_external_search: bool = True,
+) -> AsyncGenerator[dict, None]:
     """
-    Apply the existing fallback chain while reusing already-prepared
-    request context, so repeated fallback work stays minimal.
+    Upgrade a low-confidence answer while streaming: the external blend runs
+    in an executor, the general Gemini answer streams as it is generated.
     """
     upgraded_answer = (answer or "").strip()
+    if allow_external_search and (is_external_query(question) or _is_agency_landscape_query(question)):
+        yield {"status": "searching_web"}
+        loop = asyncio.get_running_loop()
+        with span("fallback_upgrade"):
+            upgraded_answer = await loop.run_in_executor(
+                None, context_bound(_blend_external_answer), question, upgraded_answer
+            )
 
-    should_fetch_external = is_external_query(question) or (
-        needs_external_web_fallback(upgraded_answer) and _is_agency_landscape_query(question)
-    )
-    if should_fetch_external:
-        is_media_query = _is_agency_landscape_query(question)
-        if is_media_query:
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                external_future = executor.submit(search_web_general, question, 5)
-                names_future = executor.submit(
-                    search_web_general,
-                    f"{question} company names list",
-                    5,
-                )
-                external_context = external_future.result()
-                names_context = names_future.result()
-            if names_context:
-                external_context = f"{external_context}\n\n{names_context}"
-        else:
-            external_context = search_web_general(question, max_results=3)
-        logger.info("Running external web fallback for: %s", question[:60])
-        logger.info("External web context size: %d chars", len(external_context))
-        external_answer = _format_external_web_answer(external_context) if external_context else ""
-        upgraded_answer = _compose_professional_blended_answer(
-            question=question,
-            internal_answer=upgraded_answer,
-            external_context=external_answer,
+    streamed = False
+    if needs_external_web_fallback(upgraded_answer):
+        general_answer = ""
+        with span("fallback_general"):
+            async for text in astream_general_gemini(
+                question=question,
+                developer_context=developer_context,
+                web_context=web_context,
+            ):
+                general_answer += text
+                streamed = True
+                yield {"answer": text, "is_chunk": True}
+        if general_answer.strip():
+            upgraded_answer = general_answer.strip()
+
+    upgraded_answer = _remove_unwanted_provided_information_preface(upgraded_answer)
+    if not streamed and upgraded_answer:
+        yield {"answer": upgraded_answer, "is_chunk": True}
+    yield {"answer": "", "is_chunk": False, "final_answer": upgraded_answer}
+
+
+async def guard_low_confidence(
+    payloads: AsyncGenerator[dict, None],
+    fallback: Callable[[str], AsyncGenerator[dict, None]],
+) -> AsyncGenerator[dict, None]:
+    """
+    Pass answer_node_streaming payloads through, holding the leading chunks
+    until LeadingLowConfidenceDetector decides. On a low-confidence start the
+    generation is closed (cancelling the Gemini stream), the held text is
+    dropped and `fallback(partial_answer)` streams instead. A final answer
+    that still needs the fallback is upgraded after the fact, as before.
+    """
+    detector = LeadingLowConfidenceDetector()
+    held: list[dict] = []
+    emitted = False
+    low_confidence_answer: Optional[str] = None
+
+    async with contextlib.aclosing(payloads) as stream:
+        async for payload in stream:
+            if payload.get("is_chunk"):
+                verdict = detector.feed(payload.get("answer", ""))
+                if verdict is None:
+                    held.append(payload)
+                    continue
+                if verdict:
+                    metrics.inc("low_confidence_aborts_total", stage="leading")
+                    logger.info("🔁 Low-confidence start detected, cancelling generation.")
+                    low_confidence_answer = detector.text
+                    break
+                for held_payload in held:
+                    yield held_payload
+                held.clear()
+                emitted = True
+                yield payload
+                continue
+
+            final_answer = payload.get("final_answer", "")
+            if final_answer != CAPACITY_FALLBACK_ANSWER and needs_external_web_fallback(final_answer):
+                metrics.inc("low_confidence_aborts_total", stage="final")
+                logger.info("🔁 Low-confidence final detected, running fallback.")
+                low_confidence_answer = final_answer
+                break
+            for held_payload in held:
+                yield held_payload
+            held.clear()
+            yield payload
+            return
+
+    if low_confidence_answer is None:
+        for held_payload in held:
+            yield held_payload
+        return
+    if emitted:
+        # Keep the replacement answer apart from what the client already shows.
+        yield {"answer": "\n\n", "is_chunk": True}
+    async for payload in fallback(low_confidence_answer):
+        yield payload
+
+
+async def stream_answer_with_fallback(
+    state: dict[str, Any],
+    developer_context: str = "",
+) -> AsyncGenerator[dict, None]:
+    """answer_node_streaming for the main RAG route, upgraded early when it starts low-confidence."""
+    question = state["question"]
+
+    def fallback(answer: str) -> AsyncGenerator[dict, None]:
+        return stream_low_confidence_upgrade(
+            question, answer, developer_context, state.get("web_context", "")
         )
 
-    if needs_external_web_fallback(upgraded_answer):
-        general_answer = _answer_with_general_gemini(
-            question=question,
-            developer_context=developer_context,
-            web_context=web_context,
+    async for payload in guard_low_confidence(answer_node_streaming(state), fallback):
+        yield payload
+
+
+_FAST_PATHS: tuple[tuple[str, Callable[[str], bool], Callable[[str], str]], ...] = (
+    ("top_fm", _is_top_fm_query, lambda question: _top_fm_channels_india_answer()),
+    ("social_performance", _is_social_performance_combo_query, lambda question: _social_performance_combo_answer()),
+    ("video_production", _is_video_production_query, lambda question: _video_production_answer()),
+    ("lead_generation", _is_lead_generation_query, lambda question: _lead_generation_answer()),
+    ("next_step", _is_next_step_query, lambda question: _next_step_answer()),
+    ("top_newspaper", _is_top_newspaper_query, _top_newspapers_answer),
+    ("pricing", _is_pricing_query, lambda question: _pricing_enquiry_answer()),
+)
+
+
+def fast_path_answer(question: str) -> Optional[tuple[str, str]]:
+    """(rule, answer) for the first deterministic fast path matching the question."""
+    for rule, matches, answer in _FAST_PATHS:
+        if matches(question):
+            metrics.inc("fast_path_hits_total", rule=rule)
+            return rule, answer(question)
+    return None
+
+
+def _external_answer_state(question: str, context: dict[str, Any], external_context: str) -> dict[str, Any]:
+    """
+    Answer-node state for an external question: the node answers from the
+    search results with EXTERNAL_FALLBACK_PROMPT. Only the streaming endpoint
+    composes external answers this way, because the blended composition of
+    run_chat (_compose_professional_blended_answer) needs the full internal
+    answer before it can emit anything; run_chat keeps that composition.
+    """
+    return {
+        **context,
+        "question": question,
+        "answer": "",
+        "external_context": _format_external_web_answer(external_context) if external_context else "",
+    }
+
+
+async def stream_external_answer(
+    question: str,
+    context_bundle: dict[str, Any],
+    developer_context: str = "",
+) -> AsyncGenerator[dict, None]:
+    """
+    Streaming counterpart of run_chat for external and brand-work questions,
+    reusing context already built by the caller. Yields answer_node_streaming
+    payloads, plus {"status": ...} payloads while the web search runs.
+    """
+    fast_path = fast_path_answer(question)
+    if fast_path:
+        answer = fast_path[1]
+    elif _is_brand_work_query(question):
+        metrics.inc("fast_path_hits_total", rule="brand_work")
+        answer = _brand_work_answer_from_context(context_bundle.get("web_context", ""))
+    else:
+        answer = ""
+    if answer:
+        yield {"answer": answer, "is_chunk": True}
+        yield {"answer": "", "is_chunk": False, "final_answer": answer}
+        return
+
+    yield {"status": "searching_web"}
+    loop = asyncio.get_running_loop()
+    external_context = await loop.run_in_executor(None, context_bound(_fetch_external_context), question)
+    logger.info("🌍 External web context size (streaming): %d chars", len(external_context))
+    state = _external_answer_state(question, context_bundle, external_context)
+
+    yield {"status": "generating"}
+
+    def fallback(answer: str) -> AsyncGenerator[dict, None]:
+        # The external search already ran; go straight to general Gemini.
+        return stream_low_confidence_upgrade(
+            question,
+            answer,
+            developer_context,
+            context_bundle.get("web_context", ""),
+            allow_external_search=False,
         )
-        if general_answer:
-            upgraded_answer = general_answer
 
-    return _remove_unwanted_provided_information_preface(upgraded_answer)
+    async for payload in guard_low_confidence(answer_node_streaming(state), fallback):
+        yield payload
 
 
 def run_chat_with_web(
     question: str,
     include_web: bool = True,
     developer_context: str = "",
+    session_id: Optional[str] = None,
 ) -> dict:
     """
     Run the RAG graph for a single user question with web search.
@@ -653,36 +1016,18 @@ def run_chat_with_web(
     start = time.time()
     logger.info(f"📥 Question: {question[:80]}")
 
-    # Deterministic fast path for top FM channel queries.
-    if _is_top_fm_query(question):
-        elapsed = time.time() - start
-        logger.info(f"⏱️ Total time: {elapsed:.2f}s (top-fm fast path)")
-        return {"answer": _top_fm_channels_india_answer(), "has_answer": True}
-    if _is_social_performance_combo_query(question):
-        elapsed = time.time() - start
-        logger.info(f"?? Total time: {elapsed:.2f}s (social+performance fast path)")
-        return {"answer": _social_performance_combo_answer(), "has_answer": True}
-    if _is_video_production_query(question):
+    # Deterministic fast paths (top FM, newspapers, pricing, ...).
+    fast_path = fast_path_answer(question)
+    if fast_path:
+        rule, answer = fast_path
         elapsed = time.time() - start
-        logger.info(f"?? Total time: {elapsed:.2f}s (video-production fast path)")
-        return {"answer": _video_production_answer(), "has_answer": True}
-    if _is_lead_generation_query(question):
-        elapsed = time.time() - start
-        logger.info(f"?? Total time: {elapsed:.2f}s (lead-generation fast path)")
-        return {"answer": _lead_generation_answer(), "has_answer": True}
-    if _is_next_step_query(question):
-        elapsed = time.time() - start
-        logger.info(f"?? Total time: {elapsed:.2f}s (next-step fast path)")
-        return {"answer": _next_step_answer(), "has_answer": True}
-    if _is_top_newspaper_query(question):
-        elapsed = time.time() - start
-        logger.info(f"⏱️ Total time: {elapsed:.2f}s (top-newspaper fast path)")
-        return {"answer": _top_newspapers_answer(question), "has_answer": True}
+        logger.info(f"⏱️ Total time: {elapsed:.2f}s ({rule} fast path)")
+        return {"answer": answer, "has_answer": True}
 
-    if _is_pricing_query(question):
-        elapsed = time.time() - start
-        logger.info(f"Total time: {elapsed:.2f}s (pricing fast path)")
-        return {"answer": _pricing_enquiry_answer(), "has_answer": True}
+    # Gemini is throttling: skip context building and answer degraded at once.
+    if get_gate("generate").is_open():
+        logger.warning("Gemini circuit open, serving capacity fallback")
+        return {"answer": CAPACITY_FALLBACK_ANSWER, "has_answer": False}
 
     state = {
         "question": question,
@@ -693,12 +1038,16 @@ def run_chat_with_web(
         "external_context": "",
     }
 
+    raise_if_cancelled("context")
     context_bundle = build_parallel_context(
         question=question,
         website_url=WEBSITE_URL,
         include_web=include_web,
         developer_context=developer_context,
+        session_id=session_id,
     )
+    # Answers drawing on the session's earlier turns are not cacheable.
+    session_context = bool(context_bundle.pop("session_context", False))
     state.update(context_bundle)
     logger.info(
         "⚡ Context ready in parallel | docs=%d web_chars=%d dev_chars=%d",
@@ -711,9 +1060,11 @@ def run_chat_with_web(
         if _is_brand_work_query(question):
             elapsed = time.time() - start
             logger.info(f"⏱️ Total time: {elapsed:.2f}s (brand-work fast path)")
+            metrics.inc("fast_path_hits_total", rule="brand_work")
             return {
                 "answer": _brand_work_answer_from_context(state.get("web_context", "")),
                 "has_answer": True,
+                "session_context": session_context,
             }
 
         # Deterministic fast path for year-foundation queries.
@@ -725,46 +1076,34 @@ def run_chat_with_web(
         if founded_year_answer:
             elapsed = time.time() - start
             logger.info(f"⏱️ Total time: {elapsed:.2f}s (founded-year fast path)")
-            return {"answer": founded_year_answer, "has_answer": True}
+            metrics.inc("fast_path_hits_total", rule="founded_year")
+            return {"answer": founded_year_answer, "has_answer": True, "session_context": session_context}
 
-        result_state = rag_graph.invoke(state)
+        raise_if_cancelled("generate")
+        result_state = get_rag_graph().invoke(state)
         answer = result_state.get("answer", "").strip()
-
+        if answer == CAPACITY_FALLBACK_ANSWER:
+            # Degraded, not an answer: no further Gemini calls, never cached.
+            logger.warning("Gemini at capacity, serving capacity fallback")
+            return {"answer": answer, "has_answer": False}
+
+        # Non-streaming answers keep the blended composition (internal answer
+        # plus external names and references); see _external_answer_state for
+        # why the streaming endpoint differs.
         should_fetch_external = is_external_query(question) or (
             needs_external_web_fallback(answer) and _is_agency_landscape_query(question)
         )
         if should_fetch_external:
-            is_media_query = _is_agency_landscape_query(question)
-            if is_media_query:
-                with ThreadPoolExecutor(max_workers=2) as executor:
-                    external_future = executor.submit(search_web_general, question, 5)
-                    names_future = executor.submit(
-                        search_web_general,
-                        f"{question} company names list",
-                        5,
-                    )
-                    external_context = external_future.result()
-                    names_context = names_future.result()
-                if names_context:
-                    external_context = f"{external_context}\n\n{names_context}"
-            else:
-                external_context = search_web_general(question, max_results=3)
-            logger.info("🌍 Running external web fallback for: %s", question[:60])
-            logger.info("🌍 External web context size: %d chars", len(external_context))
-            external_answer = _format_external_web_answer(external_context) if external_context else ""
-            answer = _compose_professional_blended_answer(
-                question=question,
-                internal_answer=answer,
-                external_context=external_answer,
-            )
+            answer = _blend_external_answer(question, answer)
 
         # If answer is still low-confidence, ask Gemini to answer using general knowledge.
         if needs_external_web_fallback(answer):
-            general_answer = _answer_with_general_gemini(
-                question=question,
-                developer_context=developer_context,
-                web_context=state.get("web_context", ""),
-            )
+            with span("fallback_general"):
+                general_answer = _answer_with_general_gemini(
+                    question=question,
+                    developer_context=developer_context,
+                    web_context=state.get("web_context", ""),
+                )
             if general_answer:
                 answer = general_answer
 
@@ -773,6 +1112,8 @@ def run_chat_with_web(
         elapsed = time.time() - start
         logger.info(f"⏱️ Total time: {elapsed:.2f}s")
 
+        if answer == CAPACITY_FALLBACK_ANSWER:
+            return {"answer": answer, "has_answer": False}
         if not answer:
             return {
                 "answer": (
@@ -786,9 +1127,14 @@ def run_chat_with_web(
 
         return {
             "answer": answer,
-            "has_answer": True
+            "has_answer": True,
+            "session_context": session_context,
         }
 
+    except RequestCancelledError as e:
+        elapsed = time.time() - start
+        logger.info(f"🛑 RAG cancelled after {elapsed:.2f}s: {str(e)}")
+        return {"answer": "", "has_answer": False}
     except Exception as e:
         elapsed = time.time() - start
         logger.error(f"❌ RAG error after {elapsed:.2f}s: {str(e)}")
@@ -802,11 +1148,15 @@ def run_chat_with_web(
         }
 
 
-def run_chat(question: str, developer_context: str = "") -> dict:
+def run_chat(question: str, developer_context: str = "", session_id: Optional[str] = None) -> dict:
     """Run chat with web search enabled by default"""
-    return run_chat_with_web(
+    result = run_chat_with_web(
         question,
         include_web=True,
         developer_context=developer_context,
+        session_id=session_id,
     )
+    if result.get("answer"):
+        record_session_turn(session_id, question, result["answer"])
+    return result
 
@@ -0,0 +1,378 @@
+"""
+Durable outbox for lead submissions.
+
+`POST /submit-lead` writes the enquiry to a local SQLite outbox and answers
+straight away; `LeadDeliveryWorker` forwards queued leads to the RMW
+contact-enquiry API in the background over one pooled HTTP client.
+
+A lead leaves the `pending` state only when the API accepts it
+(`delivered`) or rejects it as invalid with a 4xx (`rejected`, kept for
+manual follow-up). Timeouts, connection errors, 429s and 5xx responses are
+retried with capped exponential backoff for as long as it takes, and
+pending leads survive restarts.
+
+Finished rows hold personal data, so the worker deletes them once they are
+no longer useful: delivered leads after LEAD_DELIVERED_RETENTION_SECONDS
+(1 day, for tracing a delivery), rejected leads after
+LEAD_REJECTED_RETENTION_SECONDS (30 days, the window for following them up
+by hand). Pending leads are never purged.
+
+Every uvicorn worker runs a delivery worker on the same outbox file. Due
+leads are claimed with a lease (`claimed_until`) in one transaction, so a
+lead is sent by one process at a time; a lease that runs out (the process
+died mid-delivery) makes the lead due again. A worker only claims as many
+leads as it has free delivery slots, so each lease starts when its send
+does and covers the request timeout alone.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.utils.batching import MicroBatcher
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LEAD_REQUEST_TIMEOUT_SECONDS = 30.0
+# Leads in flight at once; a slow API gets several requests in parallel
+# instead of a queue of one.
+LEAD_DELIVERY_CONCURRENCY = 4
+# A claimed lead becomes due again if its delivery has not finished by
+# then: the whole request (bounded by LEAD_REQUEST_TIMEOUT_SECONDS) plus
+# room for recording the outcome.
+LEAD_CLAIM_LEASE_MARGIN_SECONDS = 15.0
+LEAD_CLAIM_LEASE_SECONDS = LEAD_REQUEST_TIMEOUT_SECONDS + LEAD_CLAIM_LEASE_MARGIN_SECONDS
+LEAD_RETRY_BASE_SECONDS = 2.0
+LEAD_RETRY_MAX_SECONDS = 15 * 60.0
+# Upper bound on the worker's sleep, so leads queued by other processes
+# are picked up even without a local wake-up.
+LEAD_POLL_SECONDS = 5.0
+SQLITE_BUSY_TIMEOUT_SECONDS = 5.0
+LEAD_DELIVERED_RETENTION_SECONDS = 24 * 60 * 60
+LEAD_REJECTED_RETENTION_SECONDS = 30 * 24 * 60 * 60
+LEAD_PURGE_INTERVAL_SECONDS = 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS leads_due ON leads (state, next_attempt_at);
+CREATE INDEX IF NOT EXISTS leads_finished ON leads (state, finished_at);
+"""
+
+
+class LeadOutbox:
+    """SQLite-backed queue of lead payloads; safe to share between threads and processes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._enqueue_batcher = MicroBatcher("lead_outbox", self.enqueue_many)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # An acknowledged lead must survive a power cut, not just a crash.
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, payload: dict) -> int:
+        """Store one lead durably and return its id; concurrent calls share a commit."""
+        return self._enqueue_batcher.submit(payload)
+
+    def enqueue_many(self, payloads: list[dict]) -> list[int]:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [
+                int(
+                    conn.execute(
+                        "INSERT INTO leads (payload, created_at, next_attempt_at) VALUES (?, ?, ?)",
+                        (json.dumps(payload, ensure_ascii=False), now, now),
+                    ).lastrowid
+                )
+                for payload in payloads
+            ]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        metrics.inc("lead_outbox_enqueued_total", value=len(ids))
+        return ids
+
+    def claim_due(
+        self, limit: int = LEAD_DELIVERY_CONCURRENCY, lease_seconds: float = LEAD_CLAIM_LEASE_SECONDS
+    ) -> list[tuple[int, dict, int]]:
+        """Lease up to `limit` due leads to the caller: (id, payload, attempts so far)."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, payload, attempts FROM leads"
+                " WHERE state = 'pending' AND next_attempt_at <= ? AND claimed_until <= ?"
+                " ORDER BY next_attempt_at LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE leads SET claimed_until = ? WHERE id = ?", [(now + lease_seconds, row[0]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [(lead_id, json.loads(payload), attempts) for lead_id, payload, attempts in rows]
+
+    def mark_delivered(self, lead_id: int) -> None:
+        self._finish(lead_id, "delivered", None)
+
+    def mark_rejected(self, lead_id: int, error: str) -> None:
+        self._finish(lead_id, "rejected", error)
+
+    def _finish(self, lead_id: int, state: str, error: Optional[str]) -> None:
+        self._connect().execute(
+            "UPDATE leads SET state = ?, attempts = attempts + 1, last_error = ?, finished_at = ?, claimed_until = 0"
+            " WHERE id = ?",
+            (state, error, time.time(), lead_id),
+        )
+
+    def mark_retry(self, lead_id: int, error: str, delay_seconds: float) -> None:
+        self._connect().execute(
+            "UPDATE leads SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?, claimed_until = 0"
+            " WHERE id = ?",
+            (error, time.time() + delay_seconds, lead_id),
+        )
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the earliest pending lead is due (0 if overdue), None if none is pending."""
+        row = self._connect().execute(
+            "SELECT MIN(MAX(next_attempt_at, claimed_until)) FROM leads WHERE state = 'pending'"
+        ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def purge(self) -> int:
+        """Delete finished leads past their retention; returns the number removed."""
+        now = time.time()
+        conn = self._connect()
+        removed = 0
+        for state, retention in (
+            ("delivered", LEAD_DELIVERED_RETENTION_SECONDS),
+            ("rejected", LEAD_REJECTED_RETENTION_SECONDS),
+        ):
+            removed += conn.execute(
+                "DELETE FROM leads WHERE state = ? AND finished_at < ?", (state, now - retention)
+            ).rowcount
+        if removed:
+            metrics.inc("lead_outbox_purged_total", value=removed)
+        return removed
+
+    def stats(self) -> dict[str, Any]:
+        # One index range per state; delivered leads are counted by
+        # lead_deliveries_total rather than by scanning retained rows.
+        conn = self._connect()
+        counts: dict[str, Any] = {
+            state: conn.execute("SELECT COUNT(*) FROM leads WHERE state = ?", (state,)).fetchone()[0]
+            for state in ("pending", "rejected")
+        }
+        oldest = conn.execute("SELECT MIN(created_at) FROM leads WHERE state = 'pending'").fetchone()[0]
+        counts["oldest_pending_seconds"] = round(time.time() - oldest, 1) if oldest is not None else 0.0
+        return counts
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, capped at LEAD_RETRY_MAX_SECONDS."""
+    return random.uniform(0.5, 1.0) * min(LEAD_RETRY_MAX_SECONDS, LEAD_RETRY_BASE_SECONDS * 2 ** attempts)
+
+
+def _is_retryable_status(status_code: int) -> bool:
+    return status_code in (408, 425, 429) or status_code >= 500
+
+
+class LeadDeliveryWorker:
+    """Background task that drains the outbox into the contact-enquiry API."""
+
+    def __init__(
+        self,
+        outbox: LeadOutbox,
+        url: str,
+        concurrency: int = LEAD_DELIVERY_CONCURRENCY,
+        timeout: float = LEAD_REQUEST_TIMEOUT_SECONDS,
+    ) -> None:
+        self.outbox = outbox
+        self.url = url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.lease_seconds = timeout + LEAD_CLAIM_LEASE_MARGIN_SECONDS
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._client: Any = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="lead-delivery")
+
+    def notify(self) -> None:
+        """A lead was queued: deliver it now instead of at the next poll."""
+        self._wake.set()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> Any:
+        if self._client is None:
+            # Imported here so the HTTP client stack stays off the startup path.
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def _run(self) -> None:
+        next_purge = 0.0
+        while True:
+            # Cleared before draining: a lead queued meanwhile sets it again.
+            self._wake.clear()
+            try:
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + LEAD_PURGE_INTERVAL_SECONDS
+                    await asyncio.to_thread(self.outbox.purge)
+                await self.drain()
+                wait = await asyncio.to_thread(self.outbox.next_due_in)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Lead delivery loop error")
+                wait = LEAD_POLL_SECONDS
+            wait = LEAD_POLL_SECONDS if wait is None else min(wait, LEAD_POLL_SECONDS)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self) -> None:
+        """
+        Deliver every lead that is due. Leads are claimed only into free
+        delivery slots, so none sits out its lease waiting for a slot.
+        """
+        in_flight: set[asyncio.Task] = set()
+        try:
+            while True:
+                free = self.concurrency - len(in_flight)
+                batch = await asyncio.to_thread(self.outbox.claim_due, free, self.lease_seconds) if free else []
+                in_flight.update(asyncio.create_task(self._deliver(*lead)) for lead in batch)
+                if not in_flight:
+                    return
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        logger.error("Lead delivery error", exc_info=task.exception())
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def _deliver(self, lead_id: int, payload: dict, attempts: int) -> None:
+        start = time.perf_counter()
+        try:
+            # httpx's timeout is per phase; bound the whole request so it ends
+            # inside the lease.
+            response = await asyncio.wait_for(self._get_client().post(self.url, json=payload), self.timeout)
+        except Exception as exc:  # timeouts and transport errors
+            await self._retry(lead_id, attempts, f"{type(exc).__name__}: {exc}")
+            return
+        finally:
+            metrics.observe("lead_delivery_seconds", time.perf_counter() - start)
+
+        if response.status_code in (200, 201):
+            await asyncio.to_thread(self.outbox.mark_delivered, lead_id)
+            metrics.inc("lead_deliveries_total", result="delivered")
+            logger.info(f"✅ Lead {lead_id} delivered after {attempts + 1} attempt(s)")
+        elif _is_retryable_status(response.status_code):
+            await self._retry(lead_id, attempts, f"HTTP {response.status_code}: {response.text[:200]}")
+        else:
+            error = f"HTTP {response.status_code}: {response.text[:500]}"
+            await asyncio.to_thread(self.outbox.mark_rejected, lead_id, error)
+            metrics.inc("lead_deliveries_total", result="rejected")
+            logger.error(f"❌ RMW API rejected lead {lead_id} ({error}); kept in the outbox as rejected")
+
+    async def _retry(self, lead_id: int, attempts: int, error: str) -> None:
+        delay = retry_delay(attempts)
+        await asyncio.to_thread(self.outbox.mark_retry, lead_id, error, delay)
+        metrics.inc("lead_deliveries_total", result="retry")
+        logger.warning(f"⏳ Lead {lead_id} delivery failed ({error}); retry {attempts + 1} in {delay:.0f}s")
+
+
+_outbox: Optional[LeadOutbox] = None
+_worker: Optional[LeadDeliveryWorker] = None
+_lock = threading.Lock()
+
+
+def get_outbox() -> LeadOutbox:
+    global _outbox
+    with _lock:
+        if _outbox is None:
+            _outbox = LeadOutbox(os.path.expanduser(settings.LEAD_OUTBOX_PATH))
+        return _outbox
+
+
+def start_lead_delivery() -> LeadDeliveryWorker:
+    """Start this process's delivery worker (from the app's startup event)."""
+    global _worker
+    if _worker is None:
+        _worker = LeadDeliveryWorker(get_outbox(), settings.LEAD_ENQUIRY_URL)
+    _worker.start()
+    return _worker
+
+
+async def stop_lead_delivery() -> None:
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
+
+
+def lead_outbox_stats() -> Optional[dict[str, Any]]:
+    """Outbox counts for /metrics, or None before the outbox is opened."""
+    return _outbox.stats() if _outbox is not None else None
+
+
+async def submit_lead(payload: dict) -> int:
+    """Persist a lead for delivery and wake the worker; returns the outbox id."""
+    lead_id = await asyncio.to_thread(get_outbox().enqueue, payload)
+    if _worker is not None:
+        _worker.notify()
+    return lead_id
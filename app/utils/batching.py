@@ -0,0 +1,91 @@
+"""
+Micro-batching for blocking calls made from many request threads at once.
+
+`MicroBatcher.submit(item)` blocks until the item's result is ready. The
+caller at the head of the queue, when no batch is forming, becomes the
+batch's leader: it collects the items submitted meanwhile and runs
+`run_batch` once for all of them on its own thread, then hands each caller
+its result. The batch runs in an empty context, not the leader's, so one
+request's cancellation token, deadline and timings never reach the others'
+items; callers check their own request state once they have their result.
+While another batch of the same batcher is already running
+(i.e. under load) the leader first waits up to `max_wait_seconds` for the
+batch to fill; an idle batcher runs a lone item straight away, so batching
+costs nothing at low traffic.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, Sequence, TypeVar
+
+from app.utils.metrics import metrics
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BATCH_MAX_SIZE = 16
+BATCH_MAX_WAIT_SECONDS = 0.004
+
+
+class MicroBatcher(Generic[T, R]):
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[list[T]], Sequence[R]],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_seconds: float = BATCH_MAX_WAIT_SECONDS,
+    ) -> None:
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._cond = threading.Condition()
+        self._pending: list[tuple[T, Future]] = []
+        self._collecting = False
+        self._running = 0
+
+    def submit(self, item: T) -> R:
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((item, future))
+            if len(self._pending) >= self.max_batch_size:
+                self._cond.notify_all()
+            # Wait until a batch has served this item, or until it heads the
+            # queue with no batch forming, in which case this caller leads.
+            while not future.done():
+                if not self._collecting and self._pending and self._pending[0][1] is future:
+                    self._collecting = True
+                    break
+                self._cond.wait()
+        if not future.done():
+            self._lead()
+        return future.result()
+
+    def _lead(self) -> None:
+        start = time.perf_counter()
+        with self._cond:
+            if self._running and self.max_wait_seconds > 0:
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch_size, timeout=self.max_wait_seconds)
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:len(batch)]
+            self._collecting = False
+            self._running += 1
+            # Anything left over gets its own leader.
+            self._cond.notify_all()
+        metrics.observe("microbatch_size", len(batch), batcher=self.name)
+        metrics.observe("microbatch_wait_seconds", time.perf_counter() - start, batcher=self.name)
+        try:
+            results = contextvars.Context().run(self.run_batch, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: batch of {len(batch)} returned {len(results)} results")
+        except BaseException as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
@@ -0,0 +1,102 @@
+"""
+Per-request cancellation.
+
+Each chat request gets a CancellationToken, made current in a ContextVar so
+it follows the request into executor threads through `context_bound`. The
+endpoint cancels it when the client disconnects or the request times out.
+Pipeline stages call `raise_if_cancelled()` before starting new work, and
+blocking waits add `token.future` to their wait set so they return as soon
+as it fires instead of sitting on abandoned upstream calls.
+"""
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelledError(Exception):
+    """Raised by pipeline stages once their request has been cancelled."""
+
+
+class CancellationToken:
+    def __init__(self) -> None:
+        # Completes (with the reason) on cancel; usable in concurrent.futures.wait.
+        self.future: Future = Future()
+        self.reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self.future.done()
+
+    def cancel(self, reason: str) -> bool:
+        """Cancel once; returns False if the token was already cancelled."""
+        with self._lock:
+            if self.future.done():
+                return False
+            self.reason = reason
+            self.future.set_result(reason)
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Cancellation callback failed")
+        metrics.inc("request_cancellations_total", reason=reason)
+        logger.info("Request cancelled (%s)", reason)
+        return True
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Run `callback` on cancel (immediately if already cancelled), on the cancelling thread."""
+        with self._lock:
+            if not self.future.done():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        """Drop a callback whose work finished first, so the token does not keep it alive."""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self, stage: str) -> None:
+        if self.cancelled:
+            metrics.inc("cancelled_work_total", stage=stage)
+            raise RequestCancelledError(f"request cancelled ({self.reason}) before {stage}")
+
+
+_current_token: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "cancellation_token",
+    default=None,
+)
+
+
+def begin_cancellation_scope(token: Optional[CancellationToken] = None) -> CancellationToken:
+    """Make `token` (or a fresh one) current for this request's context."""
+    token = token or CancellationToken()
+    _current_token.set(token)
+    return token
+
+
+def current_cancellation_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+def raise_if_cancelled(stage: str) -> None:
+    """Stop before `stage` if the current request has been cancelled."""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled(stage)
+
+
+def cancellation_waitables() -> list[Future]:
+    """Extra futures for a concurrent.futures.wait set; empty outside a request."""
+    token = _current_token.get()
+    return [token.future] if token is not None else []
@@ -0,0 +1,187 @@
+"""
+Byte-budgeted, content-addressed text store used by the web scraper caches.
+
+Entries are keys pointing at shared blobs (keyed by a hash of the text), so
+the same site snapshot cached under many query keys is held in memory once.
+Least-recently-used entries are evicted when the byte budget is exceeded,
+and blobs idle for longer than `compress_idle_seconds` are zlib-compressed.
+Cold blobs are looked for at most every `compress_idle_seconds / 4` and
+compressed outside the lock, so puts do not wait on zlib.
+"""
+import hashlib
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+
+@dataclass
+class _Blob:
+    data: Any  # str when hot, zlib-compressed bytes when cold
+    compressed: bool
+    refs: int
+    size: int
+    last_access: float
+
+
+@dataclass
+class _Entry:
+    stored_at: float
+    digest: str
+    key_size: int
+
+
+def _key_size(key: Hashable) -> int:
+    """getsizeof of the key plus, for tuple keys, the strings they hold."""
+    size = sys.getsizeof(key)
+    if isinstance(key, tuple):
+        size += sum(_key_size(part) for part in key)
+    return size
+
+
+def _text_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
+
+
+class ContentStore:
+    def __init__(
+        self,
+        max_bytes: int,
+        compress_idle_seconds: Optional[float] = None,
+        compress_min_bytes: int = 4096,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.compress_idle_seconds = compress_idle_seconds
+        self.compress_min_bytes = compress_min_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._blobs: dict[str, _Blob] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._next_compress_scan = 0.0
+
+    def get(self, key: Hashable, ttl_seconds: Optional[float] = None) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if ttl_seconds is not None and (now - entry.stored_at) > ttl_seconds:
+                self._drop_entry(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            blob = self._blobs[entry.digest]
+            blob.last_access = now
+            if blob.compressed:
+                self._inflate(blob)
+            self._hits += 1
+            return blob.data
+
+    def put(self, key: Hashable, text: str, stored_at: Optional[float] = None) -> None:
+        """`stored_at` backdates the entry's age for TTL checks (default: now)."""
+        text = text or ""
+        digest = _text_digest(text)
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._drop_entry(key)
+
+            blob = self._blobs.get(digest)
+            if blob is None:
+                blob = _Blob(data=text, compressed=False, refs=0, size=sys.getsizeof(text), last_access=now)
+                self._blobs[digest] = blob
+                self._bytes += blob.size
+            blob.refs += 1
+            blob.last_access = now
+
+            key_size = _key_size(key)
+            stored_at = now if stored_at is None else stored_at
+            self._entries[key] = _Entry(stored_at=stored_at, digest=digest, key_size=key_size)
+            self._bytes += key_size
+
+            self._evict_over_budget(protect=key)
+            cold = self._take_cold_blobs(now)
+        self._compress(cold)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop_entry(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._blobs.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "entries": len(self._entries),
+                "blobs": len(self._blobs),
+                "compressed_blobs": sum(1 for blob in self._blobs.values() if blob.compressed),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+    # Internal helpers below expect self._lock to be held.
+
+    def _drop_entry(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.key_size
+        blob = self._blobs.get(entry.digest)
+        if blob is None:
+            return
+        blob.refs -= 1
+        if blob.refs <= 0:
+            del self._blobs[entry.digest]
+            self._bytes -= blob.size
+
+    def _evict_over_budget(self, protect: Hashable) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            if oldest_key == protect:
+                # A single entry larger than the budget is kept until the next put.
+                break
+            self._drop_entry(oldest_key)
+            self._evictions += 1
+
+    def _inflate(self, blob: _Blob) -> None:
+        text = zlib.decompress(blob.data).decode("utf-8")
+        new_size = sys.getsizeof(text)
+        self._bytes += new_size - blob.size
+        blob.data, blob.compressed, blob.size = text, False, new_size
+
+    def _take_cold_blobs(self, now: float) -> list[tuple[str, _Blob, str, float]]:
+        if self.compress_idle_seconds is None or now < self._next_compress_scan:
+            return []
+        self._next_compress_scan = now + self.compress_idle_seconds / 4
+        return [
+            (digest, blob, blob.data, blob.last_access)
+            for digest, blob in self._blobs.items()
+            if not blob.compressed
+            and blob.size >= self.compress_min_bytes
+            and (now - blob.last_access) >= self.compress_idle_seconds
+        ]
+
+    # Called without the lock: zlib runs unlocked and each result is swapped
+    # in only if the blob is still stored and has not been read meanwhile.
+    def _compress(self, cold: list[tuple[str, _Blob, str, float]]) -> None:
+        for digest, blob, text, last_access in cold:
+            packed = zlib.compress(text.encode("utf-8"), 6)
+            new_size = sys.getsizeof(packed)
+            with self._lock:
+                if self._blobs.get(digest) is not blob or blob.compressed or blob.last_access != last_access:
+                    continue
+                self._bytes += new_size - blob.size
+                blob.data, blob.compressed, blob.size = packed, True, new_size
@@ -0,0 +1,87 @@
+"""
+End-to-end request deadlines.
+
+The endpoint creates one Deadline per request and makes it current in a
+ContextVar (alongside the request timings and cancellation token), so
+chat_service, web_scraper and genai_adapter see it without threading it
+through every signature. Each outbound call asks `call_timeout()` for its
+budget: the smaller of its own adaptive timeout and the time left. A call
+whose typical latency no longer fits in the time left is not started.
+"""
+import contextvars
+import time
+from typing import Optional, Union
+
+from app.utils.latency import AdaptiveTimeout
+from app.utils.metrics import metrics
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised instead of starting a call that cannot finish before the request deadline."""
+
+
+class Deadline:
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "request_deadline",
+    default=None,
+)
+
+
+def begin_deadline(seconds: float) -> Deadline:
+    """Start the current request's deadline `seconds` from now."""
+    deadline = Deadline(seconds)
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def remaining_seconds() -> Optional[float]:
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def effective_deadline(deadline: Union[Deadline, float, None] = None) -> Optional[float]:
+    """
+    Absolute time.monotonic() value for a call: the earlier of the explicit
+    `deadline` (a Deadline or a monotonic float) and the request deadline.
+    """
+    candidates = []
+    if isinstance(deadline, Deadline):
+        candidates.append(deadline.at)
+    elif deadline is not None:
+        candidates.append(float(deadline))
+    request_deadline = _current_deadline.get()
+    if request_deadline is not None:
+        candidates.append(request_deadline.at)
+    return min(candidates) if candidates else None
+
+
+def call_timeout(stage: str, policy: AdaptiveTimeout) -> float:
+    """
+    Timeout for one call: min(adaptive timeout, time left on the request).
+    Raises DeadlineExceededError when the time left is below the call's
+    typical latency, so it is not started at all.
+    """
+    timeout = policy.seconds()
+    remaining = remaining_seconds()
+    if remaining is None:
+        return timeout
+    if remaining < policy.expected():
+        metrics.inc("deadline_skipped_calls_total", stage=stage)
+        raise DeadlineExceededError(f"{stage} skipped: {max(0.0, remaining):.2f}s left on the request")
+    return min(timeout, remaining)
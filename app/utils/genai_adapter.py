@@ -1,15 +1,24 @@
 import asyncio
+import hashlib
 import importlib.util
 import logging
 import threading
+import time
 import warnings
-from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Any, AsyncGenerator
-
-from langchain_core.embeddings import Embeddings
+from typing import Any, AsyncGenerator, Callable, Optional, Union
 
 from app.core.config import settings
+from app.utils.cancellation import cancellation_waitables, current_cancellation_token, raise_if_cancelled
+from app.utils.deadline import Deadline, DeadlineExceededError, effective_deadline
+from app.utils.latency import AdaptiveTimeout, LatencyTracker
+from app.utils.llm_gate import GATE_QUEUE_TIMEOUT_SECONDS, get_gate
+from app.utils.llm_scheduler import Priority
+from app.utils.metrics import metrics, span
+from app.utils.request_timing import context_bound
+from app.utils.shared_cache import VECTOR_CODEC, TieredCache, cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +39,99 @@ class LLMResponse:
     content: str
 
 
+class GenerationTimeoutError(DeadlineExceededError):
+    """Raised when a Gemini call cannot finish before its deadline."""
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Fire a duplicate request when the first one has produced no result (or,
+    when streaming, no first token) by the given latency percentile.
+    `max_hedge_ratio` caps duplicates as a share of all calls.
+    """
+    percentile: float = 90.0
+    min_delay_seconds: float = 1.0
+    max_delay_seconds: float = 10.0
+    default_delay_seconds: float = 3.0
+    max_hedge_ratio: float = 0.1
+    _calls: int = field(default=0, init=False, repr=False)
+    _hedges: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def delay(self, tracker: LatencyTracker) -> float:
+        observed = tracker.percentile(self.percentile, default=self.default_delay_seconds)
+        return min(self.max_delay_seconds, max(self.min_delay_seconds, observed))
+
+    def record_call(self) -> None:
+        with self._lock:
+            self._calls += 1
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._hedges + 1 > self.max_hedge_ratio * self._calls + 1:
+                return False
+            self._hedges += 1
+            return True
+
+
+# Whole-generation timeouts adapt to observed latency within these bounds;
+# before enough calls are seen, GENERATION_TIMEOUT_SECONDS applies.
+GENERATION_TIMEOUT_SECONDS = 25.0
+MIN_GENERATION_TIMEOUT_SECONDS = 2.0
+
+
+def default_hedge_policy() -> Optional[HedgePolicy]:
+    return HedgePolicy() if settings.GEMINI_HEDGING_ENABLED else None
+
+
+_generation_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="gemini")
+# Background calls queue on their own small pool so they never hold the
+# threads interactive requests need.
+_background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gemini-bg")
+# Latency history per (model, purpose, kind): short extraction calls must not
+# set the timeout of full answers on the same model.
+_latency_trackers: dict[tuple[str, str, str], LatencyTracker] = {}
+_latency_trackers_lock = threading.Lock()
+
+
+def _latency_tracker(model: str, purpose: str, kind: str) -> LatencyTracker:
+    with _latency_trackers_lock:
+        tracker = _latency_trackers.get((model, purpose, kind))
+        if tracker is None:
+            tracker = _latency_trackers[(model, purpose, kind)] = LatencyTracker()
+        return tracker
+
+
+def _record_failure(tracker: LatencyTracker, seconds: float, error: Optional[BaseException]) -> None:
+    # An HTTP timeout from the SDK is as censored as our own deadline.
+    if isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower():
+        tracker.record_timeout(seconds)
+    else:
+        tracker.record(seconds, success=False)
+
+
+def _remaining_seconds(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _gate_queue_timeout(deadline: Optional[float]) -> float:
+    remaining = _remaining_seconds(deadline)
+    if remaining is None:
+        return GATE_QUEUE_TIMEOUT_SECONDS
+    return max(0.0, min(GATE_QUEUE_TIMEOUT_SECONDS, remaining))
+
+
+def _wait_timeout(deadline: Optional[float], hedge_at: Optional[float]) -> Optional[float]:
+    candidates = [_remaining_seconds(deadline)]
+    if hedge_at is not None:
+        candidates.append(hedge_at - time.monotonic())
+    candidates = [value for value in candidates if value is not None]
+    return max(0.0, min(candidates)) if candidates else None
+
+
 def _message_to_text(message: Any) -> str:
     role = getattr(message, "type", "user")
     content = getattr(message, "content", "")
@@ -94,6 +196,13 @@ def get_genai_client() -> Any:
         raise ImportError("google.genai is not installed in this environment.")
     from google import genai
 
+    if settings.GEMINI_BASE_URL:
+        from google.genai import types
+
+        return genai.Client(
+            api_key=settings.GEMINI_API_KEY,
+            http_options=types.HttpOptions(base_url=settings.GEMINI_BASE_URL),
+        )
     return genai.Client(api_key=settings.GEMINI_API_KEY)
 
 
@@ -105,12 +214,18 @@ class GeminiChatModel:
         max_output_tokens: int = 1200,
         top_p: float = 0.95,
         top_k: int = 40,
+        hedge_policy: Optional[HedgePolicy] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        purpose: str = "answer",
     ) -> None:
         self.model = model
         self.temperature = temperature
         self.max_output_tokens = max_output_tokens
         self.top_p = top_p
         self.top_k = top_k
+        self.hedge_policy = hedge_policy
+        self.priority = priority
+        self.purpose = purpose
         self._fallback_llm: Any = None
 
         if not _google_genai_available():
@@ -137,31 +252,178 @@ class GeminiChatModel:
                 request_timeout=20,
             )
 
-    def _config(self) -> Any:
+    def _config(self, timeout_seconds: Optional[float] = None) -> Any:
         from google.genai import types
 
+        http_options = None
+        if timeout_seconds is not None:
+            http_options = types.HttpOptions(timeout=max(1, int(timeout_seconds * 1000)))
         return types.GenerateContentConfig(
             temperature=self.temperature,
             max_output_tokens=self.max_output_tokens,
             top_p=self.top_p,
             top_k=self.top_k,
+            http_options=http_options,
         )
 
-    def invoke(self, messages_or_text: Any) -> LLMResponse:
+    def _generate_once(self, prompt: str, deadline: Optional[float], priority: Priority) -> str:
+        raise_if_cancelled("gemini_generate")
+        with get_gate("generate").slot(
+            priority, timeout=_gate_queue_timeout(deadline), latency_key=f"{self.purpose}:invoke"
+        ):
+            client = get_genai_client()
+            response = client.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=self._config(_remaining_seconds(deadline)),
+            )
+        return _extract_text_from_chunk(response)
+
+    def _call_deadline(
+        self,
+        kind: str,
+        deadline: Union[Deadline, float, None],
+        adaptive: bool = True,
+    ) -> Optional[float]:
+        """
+        Absolute deadline for one call: the earliest of the caller's deadline,
+        the request deadline and, for whole generations, the adaptive timeout.
+        Raises GenerationTimeoutError rather than start a call whose typical
+        latency no longer fits in the caller's or the request's time left;
+        the adaptive timeout alone never rules a call out.
+        """
+        policy = AdaptiveTimeout(
+            _latency_tracker(self.model, self.purpose, kind),
+            default=GENERATION_TIMEOUT_SECONDS,
+            minimum=MIN_GENERATION_TIMEOUT_SECONDS,
+            maximum=GENERATION_TIMEOUT_SECONDS,
+        )
+        now = time.monotonic()
+        at = effective_deadline(deadline)
+        if at is not None and at - now < policy.expected():
+            metrics.inc("deadline_skipped_calls_total", stage=f"gemini_{kind}")
+            raise self._deadline_exceeded(kind)
+        if adaptive:
+            adaptive_at = now + policy.seconds()
+            at = adaptive_at if at is None else min(at, adaptive_at)
+        return at
+
+    def _deadline_exceeded(self, kind: str) -> GenerationTimeoutError:
+        metrics.inc("gemini_deadline_exceeded_total", model=self.model, kind=kind)
+        return GenerationTimeoutError(f"Gemini {kind} call for {self.model} exceeded its deadline")
+
+    def _run_hedged(
+        self,
+        call: Callable[[Optional[float]], str],
+        deadline: Optional[float],
+        executor: ThreadPoolExecutor,
+    ) -> str:
+        """Run `call(deadline)` on `executor`, hedging it per self.hedge_policy."""
+        kind = "invoke"
+        tracker = _latency_tracker(self.model, self.purpose, kind)
+        policy = self.hedge_policy
+        metrics.inc("gemini_requests_total", model=self.model, kind=kind)
+
+        start = time.monotonic()
+        remaining = _remaining_seconds(deadline)
+        if remaining is not None and remaining <= 0:
+            raise self._deadline_exceeded(kind)
+
+        token = current_cancellation_token()
+        futures = {executor.submit(context_bound(call), deadline): "primary"}
+        hedge_at: Optional[float] = None
+        if policy is not None:
+            policy.record_call()
+            hedge_at = start + policy.delay(tracker)
+        first_error: Optional[BaseException] = None
+
+        while futures:
+            done, _ = wait(
+                [*futures, *cancellation_waitables()],
+                timeout=_wait_timeout(deadline, hedge_at),
+                return_when=FIRST_COMPLETED,
+            )
+            if token is not None and token.cancelled:
+                # The request is gone; leave the in-flight call to finish on its own.
+                for pending in futures:
+                    pending.cancel()
+                token.raise_if_cancelled(f"gemini_{kind}")
+            for future in done:
+                role = futures.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    first_error = first_error or exc
+                    continue
+                elapsed = time.monotonic() - start
+                tracker.record(elapsed)
+                metrics.observe("gemini_generation_seconds", elapsed, model=self.model, kind=kind)
+                if role == "hedge":
+                    metrics.inc("gemini_hedge_wins_total", model=self.model, kind=kind)
+                for pending in futures:
+                    pending.cancel()
+                return future.result()
+
+            if not futures:
+                break
+            remaining = _remaining_seconds(deadline)
+            if remaining is not None and remaining <= 0:
+                tracker.record_timeout(time.monotonic() - start)
+                raise self._deadline_exceeded(kind)
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                if policy.try_acquire():
+                    logger.info("Hedging slow Gemini call for %s", self.model)
+                    metrics.inc("gemini_hedged_requests_total", model=self.model, kind=kind)
+                    futures[executor.submit(context_bound(call), deadline)] = "hedge"
+
+        _record_failure(tracker, time.monotonic() - start, first_error)
+        metrics.inc("gemini_errors_total", model=self.model, kind=kind)
+        raise first_error
+
+    def invoke(
+        self,
+        messages_or_text: Any,
+        deadline: Union[Deadline, float, None] = None,
+        priority: Optional[Priority] = None,
+    ) -> LLMResponse:
+        """
+        `deadline` is a Deadline or an absolute `time.monotonic()` value. The
+        call is further bounded by the request deadline and an adaptive
+        timeout, and raises GenerationTimeoutError once that passes.
+        `priority` defaults to the model's own scheduling class.
+        """
+        priority = self.priority if priority is None else priority
+        deadline = self._call_deadline("invoke", deadline)
         if self._fallback_llm is not None:
-            response = self._fallback_llm.invoke(messages_or_text)
+            raise_if_cancelled("gemini_generate")
+            with get_gate("generate").slot(
+                priority, timeout=_gate_queue_timeout(deadline), latency_key=f"{self.purpose}:invoke"
+            ):
+                response = self._fallback_llm.invoke(messages_or_text)
             return LLMResponse(content=_extract_text_from_chunk(getattr(response, "content", response)).strip())
 
         prompt = _messages_to_prompt(messages_or_text)
-        client = get_genai_client()
-        response = client.models.generate_content(
-            model=self.model,
-            contents=prompt,
-            config=self._config(),
+        executor = _background_executor if priority == Priority.BACKGROUND else _generation_executor
+        text = self._run_hedged(
+            lambda call_deadline: self._generate_once(prompt, call_deadline, priority),
+            deadline,
+            executor,
         )
-        return LLMResponse(content=_extract_text_from_chunk(response).strip())
+        return LLMResponse(content=text.strip())
 
-    async def astream(self, messages_or_text: Any) -> AsyncGenerator[LLMResponse, None]:
+    async def astream(
+        self,
+        messages_or_text: Any,
+        deadline: Union[Deadline, float, None] = None,
+        priority: Optional[Priority] = None,
+    ) -> AsyncGenerator[LLMResponse, None]:
+        # Stream length varies too much for an adaptive total; only the
+        # caller's and the request's deadlines bound it.
+        deadline = self._call_deadline("ttft", deadline, adaptive=False)
+        if priority is None:
+            # Streaming answers are what a visitor watches; only explicitly
+            # background models keep their class.
+            priority = self.priority if self.priority == Priority.BACKGROUND else Priority.INTERACTIVE_STREAM
         if self._fallback_llm is not None:
             async for chunk in self._fallback_llm.astream(messages_or_text):
                 chunk_text = _extract_text_from_chunk(getattr(chunk, "content", chunk))
@@ -169,41 +431,167 @@ class GeminiChatModel:
                     yield LLMResponse(content=chunk_text)
             return
 
+        kind = "stream"
         prompt = _messages_to_prompt(messages_or_text)
         queue: asyncio.Queue[Any] = asyncio.Queue()
         done = object()
         loop = asyncio.get_running_loop()
+        stop_events: list[threading.Event] = []
+        token = current_cancellation_token()
+        if token is not None:
+            token.raise_if_cancelled("gemini_stream")
+
+            def _wake_on_cancel() -> None:
+                # Producers check the token themselves; this wakes the consumer.
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, (None, done))
+                except RuntimeError:
+                    pass
+
+        def _start_producer(stream_id: int) -> None:
+            stop = threading.Event()
+            stop_events.append(stop)
+
+            def _post(item: Any) -> None:
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, (stream_id, item))
+                except RuntimeError:
+                    pass  # the loop is closed; nobody is consuming any more
+
+            def _producer() -> None:
+                try:
+                    with get_gate("generate").slot(
+                        priority, timeout=_gate_queue_timeout(deadline), latency_key=f"{self.purpose}:ttft"
+                    ) as slot:
+                        client = get_genai_client()
+                        for chunk in client.models.generate_content_stream(
+                            model=self.model,
+                            contents=prompt,
+                            config=self._config(_remaining_seconds(deadline)),
+                        ):
+                            if stop.is_set() or (token is not None and token.cancelled):
+                                break
+                            text = _extract_text_from_chunk(chunk)
+                            if text:
+                                slot.first_token()
+                                _post(text)
+                except Exception as exc:
+                    _post(exc)
+                finally:
+                    _post(done)
+
+            threading.Thread(target=_producer, daemon=True).start()
+
+        tracker = _latency_tracker(self.model, self.purpose, "ttft")
+        policy = self.hedge_policy
+        metrics.inc("gemini_requests_total", model=self.model, kind=kind)
+        start = time.monotonic()
+        remaining = _remaining_seconds(deadline)
+        if remaining is not None and remaining <= 0:
+            raise self._deadline_exceeded(kind)
+
+        _start_producer(0)
+        active = {0}
+        winner: Optional[int] = None
+        hedge_at: Optional[float] = None
+        if policy is not None:
+            policy.record_call()
+            hedge_at = start + policy.delay(tracker)
+        first_error: Optional[BaseException] = None
+
+        if token is not None:
+            token.add_callback(_wake_on_cancel)
+        try:
+            while True:
+                timeout = _wait_timeout(deadline, hedge_at if winner is None else None)
+                try:
+                    if timeout is not None:
+                        stream_id, item = await asyncio.wait_for(queue.get(), timeout=timeout)
+                    else:
+                        stream_id, item = await queue.get()
+                except asyncio.TimeoutError as exc:
+                    remaining = _remaining_seconds(deadline)
+                    if remaining is not None and remaining <= 0:
+                        if winner is None:
+                            tracker.record_timeout(time.monotonic() - start)
+                        raise self._deadline_exceeded(kind) from exc
+                    if winner is None and hedge_at is not None and time.monotonic() >= hedge_at:
+                        hedge_at = None
+                        if policy.try_acquire():
+                            logger.info("Hedging Gemini stream with no first token for %s", self.model)
+                            metrics.inc("gemini_hedged_requests_total", model=self.model, kind=kind)
+                            _start_producer(1)
+                            active.add(1)
+                    continue
+
+                if stream_id is None:
+                    token.raise_if_cancelled("gemini_stream")
+                    continue
+                if winner is not None and stream_id != winner:
+                    continue
+                if item is done:
+                    active.discard(stream_id)
+                    if winner is not None or not active:
+                        break
+                    continue
+                if isinstance(item, Exception):
+                    if winner is not None:
+                        metrics.inc("gemini_errors_total", model=self.model, kind=kind)
+                        raise item
+                    first_error = first_error or item
+                    continue
+
+                if winner is None:
+                    winner = stream_id
+                    for index, stop in enumerate(stop_events):
+                        if index != winner:
+                            stop.set()
+                    ttft = time.monotonic() - start
+                    tracker.record(ttft)
+                    metrics.observe("gemini_ttft_seconds", ttft, model=self.model)
+                    if winner != 0:
+                        metrics.inc("gemini_hedge_wins_total", model=self.model, kind=kind)
+                yield LLMResponse(content=str(item))
+
+            if winner is None and first_error is not None:
+                _record_failure(tracker, time.monotonic() - start, first_error)
+                metrics.inc("gemini_errors_total", model=self.model, kind=kind)
+                raise first_error
+            metrics.observe("gemini_generation_seconds", time.monotonic() - start, model=self.model, kind=kind)
+        finally:
+            if token is not None:
+                token.remove_callback(_wake_on_cancel)
+            for stop in stop_events:
+                stop.set()
+
+
+# Query embeddings are deterministic per model and text, so repeated and
+# popular questions skip the embedding call in every worker.
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+_query_embeddings = TieredCache(
+    "query_embeddings",
+    max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    codec=VECTOR_CODEC,
+)
 
-        def _producer() -> None:
-            try:
-                client = get_genai_client()
-                for chunk in client.models.generate_content_stream(
-                    model=self.model,
-                    contents=prompt,
-                    config=self._config(),
-                ):
-                    text = _extract_text_from_chunk(chunk)
-                    if text:
-                        loop.call_soon_threadsafe(queue.put_nowait, text)
-            except Exception as exc:
-                loop.call_soon_threadsafe(queue.put_nowait, exc)
-            finally:
-                loop.call_soon_threadsafe(queue.put_nowait, done)
-
-        threading.Thread(target=_producer, daemon=True).start()
-
-        while True:
-            item = await queue.get()
-            if item is done:
-                break
-            if isinstance(item, Exception):
-                raise item
-            yield LLMResponse(content=str(item))
 
+class GeminiEmbeddings:
+    """
+    Gemini embeddings with the langchain Embeddings interface. It is declared
+    a (virtual) subclass of langchain_core's Embeddings by
+    register_langchain_embeddings() when a FAISS store is built or loaded,
+    so importing this module does not import langchain_core.
+    """
 
-class GeminiEmbeddings(Embeddings):
-    def __init__(self, model: str = "gemini-embedding-001") -> None:
+    def __init__(
+        self,
+        model: str = "gemini-embedding-001",
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> None:
         self.model = model
+        self.priority = priority
         self._fallback_embeddings: Any = None
         if not _google_genai_available():
             from langchain_google_genai import GoogleGenerativeAIEmbeddings
@@ -226,34 +614,76 @@ class GeminiEmbeddings(Embeddings):
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         if self._fallback_embeddings is not None:
-            return self._fallback_embeddings.embed_documents(texts)
+            with get_gate("embed").slot(self.priority):
+                return self._fallback_embeddings.embed_documents(texts)
 
         if not texts:
             return []
         client = get_genai_client()
         from google.genai import types
 
-        response = client.models.embed_content(
-            model=self.model,
-            contents=texts,
-            config=types.EmbedContentConfig(task_type="RETRIEVAL_DOCUMENT"),
-        )
+        with get_gate("embed").slot(self.priority):
+            response = client.models.embed_content(
+                model=self.model,
+                contents=texts,
+                config=types.EmbedContentConfig(task_type="RETRIEVAL_DOCUMENT"),
+            )
         embeddings = getattr(response, "embeddings", None) or []
         return [self._extract_vector(item) for item in embeddings]
 
+    def _query_cache_key(self, text: str) -> str:
+        return cache_key(self.model, hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest())
+
     def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """
+        Query embeddings for several texts: cached ones come from the query
+        embedding cache, the rest are fetched in one embed_content call.
+        """
+        raise_if_cancelled("embed")
+        keys = [self._query_cache_key(text) for text in texts]
+        vectors: list[Optional[list[float]]] = [_query_embeddings.get(key) for key in keys]
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with span("embed"):
+                fetched = self._embed_queries([texts[index] for index in missing])
+            for index, vector in zip(missing, fetched):
+                vectors[index] = vector
+                if vector:
+                    _query_embeddings.set(keys[index], vector)
+        return [vector or [] for vector in vectors]
+
+    def _embed_queries(self, texts: list[str]) -> list[list[float]]:
         if self._fallback_embeddings is not None:
-            return self._fallback_embeddings.embed_query(text)
+            with get_gate("embed").slot(self.priority):
+                return [self._fallback_embeddings.embed_query(text) for text in texts]
 
         client = get_genai_client()
         from google.genai import types
 
-        response = client.models.embed_content(
-            model=self.model,
-            contents=[text],
-            config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY"),
-        )
+        with get_gate("embed").slot(self.priority):
+            response = client.models.embed_content(
+                model=self.model,
+                contents=texts,
+                config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY"),
+            )
+        metrics.observe("embed_batch_texts", len(texts), model=self.model)
         embeddings = getattr(response, "embeddings", None) or []
-        if not embeddings:
-            return []
-        return self._extract_vector(embeddings[0])
+        vectors = [self._extract_vector(item) for item in embeddings]
+        return vectors + [[] for _ in range(len(texts) - len(vectors))]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+@lru_cache(maxsize=1)
+def register_langchain_embeddings() -> None:
+    """Make GeminiEmbeddings pass langchain's isinstance(..., Embeddings) checks."""
+    from langchain_core.embeddings import Embeddings
+
+    Embeddings.register(GeminiEmbeddings)
@@ -0,0 +1,89 @@
+"""
+Rolling latency/success tracking used to rank providers and derive
+adaptive hedge delays and timeouts from recently observed percentiles.
+"""
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, min_samples: int = 5) -> None:
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)
+
+    def record(self, seconds: float, success: bool = True) -> None:
+        with self._lock:
+            self._outcomes.append(bool(success))
+            if success:
+                self._latencies.append(max(0.0, float(seconds)))
+
+    def record_timeout(self, seconds: float) -> None:
+        """
+        A call abandoned after `seconds`: a failure whose latency was at least
+        that, kept as a sample so timeouts widen adaptive timeouts derived
+        from this tracker instead of dropping out of them.
+        """
+        with self._lock:
+            self._outcomes.append(False)
+            self._latencies.append(max(0.0, float(seconds)))
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return len(self._outcomes)
+
+    def percentile(self, pct: float, default: Optional[float] = None) -> Optional[float]:
+        """
+        Nearest-rank percentile (0-100) of successful and timed-out calls in the window,
+        or `default` until at least `min_samples` have been recorded.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return default
+            ordered = sorted(self._latencies)
+        rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def success_rate(self, default: float = 1.0) -> float:
+        with self._lock:
+            if len(self._outcomes) < self.min_samples:
+                return default
+            return sum(self._outcomes) / len(self._outcomes)
+
+
+class AdaptiveTimeout:
+    """
+    Per-call timeout derived from a tracker: `headroom` times the recent
+    `percentile` latency, clamped to [minimum, maximum]; `default` applies
+    until enough calls have been observed.
+    """
+
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        default: float,
+        minimum: float,
+        maximum: float,
+        percentile: float = 99.0,
+        headroom: float = 1.5,
+    ) -> None:
+        self.tracker = tracker
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.percentile = percentile
+        self.headroom = headroom
+
+    def seconds(self) -> float:
+        observed = self.tracker.percentile(self.percentile)
+        if observed is None:
+            return self.default
+        return min(self.maximum, max(self.minimum, observed * self.headroom))
+
+    def expected(self) -> float:
+        """Typical (median) latency: less time than this is not worth starting a call."""
+        return self.tracker.percentile(50, default=self.minimum)
@@ -0,0 +1,234 @@
+"""
+Shared admission gate for Gemini calls: an AIMD concurrency limiter plus a
+circuit breaker that fails fast while the API is throttling us.
+
+- The limiter grows by ~1 slot per round of successes, halves on 429/503
+  and shrinks gently when latency climbs well above its recent median.
+  Medians are kept per latency key (purpose and call kind), and streams
+  report time to first token, so a long answer stream or a slow extraction
+  prompt is not mistaken for congestion.
+  Slots under that limit are handed out by the PriorityScheduler.
+- The breaker opens after consecutive throttle errors, rejects calls for a
+  cooldown (doubling on repeated trips) and then lets one probe through.
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from app.utils.latency import LatencyTracker
+from app.utils.llm_scheduler import Priority, PriorityScheduler
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+GATE_QUEUE_TIMEOUT_SECONDS = 10.0
+
+_THROTTLE_MARKERS = ("429", "RESOURCE_EXHAUSTED", "quota", "Quota", "503", "UNAVAILABLE")
+
+
+class GeminiCapacityError(RuntimeError):
+    """Raised without calling the API when the gate refuses admission."""
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    if isinstance(exc, GeminiCapacityError):
+        return True
+    code = getattr(exc, "code", None)
+    if code in (429, 503):
+        return True
+    error_str = str(exc)
+    return any(marker in error_str for marker in _THROTTLE_MARKERS)
+
+
+class AIMDLimiter:
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff_ratio: float = 0.5,
+        latency_backoff_ratio: float = 0.9,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_backoff_ratio = latency_backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(initial_limit)
+        self._lock = threading.Lock()
+        self._latency: dict[str, LatencyTracker] = {}
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, math.floor(self._limit))
+
+    def record(self, outcome: str, latency: Optional[float] = None, latency_key: str = "default") -> None:
+        """
+        `outcome` is "success", "throttled" or "error". `latency` is compared
+        with the median of earlier successes under the same `latency_key`.
+        """
+        with self._lock:
+            if outcome == "throttled":
+                self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+            elif outcome == "success" and latency is not None:
+                tracker = self._latency.setdefault(latency_key, LatencyTracker(window=100))
+                baseline = tracker.percentile(50)
+                tracker.record(latency)
+                if baseline is not None and latency > baseline * self.latency_tolerance:
+                    self._limit = max(float(self.min_limit), self._limit * self.latency_backoff_ratio)
+                else:
+                    self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._reset_timeout = reset_timeout
+        self._opened_until = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() >= self._opened_until:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() < self._opened_until:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._reset_timeout = self.base_reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN:
+                self._reset_timeout = min(self.max_reset_timeout, self._reset_timeout * 2)
+            elif self._consecutive_failures < self.failure_threshold:
+                return
+            self._state = self.OPEN
+            self._opened_until = time.monotonic() + self._reset_timeout
+            self._probe_in_flight = False
+            logger.warning("Gemini circuit opened for %.0fs after throttling", self._reset_timeout)
+
+    def record_neutral(self) -> None:
+        # Non-throttle errors neither trip nor close the breaker, but they
+        # must free the half-open probe slot.
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class GateSlot:
+    """
+    Yielded by GeminiGate.slot. A streaming call marks its first token, so
+    the limiter sees time to first token instead of the whole stream.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.monotonic()
+        self.first_token_at: Optional[float] = None
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def latency(self) -> float:
+        end = self.first_token_at if self.first_token_at is not None else time.monotonic()
+        return end - self.start
+
+
+_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+class GeminiGate:
+    def __init__(self, name: str, limiter: AIMDLimiter, breaker: CircuitBreaker) -> None:
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.scheduler = PriorityScheduler(name, limit=lambda: self.limiter.limit)
+
+    def is_open(self) -> bool:
+        return self.breaker.state == CircuitBreaker.OPEN
+
+    def _export_state(self) -> None:
+        metrics.set_gauge("gemini_gate_limit", self.limiter.limit, gate=self.name)
+        metrics.set_gauge("gemini_gate_inflight", self.scheduler.inflight, gate=self.name)
+        metrics.set_gauge("gemini_gate_circuit_state", _STATE_VALUES[self.breaker.state], gate=self.name)
+
+    def _reject(self, reason: str) -> GeminiCapacityError:
+        metrics.inc("gemini_gate_rejected_total", gate=self.name, reason=reason)
+        self._export_state()
+        return GeminiCapacityError(f"Gemini {self.name} gate rejected the call ({reason})")
+
+    @contextmanager
+    def slot(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = GATE_QUEUE_TIMEOUT_SECONDS,
+        latency_key: str = "default",
+    ) -> Iterator[GateSlot]:
+        if not self.breaker.allow():
+            raise self._reject("circuit_open")
+        if not self.scheduler.acquire(priority, timeout):
+            self.breaker.record_neutral()
+            raise self._reject("queue_timeout")
+        self._export_state()
+
+        slot = GateSlot()
+        try:
+            yield slot
+        except BaseException as exc:
+            if is_throttle_error(exc):
+                metrics.inc("gemini_throttled_total", gate=self.name)
+                self.limiter.record("throttled")
+                self.breaker.record_failure()
+            else:
+                self.limiter.record("error")
+                self.breaker.record_neutral()
+            raise
+        else:
+            self.limiter.record("success", slot.latency(), latency_key)
+            self.breaker.record_success()
+        finally:
+            self.scheduler.release(priority)
+            self._export_state()
+
+
+@lru_cache(maxsize=None)
+def get_gate(name: str) -> GeminiGate:
+    """One process-wide gate per Gemini API family ("generate", "embed")."""
+    return GeminiGate(name, AIMDLimiter(), CircuitBreaker())
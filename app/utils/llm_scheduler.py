@@ -0,0 +1,126 @@
+"""
+Priority-aware admission for Gemini calls.
+
+Callers wait for a slot under the gate's current concurrency limit. Waiters
+are served by priority class, then earliest deadline. Each class may hold at
+most its share of the limit, so background work never takes the capacity
+an interactive first token is waiting for.
+"""
+import bisect
+import itertools
+import math
+import threading
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, Optional
+
+from app.utils.metrics import metrics
+
+
+class Priority(IntEnum):
+    INTERACTIVE_STREAM = 0  # visitor is waiting on the first SSE token
+    INTERACTIVE = 1         # non-streaming answers and in-request fallbacks
+    BACKGROUND = 2          # cache warming, prewarm, ingest
+
+
+DEFAULT_SHARES: dict[Priority, float] = {
+    Priority.INTERACTIVE_STREAM: 1.0,
+    Priority.INTERACTIVE: 0.75,
+    Priority.BACKGROUND: 0.25,
+}
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    deadline: float
+    seq: int
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        name: str,
+        limit: Callable[[], int],
+        shares: Optional[dict[Priority, float]] = None,
+    ) -> None:
+        self.name = name
+        self._limit = limit
+        self.shares = dict(DEFAULT_SHARES if shares is None else shares)
+        self._cond = threading.Condition()
+        self._waiters: list[_Waiter] = []
+        self._inflight: dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._seq = itertools.count()
+
+    @property
+    def inflight(self) -> int:
+        return sum(self._inflight.values())
+
+    def _class_cap(self, priority: Priority, limit: int) -> int:
+        cap = math.floor(self.shares.get(priority, 1.0) * limit)
+        if priority != Priority.BACKGROUND:
+            return max(1, cap)
+        if cap == 0 and not self._interactive_pending():
+            # Let background work trickle through while nobody interactive is
+            # running or queued, so a throttled limit cannot starve it forever.
+            return 1
+        return cap
+
+    def _interactive_pending(self) -> bool:
+        if any(self._inflight[p] for p in Priority if p != Priority.BACKGROUND):
+            return True
+        return any(w.priority != Priority.BACKGROUND for w in self._waiters)
+
+    def _eligible(self, priority: Priority, limit: int) -> bool:
+        return self._inflight[priority] < self._class_cap(priority, limit)
+
+    def _can_admit(self, waiter: _Waiter) -> bool:
+        limit = self._limit()
+        if self.inflight >= limit:
+            return False
+        for other in self._waiters:
+            if not self._eligible(Priority(other.priority), limit):
+                continue
+            return other is waiter
+        return False
+
+    def acquire(self, priority: Priority, timeout: Optional[float] = None) -> bool:
+        start = time.monotonic()
+        deadline = math.inf if timeout is None else start + timeout
+        waiter = _Waiter(priority=int(priority), deadline=deadline, seq=next(self._seq))
+        with self._cond:
+            bisect.insort(self._waiters, waiter)
+            self._export_state()
+            try:
+                while not self._can_admit(waiter):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(None if remaining == math.inf else remaining)
+                self._inflight[priority] += 1
+            finally:
+                self._waiters.remove(waiter)
+                self._export_state()
+                # Queue order changed either way; let the next waiter re-check.
+                self._cond.notify_all()
+        metrics.observe(
+            "llm_scheduler_queue_wait_seconds",
+            time.monotonic() - start,
+            gate=self.name,
+            priority=priority.name.lower(),
+        )
+        return True
+
+    def release(self, priority: Priority) -> None:
+        with self._cond:
+            self._inflight[priority] = max(0, self._inflight[priority] - 1)
+            self._export_state()
+            self._cond.notify_all()
+
+    def _export_state(self) -> None:
+        for priority in Priority:
+            label = priority.name.lower()
+            metrics.set_gauge("llm_scheduler_inflight", self._inflight[priority], gate=self.name, priority=label)
+            depth = sum(1 for w in self._waiters if w.priority == priority)
+            metrics.set_gauge("llm_scheduler_queue_depth", depth, gate=self.name, priority=label)
@@ -0,0 +1,210 @@
+"""
+Minimal in-process metrics registry (counters, gauges, histograms).
+
+Kept dependency-free on purpose: values live in this process only and are
+exposed in Prometheus text format by `render_prometheus()` and as rolling
+percentiles by `summary()`.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from app.utils.request_timing import current_request_timings
+
+LabelKey = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _label_key(labels: dict[str, object]) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _percentile(ordered: list[float], pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class _Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int]
+    total: float = 0.0
+    count: int = 0
+    recent: deque = field(default_factory=lambda: deque(maxlen=1024))
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[LabelKey, float]] = {}
+        self._gauges: dict[str, dict[LabelKey, float]] = {}
+        self._histograms: dict[str, dict[LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = float(value)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Optional[tuple[float, ...]] = None,
+        **labels: object,
+    ) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                bounds = buckets or DEFAULT_BUCKETS
+                hist = series[key] = _Histogram(buckets=bounds, counts=[0] * len(bounds))
+            hist.observe(float(value))
+
+    def counter_value(self, name: str, **labels: object) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._gauges):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in sorted(self._gauges[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(hist.total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict[str, dict]:
+        """
+        JSON-friendly view: rolling p50/p95/p99 (over the most recent
+        observations) per histogram series, plus current counters and gauges.
+        """
+        with self._lock:
+            histograms = {
+                name: [
+                    (dict(key), hist.count, hist.total, sorted(hist.recent))
+                    for key, hist in sorted(series.items())
+                ]
+                for name, series in self._histograms.items()
+            }
+            counters = {name: sorted(series.items()) for name, series in self._counters.items()}
+            gauges = {name: sorted(series.items()) for name, series in self._gauges.items()}
+
+        return {
+            "histograms": {
+                name: [
+                    {
+                        "labels": labels,
+                        "count": count,
+                        "mean": (total / count) if count else None,
+                        "p50": _percentile(recent, 50),
+                        "p95": _percentile(recent, 95),
+                        "p99": _percentile(recent, 99),
+                    }
+                    for labels, count, total, recent in rows
+                ]
+                for name, rows in sorted(histograms.items())
+            },
+            "counters": {
+                name: [{"labels": dict(key), "value": value} for key, value in rows]
+                for name, rows in sorted(counters.items())
+            },
+            "gauges": {
+                name: [{"labels": dict(key), "value": value} for key, value in rows]
+                for name, rows in sorted(gauges.items())
+            },
+        }
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                "counters": {name: dict(series) for name, series in self._counters.items()},
+                "gauges": {name: dict(series) for name, series in self._gauges.items()},
+                "histograms": {
+                    name: {
+                        key: {
+                            "buckets": hist.buckets,
+                            "counts": list(hist.counts),
+                            "sum": hist.total,
+                            "count": hist.count,
+                            "recent": list(hist.recent),
+                        }
+                        for key, hist in series.items()
+                    }
+                    for name, series in self._histograms.items()
+                },
+            }
+
+
+metrics = MetricsRegistry()
+
+
+def record_stage(stage: str, seconds: float, **labels: object) -> None:
+    """Record a stage duration globally and on the current request's timings."""
+    metrics.observe("stage_duration_seconds", seconds, stage=stage, **labels)
+    timings = current_request_timings()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str, **labels: object) -> Iterator[None]:
+    """Time a request-path stage into the `stage_duration_seconds` histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, **labels)
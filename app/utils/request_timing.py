@@ -0,0 +1,81 @@
+"""
+Per-request stage timings, used for Server-Timing headers and SSE timing
+events. The collector lives in a context variable so stage spans anywhere
+on the request path can add to it; work handed to thread pools must be
+wrapped with `context_bound` to carry it along.
+"""
+import contextvars
+import functools
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Server-Timing metric -> internal stage names summed into it.
+SERVER_TIMING_GROUPS: dict[str, tuple[str, ...]] = {
+    "intent": ("intent",),
+    "cache": ("cache",),
+    "retrieve": ("retrieve",),
+    "web": ("web_search", "external_search"),
+    "llm": ("llm",),
+    "fallback": ("fallback_upgrade", "fallback_general"),
+}
+
+
+class RequestTimings:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._stages: dict[str, float] = {}
+        self._marks: dict[str, float] = {}
+
+    def mark(self, name: str) -> None:
+        """Remember the elapsed time at a milestone (e.g. context ready)."""
+        self._marks[name] = self.elapsed_ms()
+
+    def marks(self) -> dict[str, float]:
+        return dict(self._marks)
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 1)
+
+    def grouped_ms(self) -> dict[str, float]:
+        with self._lock:
+            stages = dict(self._stages)
+        grouped: dict[str, float] = {}
+        for name, members in SERVER_TIMING_GROUPS.items():
+            present = [stages[m] for m in members if m in stages]
+            if present:
+                grouped[name] = round(sum(present) * 1000, 1)
+        return grouped
+
+    def breakdown(self) -> dict[str, float]:
+        return {**self.grouped_ms(), "total": self.elapsed_ms()}
+
+    def server_timing_header(self) -> str:
+        return ", ".join(f"{name};dur={value}" for name, value in self.breakdown().items())
+
+
+_current_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings",
+    default=None,
+)
+
+
+def begin_request_timings(timings: Optional[RequestTimings] = None) -> RequestTimings:
+    """Make `timings` (or a fresh collector) current for this request's context."""
+    timings = timings or RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def current_request_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+def context_bound(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind `fn` to a copy of the caller's context before handing it to a thread."""
+    return functools.partial(contextvars.copy_context().run, fn)
@@ -0,0 +1,128 @@
+"""
+Per-session conversation state for multi-turn chats.
+
+Keeps, for each session_id, the context the last turn was answered from
+(retrieved chunks and website passages), the topic terms it covered and a
+compact turn history, so a follow-up can reuse or extend that context
+instead of rebuilding it. Sessions are evicted least-recently-used beyond
+`max_sessions` and dropped after `idle_seconds` without a request.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+MAX_SESSIONS = 2000
+SESSION_IDLE_SECONDS = 30 * 60
+MAX_TURNS = 6
+MAX_TURN_CHARS = 400
+# Most recent topic terms kept per session.
+MAX_TOPIC_TERMS = 32
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    """
+    a about all also an and any are as at be but by can could do does did for from
+    get give has have how i if in into is it its just know let me more my need no
+    not of on or our please show so some tell than that the their them then there
+    these they this to us use want was we what when where which who why will with
+    would you your ritz media world rmw
+    """.split()
+)
+
+
+def content_terms(text: str) -> frozenset[str]:
+    """Lower-cased words that carry topic, without stopwords or very short tokens."""
+    return frozenset(
+        term for term in _TERM_RE.findall((text or "").lower()) if len(term) > 2 and term not in _STOPWORDS
+    )
+
+
+def _doc_key(doc: Any) -> str:
+    doc_id = getattr(doc, "id", None)
+    return str(doc_id) if doc_id else str(hash(getattr(doc, "page_content", "")))
+
+
+@dataclass
+class SessionState:
+    docs: list[Any] = field(default_factory=list)
+    doc_ids: list[str] = field(default_factory=list)
+    web_context: str = ""
+    # Newest first, at most MAX_TOPIC_TERMS.
+    topic_terms: tuple[str, ...] = ()
+    turns: deque = field(default_factory=lambda: deque(maxlen=MAX_TURNS))
+    last_seen: float = field(default_factory=time.monotonic)
+
+    def last_user_message(self) -> str:
+        for role, text in reversed(self.turns):
+            if role == "user":
+                return text
+        return ""
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: float = SESSION_IDLE_SECONDS) -> None:
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, session_id: Optional[str]) -> Optional[SessionState]:
+        if not session_id:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            if now - state.last_seen > self.idle_seconds:
+                del self._sessions[session_id]
+                self._expirations += 1
+                return None
+            state.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return state
+
+    def save_context(self, session_id: Optional[str], question: str, docs: list[Any], web_context: str) -> None:
+        """Remember the context a turn was answered from."""
+        if not session_id:
+            return
+        with self._lock:
+            state = self._touch(session_id)
+            state.docs = list(docs)
+            state.doc_ids = [_doc_key(doc) for doc in docs]
+            state.web_context = web_context or ""
+            recent = sorted(content_terms(question))
+            state.topic_terms = tuple(dict.fromkeys([*recent, *state.topic_terms]))[:MAX_TOPIC_TERMS]
+
+    def record_turn(self, session_id: Optional[str], question: str, answer: str) -> None:
+        if not session_id:
+            return
+        with self._lock:
+            state = self._touch(session_id)
+            state.turns.append(("user", (question or "")[:MAX_TURN_CHARS]))
+            state.turns.append(("assistant", (answer or "")[:MAX_TURN_CHARS]))
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def _touch(self, session_id: str) -> SessionState:
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = SessionState()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+        state.last_seen = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return state
+
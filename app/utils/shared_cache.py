@@ -0,0 +1,469 @@
+"""
+Cross-worker cache tier.
+
+Each uvicorn worker keeps its own process-local (L1) caches; this module
+puts an optional shared tier behind them so a result computed by one worker
+is reused by the others. The backend is chosen by SHARED_CACHE_URL:
+
+    ""                          no shared tier (L1 only, the default)
+    sqlite:///data/cache.db     SQLite file in WAL mode, shared by every
+                                process on the host; put it under /dev/shm
+                                to keep it in shared memory
+    redis://host:6379/0         any Redis-protocol server (minimal built-in
+                                RESP client, no extra dependency)
+
+`TieredCache` is the L1 + shared pair used for answers, query embeddings
+and retrieval results; web_scraper keeps its byte-budgeted ContentStore as
+L1 and goes through `shared_get` / `shared_set` directly. A failing backend is
+skipped for BACKEND_RETRY_SECONDS, so requests degrade to L1-only instead
+of waiting on it.
+"""
+import array
+import json
+import logging
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterator, Optional
+from urllib.parse import unquote, urlparse
+
+from app.core.config import settings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BACKEND_RETRY_SECONDS = 30.0
+REDIS_SOCKET_TIMEOUT_SECONDS = 0.25
+REDIS_POOL_SIZE = 8
+SQLITE_BUSY_TIMEOUT_SECONDS = 0.5
+SQLITE_PURGE_EVERY_WRITES = 500
+COMPRESS_MIN_BYTES = 1024
+
+
+class SharedCacheError(Exception):
+    """A shared cache backend could not serve a request."""
+
+
+class SharedCacheBackend:
+    """Byte-valued store keyed by (namespace, key) with per-entry TTLs."""
+
+    name = "none"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        entry = self.get_with_ttl(namespace, key)
+        return entry[0] if entry is not None else None
+
+    def get_with_ttl(self, namespace: str, key: str) -> Optional[tuple[bytes, Optional[float]]]:
+        """(value, seconds until it expires or None if it does not) or None on a miss."""
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend(SharedCacheBackend):
+    """One SQLite database in WAL mode; readers never block the writer."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        # One connection per thread; executor threads each get their own.
+        try:
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._local.conn = conn
+            yield conn
+        except sqlite3.Error as exc:
+            raise SharedCacheError(f"sqlite: {exc}") from exc
+
+    def get_with_ttl(self, namespace: str, key: str) -> Optional[tuple[bytes, Optional[float]]]:
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, now),
+            ).fetchone()
+        return (bytes(row[0]), row[1] - now) if row else None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, now + ttl_seconds),
+            )
+            with self._writes_lock:
+                self._writes += 1
+                purge = self._writes % SQLITE_PURGE_EVERY_WRITES == 0
+            if purge:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+class RedisError(SharedCacheError):
+    pass
+
+
+class _RedisConnection:
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+        finally:
+            self.sock.close()
+
+
+def _encode_command(args: tuple) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def _read_reply(reader) -> Any:
+    line = reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise RedisError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        raise RedisError(body.decode("utf-8", errors="replace"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise RedisError("connection closed")
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        return None if count < 0 else [_read_reply(reader) for _ in range(count)]
+    raise RedisError(f"unexpected reply type {kind!r}")
+
+
+class RedisBackend(SharedCacheBackend):
+    """Minimal pooled RESP2 client: GET, PTTL, SET with PX, DEL."""
+
+    name = "redis"
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "rmw",
+        timeout: float = REDIS_SOCKET_TIMEOUT_SECONDS,
+        pool_size: int = REDIS_POOL_SIZE,
+    ) -> None:
+        self.host, self.port, self.db = host, port, db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[_RedisConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self) -> _RedisConnection:
+        conn = _RedisConnection(self.host, self.port, self.timeout)
+        try:
+            if self.password:
+                self._roundtrip(conn, ("AUTH", self.password))
+            if self.db:
+                self._roundtrip(conn, ("SELECT", self.db))
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _roundtrip(conn: _RedisConnection, *commands: tuple) -> Any:
+        """Send `commands` pipelined; the reply of a single command, else a list."""
+        conn.sock.sendall(b"".join(_encode_command(args) for args in commands))
+        replies = [_read_reply(conn.reader) for _ in commands]
+        return replies[0] if len(commands) == 1 else replies
+
+    def execute(self, *commands: tuple) -> Any:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+        try:
+            if conn is None:
+                conn = self._connect()
+            reply = self._roundtrip(conn, *commands)
+        except (OSError, RedisError) as exc:
+            if conn is not None:
+                conn.close()
+            raise RedisError(f"redis {commands[0][0]}: {exc}") from exc
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        return reply
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self.execute(("GET", self._key(namespace, key)))
+
+    def get_with_ttl(self, namespace: str, key: str) -> Optional[tuple[bytes, Optional[float]]]:
+        name = self._key(namespace, key)
+        value, ttl_ms = self.execute(("GET", name), ("PTTL", name))
+        if value is None:
+            return None
+        return value, (ttl_ms / 1000 if ttl_ms >= 0 else None)
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> None:
+        self.execute(("SET", self._key(namespace, key), value, "PX", max(1, int(ttl_seconds * 1000))))
+
+    def delete(self, namespace: str, key: str) -> None:
+        self.execute(("DEL", self._key(namespace, key)))
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def backend_from_url(url: str) -> Optional[SharedCacheBackend]:
+    url = (url or "").strip()
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        # sqlite:///relative/path.db or sqlite:////absolute/path.db
+        path = unquote(url[len("sqlite:///"):]) if url.startswith("sqlite:///") else unquote(parsed.path)
+        return SQLiteBackend(path)
+    if parsed.scheme in ("redis", "tcp"):
+        db = int(parsed.path.lstrip("/") or 0)
+        return RedisBackend(
+            host=parsed.hostname or "127.0.0.1",
+            port=parsed.port or 6379,
+            db=db,
+            password=unquote(parsed.password) if parsed.password else None,
+        )
+    raise ValueError(f"Unsupported SHARED_CACHE_URL scheme: {parsed.scheme!r}")
+
+
+class _BackendGuard:
+    """Skips the backend for a while after it fails, so callers fall back to L1."""
+
+    def __init__(self, backend: SharedCacheBackend) -> None:
+        self.backend = backend
+        self._down_until = 0.0
+
+    def call(self, op: str, namespace: str, fn: Callable[[], Any]) -> Any:
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return fn()
+        except SharedCacheError as exc:
+            self._down_until = time.monotonic() + BACKEND_RETRY_SECONDS
+            metrics.inc("shared_cache_errors_total", backend=self.backend.name, op=op, namespace=namespace)
+            logger.warning("Shared cache %s unavailable for %.0fs: %s", self.backend.name, BACKEND_RETRY_SECONDS, exc)
+            return None
+
+
+@lru_cache(maxsize=1)
+def _guarded_backend() -> Optional[_BackendGuard]:
+    try:
+        backend = backend_from_url(settings.SHARED_CACHE_URL)
+    except (ValueError, SharedCacheError, OSError) as exc:
+        logger.warning("Shared cache disabled: %s", exc)
+        return None
+    if backend is not None:
+        logger.info("Shared cache backend: %s", backend.name)
+    return _BackendGuard(backend) if backend is not None else None
+
+
+def shared_cache_enabled() -> bool:
+    return _guarded_backend() is not None
+
+
+def shared_backend_name() -> str:
+    guard = _guarded_backend()
+    return guard.backend.name if guard else "none"
+
+
+def shared_get(namespace: str, key: str) -> Optional[bytes]:
+    """Read from the shared tier; None on a miss, when disabled or when it is down."""
+    entry = shared_get_with_ttl(namespace, key)
+    return entry[0] if entry is not None else None
+
+
+def shared_get_with_ttl(namespace: str, key: str) -> Optional[tuple[bytes, Optional[float]]]:
+    """
+    Like shared_get, with the entry's remaining lifetime in seconds (None if
+    unbounded), so a copy kept in a local cache expires when the original does.
+    """
+    guard = _guarded_backend()
+    if guard is None:
+        return None
+    entry = guard.call("get", namespace, lambda: guard.backend.get_with_ttl(namespace, key))
+    metrics.inc("shared_cache_requests_total", namespace=namespace, result="hit" if entry is not None else "miss")
+    return entry
+
+
+def shared_set(namespace: str, key: str, value: bytes, ttl_seconds: float) -> None:
+    guard = _guarded_backend()
+    if guard is not None:
+        guard.call("set", namespace, lambda: guard.backend.set(namespace, key, value, ttl_seconds))
+
+
+# ---- codecs -----------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Codec:
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+def _pack_text(text: str) -> bytes:
+    data = text.encode("utf-8")
+    if len(data) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(data, 6)
+    return b"t" + data
+
+
+def _unpack_text(data: bytes) -> str:
+    body = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+    return body.decode("utf-8")
+
+
+def _pack_vector(vector: list[float]) -> bytes:
+    return array.array("f", vector).tobytes()
+
+
+def _unpack_vector(data: bytes) -> list[float]:
+    values = array.array("f")
+    values.frombytes(data)
+    return values.tolist()
+
+
+TEXT_CODEC = Codec(_pack_text, _unpack_text)
+JSON_CODEC = Codec(lambda value: _pack_text(json.dumps(value, ensure_ascii=False)), lambda data: json.loads(_unpack_text(data)))
+VECTOR_CODEC = Codec(_pack_vector, _unpack_vector)
+
+
+def cache_key(*parts: Hashable) -> str:
+    """Flatten a tuple key into the string form used by the shared tier."""
+    return "\x1f".join(str(part) for part in parts)
+
+
+class TieredCache:
+    """
+    Process-local LRU (L1) in front of the shared tier. Values read from the
+    shared tier are copied into L1 for the rest of their shared lifetime;
+    writes go to both.
+    """
+
+    def __init__(self, namespace: str, max_entries: int, ttl_seconds: float, codec: Codec = JSON_CODEC) -> None:
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.codec = codec
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.get_local(key)
+        return value if value is not None else self.get_shared(key)
+
+    def get_local(self, key: str) -> Optional[Any]:
+        """The L1 half of get: never touches the shared tier, so it is safe on the event loop."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    metrics.inc("tiered_cache_requests_total", namespace=self.namespace, tier="l1", result="hit")
+                    return entry[1]
+                del self._entries[key]
+        return None
+
+    def get_shared(self, key: str) -> Optional[Any]:
+        """The shared half of get, after an L1 miss; blocking I/O."""
+        entry = shared_get_with_ttl(self.namespace, key)
+        if entry is None:
+            metrics.inc("tiered_cache_requests_total", namespace=self.namespace, tier="l1", result="miss")
+            return None
+        data, remaining = entry
+        try:
+            value = self.codec.decode(data)
+        except Exception as exc:
+            logger.warning("Dropping undecodable %s cache entry: %s", self.namespace, exc)
+            return None
+        metrics.inc("tiered_cache_requests_total", namespace=self.namespace, tier="shared", result="hit")
+        self._put_local(key, value, self.ttl_seconds if remaining is None else min(self.ttl_seconds, remaining))
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._put_local(key, value)
+        if not shared_cache_enabled():
+            return
+        try:
+            data = self.codec.encode(value)
+        except Exception as exc:
+            logger.warning("Not sharing %s cache entry: %s", self.namespace, exc)
+            return
+        shared_set(self.namespace, key, data, self.ttl_seconds)
+
+    def _put_local(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,162 @@
+"""
+Server-Sent Events framing for the chat streams.
+
+Handlers produce payload dicts ({"chunk": ...}, {"status": ...},
+{"final": True, "answer": ...}, {"error": ...}); `coalesce_sse` turns them
+into wire bytes. Consecutive chunks are merged into one frame until the
+pending text reaches SSE_FLUSH_BYTES or has waited SSE_FLUSH_INTERVAL_SECONDS,
+so a long answer goes out in a few dozen writes instead of one per word.
+Chunks are only ever concatenated, never split, so word boundaries from
+the producer are preserved.
+
+orjson is used for encoding when installed, with the stdlib as fallback.
+"""
+import asyncio
+import contextlib
+import json
+from typing import Any, AsyncIterator, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+SSE_FLUSH_INTERVAL_SECONDS = 0.03
+SSE_FLUSH_BYTES = 256
+SSE_QUEUE_SIZE = 64
+
+_DATA_PREFIX = b"data: "
+_FRAME_END = b"\n\n"
+
+
+def dumps_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_event(payload: Any) -> bytes:
+    return _DATA_PREFIX + dumps_json(payload) + _FRAME_END
+
+
+def final_payload(answer: str, streamed_text: str, omit_answer: bool) -> dict:
+    """
+    The final frame repeats the full answer unless the client opted out and
+    it already holds exactly that text from the chunks.
+    """
+    if omit_answer and answer.strip() == streamed_text.strip():
+        return {"final": True}
+    return {"final": True, "answer": answer}
+
+
+def render_answer_frames(chunks: list[str], final: dict, flush_bytes: int = SSE_FLUSH_BYTES) -> bytes:
+    """
+    Pre-render a complete answer: the chunks grouped into frames of about
+    flush_bytes (the same shape coalesce_sse produces) followed by the final
+    frame, as one payload that can be sent in a single write.
+    """
+    frames = []
+    pending: list[str] = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= flush_bytes:
+            frames.append(sse_event({"chunk": "".join(pending)}))
+            pending.clear()
+            pending_size = 0
+    if pending:
+        frames.append(sse_event({"chunk": "".join(pending)}))
+    frames.append(sse_event(final))
+    return b"".join(frames)
+
+
+class _EndOfStream:
+    def __init__(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+
+
+async def _pump(events: AsyncIterator[dict], queue: asyncio.Queue) -> None:
+    # The producer runs start to finish in this one task, so context
+    # variables it sets (request timings, deadlines) stay visible to it.
+    try:
+        async with contextlib.aclosing(events) as source:
+            async for payload in source:
+                await queue.put(payload)
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        await queue.put(_EndOfStream(exc))
+        return
+    await queue.put(_EndOfStream())
+
+
+async def coalesce_sse(
+    events: AsyncIterator[dict],
+    omit_final_answer: bool = False,
+    flush_interval: float = SSE_FLUSH_INTERVAL_SECONDS,
+    flush_bytes: int = SSE_FLUSH_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Encode payload dicts as SSE frames, merging runs of chunk payloads.
+    The first chunk is sent as soon as it arrives so time to first token
+    is unaffected; later chunks wait for the size or time threshold.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+    pump = asyncio.ensure_future(_pump(events, queue))
+    pending: list[str] = []
+    pending_size = 0
+    pending_since = 0.0
+    streamed: list[str] = []
+
+    def take_pending() -> bytes:
+        nonlocal pending_size
+        text = "".join(pending)
+        pending.clear()
+        pending_size = 0
+        streamed.append(text)
+        return sse_event({"chunk": text})
+
+    try:
+        while True:
+            if pending:
+                remaining = flush_interval - (loop.time() - pending_since)
+                if remaining <= 0:
+                    yield take_pending()
+                    continue
+                try:
+                    payload = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    yield take_pending()
+                    continue
+            else:
+                payload = await queue.get()
+
+            if isinstance(payload, _EndOfStream):
+                if pending:
+                    yield take_pending()
+                if payload.error is not None:
+                    raise payload.error
+                return
+
+            chunk = payload.get("chunk") if len(payload) == 1 else None
+            if chunk is not None:
+                if not pending:
+                    pending_since = loop.time()
+                pending.append(chunk)
+                pending_size += len(chunk)  # characters; answers are mostly ASCII
+                if pending_size >= flush_bytes or not streamed:
+                    yield take_pending()
+                continue
+
+            head = take_pending() if pending else b""
+            if payload.get("final") and "answer" in payload:
+                extra = {k: v for k, v in payload.items() if k not in ("final", "answer")}
+                payload = {**final_payload(payload["answer"], "".join(streamed), omit_final_answer), **extra}
+            yield head + sse_event(payload)
+    finally:
+        if not pump.done():
+            pump.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await pump
@@ -2,18 +2,29 @@
 Web scraper helpers for website search and fallback context.
 """
 import logging
-import threading
+import re
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import TYPE_CHECKING, Optional
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse, urlunparse, parse_qs
 
-import requests
-from bs4 import BeautifulSoup
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup
+
+from app.core.config import settings
+from app.utils.cancellation import cancellation_waitables, raise_if_cancelled
+from app.utils.content_store import ContentStore
+from app.utils.deadline import DeadlineExceededError, call_timeout, remaining_seconds
+from app.utils.latency import AdaptiveTimeout, LatencyTracker
+from app.utils.request_timing import context_bound
+from app.utils.shared_cache import TEXT_CODEC, shared_cache_enabled, shared_get_with_ttl, shared_set
+from app.utils.shared_cache import cache_key as shared_cache_key
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_WEBSITE_URL = "https://ritzmediaworld.com"
+DEFAULT_WEBSITE_URL = settings.WEBSITE_URL
 DEFAULT_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -22,18 +33,98 @@ DEFAULT_HEADERS = {
 }
 
 REQUEST_TIMEOUT_SECONDS = 7
+# Floor for adaptive per-request timeouts (the ceiling is REQUEST_TIMEOUT_SECONDS).
+MIN_REQUEST_TIMEOUT_SECONDS = 1.0
 DEFAULT_MAX_PAGES = 3
 CONTENT_CACHE_TTL_SECONDS = 900  # 15 minutes
 SEARCH_CACHE_TTL_SECONDS = 900   # 15 minutes
+SCRAPER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+SCRAPER_CACHE_COMPRESS_IDLE_SECONDS = 120
+
+# External search hedging: the backup provider is fired once the primary has
+# been outstanding longer than its recent p75 latency (clamped to this range).
+HEDGE_DEFAULT_DELAY_SECONDS = 1.0
+HEDGE_MIN_DELAY_SECONDS = 0.25
+HEDGE_MAX_DELAY_SECONDS = 2.5
 DEFAULT_FETCH_WORKERS = 5
 
-_session = requests.Session()
-_session.headers.update(DEFAULT_HEADERS)
+# Main-content extraction tuning. Blocks are scored by text length and the
+# share of their text that sits inside links; menus, CTA rows and link lists
+# score high on link density and low on text and are dropped.
+_STRIP_TAGS = [
+    "script", "style", "noscript", "template", "svg", "iframe",
+    "nav", "footer", "header", "aside", "form", "button",
+]
+_BOILERPLATE_HINTS = frozenset({
+    "cookie", "cookies", "consent", "gdpr", "popup", "modal", "newsletter",
+    "subscribe", "breadcrumb", "breadcrumbs", "navbar", "menu", "social", "share",
+})
+_MARKER_WORD_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_BOUNDARY_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_BLOCK_TAGS = frozenset({
+    "p", "li", "dd", "dt", "td", "th", "blockquote", "pre", "figcaption",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+    "div", "section", "article", "main", "body",
+})
+_HEADING_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+MAX_LINK_DENSITY = 0.4
+MIN_CONTENT_WORDS = 8
+MAX_HEADING_CHARS = 200
+MIN_EXTRACTED_CHARS = 100
+
+
+@lru_cache(maxsize=1)
+def _http_session() -> "requests.Session":
+    # requests (and bs4, see _parse_html) load on first fetch, not at app import.
+    import requests
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+# Page fetches share one latency history; search providers keep their own
+# (below). Both feed adaptive timeouts capped by the request deadline.
+_page_latency = LatencyTracker()
+_page_timeout = AdaptiveTimeout(
+    _page_latency,
+    default=REQUEST_TIMEOUT_SECONDS,
+    minimum=MIN_REQUEST_TIMEOUT_SECONDS,
+    maximum=REQUEST_TIMEOUT_SECONDS,
+)
+
+# One shared store for site snapshots, per-query website results and external
+# search results. Keys are namespaced; identical texts (e.g. the full-site
+# fallback cached under many queries) share a single blob.
+_scraper_cache = ContentStore(
+    max_bytes=SCRAPER_CACHE_MAX_BYTES,
+    compress_idle_seconds=SCRAPER_CACHE_COMPRESS_IDLE_SECONDS,
+)
+SHARED_CACHE_NAMESPACE = "scraper"
+
+
+def _cached_text(key: tuple, ttl_seconds: float) -> Optional[str]:
+    """
+    The process-local store first, then the cross-worker tier. A shared hit
+    is copied into the local store, backdated so it expires with the original.
+    """
+    text = _scraper_cache.get(key, ttl_seconds)
+    if text is not None or not shared_cache_enabled():
+        return text
+    entry = shared_get_with_ttl(SHARED_CACHE_NAMESPACE, shared_cache_key(*key))
+    if entry is None:
+        return None
+    data, remaining = entry
+    text = TEXT_CODEC.decode(data)
+    age = 0.0 if remaining is None else max(0.0, ttl_seconds - remaining)
+    _scraper_cache.put(key, text, stored_at=time.time() - age)
+    return text
+
 
-_cache_lock = threading.Lock()
-_website_content_cache: dict[str, tuple[float, str]] = {}
-_search_cache: dict[tuple[str, str], tuple[float, str]] = {}
-_external_search_cache: dict[str, tuple[float, str]] = {}
+def _store_text(key: tuple, text: str, ttl_seconds: float) -> None:
+    _scraper_cache.put(key, text)
+    if shared_cache_enabled():
+        shared_set(SHARED_CACHE_NAMESPACE, shared_cache_key(*key), TEXT_CODEC.encode(text), ttl_seconds)
 
 
 def _fetch_links_content_parallel(links: list[str], max_workers: int = DEFAULT_FETCH_WORKERS) -> dict[str, Optional[str]]:
@@ -42,7 +133,7 @@ def _fetch_links_content_parallel(links: list[str], max_workers: int = DEFAULT_F
     worker_count = max(1, min(max_workers, len(links)))
     results: dict[str, Optional[str]] = {}
     with ThreadPoolExecutor(max_workers=worker_count) as executor:
-        future_to_link = {executor.submit(fetch_page_content, link): link for link in links}
+        future_to_link = {executor.submit(context_bound(fetch_page_content), link): link for link in links}
         for future in as_completed(future_to_link):
             link = future_to_link[future]
             try:
@@ -66,16 +157,182 @@ def is_valid_url(url: str) -> bool:
     return bool(parsed.netloc and parsed.scheme)
 
 
-def _is_cache_valid(ts: float, ttl_seconds: int) -> bool:
-    return (time.time() - ts) <= ttl_seconds
+def get_scraper_cache_stats() -> dict[str, int]:
+    return _scraper_cache.stats()
+
+
+def _parse_html(content: bytes) -> "BeautifulSoup":
+    # bs4 is imported on first parse rather than at app import.
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(content, "lxml")
+
+
+def warmup_scraper() -> None:
+    """Load requests and bs4/lxml ahead of the first page fetch."""
+    _http_session()
+    _parse_html(b"<p></p>")
+
+
+def _marker_words(value: str) -> set[str]:
+    # "main-menu", "share_bar" and "cookieBanner" -> {"main", "menu"}, ...
+    return set(_MARKER_WORD_RE.findall(_CAMEL_BOUNDARY_RE.sub(" ", value).lower()))
+
+
+def _has_boilerplate_hint(element) -> bool:
+    """
+    Whether a class token, the id or the role names boilerplate. Hints match
+    whole words of those values, so "social-menu" matches but "tokenmenus" or
+    "sharedResults" do not.
+    """
+    attrs = getattr(element, "attrs", None) or {}
+    classes = attrs.get("class") or []
+    if isinstance(classes, str):
+        classes = classes.split()
+    words: set[str] = set()
+    for value in (*classes, attrs.get("id") or "", attrs.get("role") or ""):
+        words |= _marker_words(value)
+    return not words.isdisjoint(_BOILERPLATE_HINTS)
+
+
+def _collect_text_blocks(soup: "BeautifulSoup") -> list[tuple[str, str, int]]:
+    """
+    Group text nodes by their nearest block-level ancestor.
+    Returns (tag_name, text, link_chars) in document order.
+    """
+    from bs4 import Comment
+
+    blocks: dict[int, list] = {}
+    for node in soup.find_all(string=True):
+        if isinstance(node, Comment):
+            continue
+        text = " ".join(str(node).split())
+        if not text:
+            continue
+        in_link = False
+        block = None
+        for parent in node.parents:
+            if parent.name == "a":
+                in_link = True
+            if parent.name in _BLOCK_TAGS:
+                block = parent
+                break
+        if block is None:
+            continue
+        entry = blocks.get(id(block))
+        if entry is None:
+            entry = blocks[id(block)] = [block.name, [], 0]
+        entry[1].append(text)
+        if in_link:
+            entry[2] += len(text)
+    return [(name, " ".join(parts), link_chars) for name, parts, link_chars in blocks.values()]
+
+
+def _classify_block(tag_name: str, text: str, link_chars: int) -> str:
+    link_density = link_chars / max(1, len(text))
+    if link_density > MAX_LINK_DENSITY:
+        return "bad"
+    if tag_name in _HEADING_TAGS:
+        return "heading" if len(text) <= MAX_HEADING_CHARS else "good"
+    if len(text.split()) >= MIN_CONTENT_WORDS:
+        return "good"
+    return "short"
+
+
+def extract_main_content(soup: "BeautifulSoup") -> str:
+    """
+    Keep only the main-content blocks of a parsed page.
+    Short blocks survive only between two good blocks, and headings only
+    when good content follows them before the next heading.
+    """
+    for element in soup(_STRIP_TAGS):
+        element.decompose()
+    for element in soup.find_all(True):
+        if element.decomposed or element.name in {"html", "body", "main"}:
+            continue
+        if _has_boilerplate_hint(element):
+            element.decompose()
+
+    blocks = _collect_text_blocks(soup)
+    labels = [_classify_block(name, text, link_chars) for name, text, link_chars in blocks]
+
+    kept: list[str] = []
+    for index, (label, (_, text, _)) in enumerate(zip(labels, blocks)):
+        if label == "good":
+            kept.append(text)
+        elif label == "short":
+            prev_good = index > 0 and labels[index - 1] == "good"
+            next_good = index + 1 < len(labels) and labels[index + 1] == "good"
+            if prev_good and next_good:
+                kept.append(text)
+        elif label == "heading":
+            for following in labels[index + 1:]:
+                if following == "good":
+                    kept.append(text)
+                    break
+                if following == "heading":
+                    break
+    return "\n".join(kept)
+
+
+def _dedupe_repeated_paragraphs(links: list[str], content_by_link: dict[str, Optional[str]]) -> dict[str, Optional[str]]:
+    """
+    Drop paragraphs already seen on an earlier page of the same crawl
+    (repeated service blurbs, CTAs, contact strips).
+    """
+    seen: set[str] = set()
+    deduped: dict[str, Optional[str]] = {}
+    for link in links:
+        content = content_by_link.get(link)
+        if not content:
+            deduped[link] = content
+            continue
+        unique_lines: list[str] = []
+        for line in content.split("\n"):
+            fingerprint = " ".join(line.lower().split())
+            if not fingerprint or fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            unique_lines.append(line)
+        deduped[link] = "\n".join(unique_lines)
+    return deduped
+
+
+def _get_page(url: str, timeout: Optional[float] = None) -> "requests.Response":
+    """GET a site page with an adaptive timeout, recording its latency."""
+    import requests
+
+    timeout = timeout or call_timeout("web_fetch", _page_timeout)
+    start = time.monotonic()
+    try:
+        response = _http_session().get(url, timeout=timeout)
+    except requests.exceptions.Timeout:
+        # Censored sample: the page took at least this long.
+        _page_latency.record_timeout(time.monotonic() - start)
+        raise
+    except requests.exceptions.RequestException:
+        _page_latency.record(time.monotonic() - start, success=False)
+        raise
+    _page_latency.record(time.monotonic() - start, success=response.ok)
+    return response
+
 
+def fetch_page_content(url: str, timeout: Optional[float] = None) -> Optional[str]:
+    import requests
 
-def fetch_page_content(url: str, timeout: int = REQUEST_TIMEOUT_SECONDS) -> Optional[str]:
+    raise_if_cancelled("web_fetch")
     try:
-        response = _session.get(url, timeout=timeout)
+        response = _get_page(url, timeout)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, "lxml")
+        soup = _parse_html(response.content)
+        main_content = extract_main_content(soup)
+        if len(main_content) >= MIN_EXTRACTED_CHARS:
+            return main_content
+
+        # Pages with little block structure (or JS-rendered shells) fall back
+        # to the plain tag-stripped text so nothing useful is lost.
+        soup = _parse_html(response.content)
         for element in soup(["script", "style", "nav", "footer", "header"]):
             element.decompose()
 
@@ -84,6 +341,9 @@ def fetch_page_content(url: str, timeout: int = REQUEST_TIMEOUT_SECONDS) -> Opti
         clean_text = "\n".join(line for line in lines if line)
         return clean_text
 
+    except DeadlineExceededError:
+        logger.info("Skipping %s: not enough time left on the request", url)
+        return None
     except requests.exceptions.Timeout:
         logger.warning("Timeout fetching %s", url)
         return None
@@ -104,6 +364,7 @@ def get_all_links(base_url: str, max_pages: int = DEFAULT_MAX_PAGES) -> list[str
     base_domain = parsed_base.netloc
 
     while to_visit and len(visited) < max_pages:
+        raise_if_cancelled("web_fetch")
         url = to_visit.pop(0)
         if url in visited:
             continue
@@ -111,11 +372,11 @@ def get_all_links(base_url: str, max_pages: int = DEFAULT_MAX_PAGES) -> list[str
         links.append(url)
 
         try:
-            response = _session.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
+            response = _get_page(url)
             if response.status_code != 200:
                 continue
 
-            soup = BeautifulSoup(response.content, "lxml")
+            soup = _parse_html(response.content)
             for tag in soup.find_all("a", href=True):
                 href = tag["href"]
                 candidate = href if href.startswith("http") else urljoin(url, href)
@@ -132,6 +393,8 @@ def get_all_links(base_url: str, max_pages: int = DEFAULT_MAX_PAGES) -> list[str
                     continue
 
                 to_visit.append(candidate)
+        except DeadlineExceededError:
+            break
         except Exception as exc:
             logger.debug("Error collecting links from %s: %s", url, exc)
 
@@ -145,7 +408,7 @@ def scrape_website(url: str = DEFAULT_WEBSITE_URL, max_pages: int = DEFAULT_MAX_
     links = get_all_links(url, max_pages=max_pages)
     all_content: list[str] = []
 
-    content_by_link = _fetch_links_content_parallel(links)
+    content_by_link = _dedupe_repeated_paragraphs(links, _fetch_links_content_parallel(links))
     for index, link in enumerate(links, start=1):
         logger.info("Scraping page %d/%d: %s", index, len(links), link)
         content = content_by_link.get(link)
@@ -160,19 +423,18 @@ def scrape_website(url: str = DEFAULT_WEBSITE_URL, max_pages: int = DEFAULT_MAX_
 
 def get_website_content(website_url: str = DEFAULT_WEBSITE_URL, force_refresh: bool = False) -> str:
     url = _normalize_url(website_url)
-    now = time.time()
+    cache_key = ("site", url)
 
-    with _cache_lock:
-        entry = _website_content_cache.get(url)
-        if entry and not force_refresh and _is_cache_valid(entry[0], CONTENT_CACHE_TTL_SECONDS):
+    if not force_refresh:
+        cached = _cached_text(cache_key, CONTENT_CACHE_TTL_SECONDS)
+        if cached is not None:
             logger.info("Using cached website content for %s", url)
-            return entry[1]
+            return cached
 
     logger.info("Refreshing website content cache for %s", url)
     content = scrape_website(url, max_pages=DEFAULT_MAX_PAGES)
 
-    with _cache_lock:
-        _website_content_cache[url] = (now, content)
+    _store_text(cache_key, content, CONTENT_CACHE_TTL_SECONDS)
     return content
 
 
@@ -186,17 +448,16 @@ def search_website(
         return ""
 
     url = _normalize_url(website_url)
-    cache_key = (url, query_clean.lower())
+    cache_key = ("search", url, query_clean.lower())
 
-    with _cache_lock:
-        search_entry = _search_cache.get(cache_key)
-        if search_entry and _is_cache_valid(search_entry[0], SEARCH_CACHE_TTL_SECONDS):
-            logger.info("Using cached website search for query: %s", query_clean[:60])
-            return search_entry[1]
+    cached = _cached_text(cache_key, SEARCH_CACHE_TTL_SECONDS)
+    if cached is not None:
+        logger.info("Using cached website search for query: %s", query_clean[:60])
+        return cached
 
     logger.info("Searching website for query: %s", query_clean[:80])
     links = get_all_links(url, max_pages=DEFAULT_MAX_PAGES)
-    content_by_link = _fetch_links_content_parallel(links)
+    content_by_link = _dedupe_repeated_paragraphs(links, _fetch_links_content_parallel(links))
     relevant_content: list[str] = []
     query_lower = query_clean.lower()
 
@@ -225,12 +486,180 @@ def search_website(
         logger.info("No direct match, falling back to full website content.")
         result = get_website_content(url)
 
-    with _cache_lock:
-        _search_cache[cache_key] = (time.time(), result)
+    # A full-site fallback result hashes to the same blob as the site snapshot,
+    # so this stores a reference rather than another copy.
+    _store_text(cache_key, result, SEARCH_CACHE_TTL_SECONDS)
 
     return result
 
 
+def _search_duckduckgo(query: str, max_results: int, timeout: float = REQUEST_TIMEOUT_SECONDS) -> str:
+    resp = _http_session().get(settings.DUCKDUCKGO_SEARCH_URL, params={"q": query}, timeout=timeout)
+    resp.raise_for_status()
+    soup = _parse_html(resp.content)
+
+    rows: list[str] = []
+    for result in soup.select(".result")[:max_results]:
+        a = result.select_one(".result__a")
+        snippet = result.select_one(".result__snippet")
+        if not a:
+            continue
+        title = a.get_text(" ", strip=True)
+        href = a.get("href", "").strip()
+        desc = snippet.get_text(" ", strip=True) if snippet else ""
+        rows.append(f"- {title}\n  {desc}\n  Source: {href}")
+    return "\n".join(rows)
+
+
+def _search_bing(query: str, max_results: int, timeout: float = REQUEST_TIMEOUT_SECONDS) -> str:
+    bing_resp = _http_session().get(
+        settings.BING_SEARCH_URL,
+        params={"q": query, "setlang": "en"},
+        timeout=timeout,
+    )
+    bing_resp.raise_for_status()
+    bing_soup = _parse_html(bing_resp.content)
+    bing_rows: list[str] = []
+    keep_keywords = (
+        "agency", "agencies", "advertising", "media", "marketing",
+        "digital", "companies", "india", "indian"
+    )
+    for item in bing_soup.select("li.b_algo")[:max_results]:
+        a = item.select_one("h2 a")
+        snippet_tag = item.select_one(".b_caption p")
+        if not a:
+            continue
+        title = a.get_text(" ", strip=True)
+        href = a.get("href", "").strip()
+        # Decode Bing redirect URL when possible.
+        parsed_href = urlparse(href)
+        if "bing.com" in parsed_href.netloc and parsed_href.path.startswith("/ck/a"):
+            qs = parse_qs(parsed_href.query)
+            target = qs.get("u", [""])[0]
+            if target.startswith("a1"):
+                try:
+                    import base64
+                    decoded = base64.b64decode(target[2:] + "===").decode("utf-8", errors="ignore")
+                    if decoded.startswith("http"):
+                        href = decoded
+                except Exception:
+                    pass
+        desc = snippet_tag.get_text(" ", strip=True) if snippet_tag else ""
+        relevance_text = f"{title} {desc}".lower()
+        if not any(k in relevance_text for k in keep_keywords):
+            continue
+        bing_rows.append(f"- {title}\n  {desc}\n  Source: {href}")
+    return "\n".join(bing_rows)
+
+
+# Provider order is the tie-break when no latency history exists yet.
+_SEARCH_PROVIDERS = {
+    "duckduckgo": _search_duckduckgo,
+    "bing": _search_bing,
+}
+_search_latency: dict[str, LatencyTracker] = {name: LatencyTracker() for name in _SEARCH_PROVIDERS}
+_search_timeouts: dict[str, AdaptiveTimeout] = {
+    name: AdaptiveTimeout(
+        tracker,
+        default=REQUEST_TIMEOUT_SECONDS,
+        minimum=MIN_REQUEST_TIMEOUT_SECONDS,
+        maximum=REQUEST_TIMEOUT_SECONDS,
+    )
+    for name, tracker in _search_latency.items()
+}
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="web-search")
+
+
+def _ranked_search_providers() -> list[str]:
+    """
+    Order providers by expected time to a usable result:
+    median latency divided by recent success rate.
+    """
+    def expected_cost(name: str) -> float:
+        tracker = _search_latency[name]
+        p50 = tracker.percentile(50, default=HEDGE_DEFAULT_DELAY_SECONDS)
+        return p50 / max(tracker.success_rate(), 0.05)
+
+    return sorted(_SEARCH_PROVIDERS, key=expected_cost)
+
+
+def _search_hedge_delay(provider: str) -> float:
+    tracker = _search_latency[provider]
+    if tracker.success_rate() < 0.5:
+        # Primary is failing most of the time: query both providers at once.
+        return 0.0
+    p75 = tracker.percentile(75, default=HEDGE_DEFAULT_DELAY_SECONDS)
+    return min(HEDGE_MAX_DELAY_SECONDS, max(HEDGE_MIN_DELAY_SECONDS, p75))
+
+
+def _timed_provider_search(provider: str, query: str, max_results: int) -> Optional[str]:
+    """Run one provider; returns None on error so callers can tell it apart from 'no results'."""
+    import requests
+
+    raise_if_cancelled("web_search")
+    try:
+        timeout = call_timeout("web_search", _search_timeouts[provider])
+    except DeadlineExceededError:
+        logger.info("Skipping %s search: not enough time left on the request", provider)
+        return None
+    start = time.monotonic()
+    try:
+        rows = _SEARCH_PROVIDERS[provider](query, max_results, timeout)
+    except Exception as exc:
+        if isinstance(exc, requests.exceptions.Timeout):
+            _search_latency[provider].record_timeout(time.monotonic() - start)
+        else:
+            _search_latency[provider].record(time.monotonic() - start, success=False)
+        logger.warning("External web search via %s failed for '%s': %s", provider, query[:80], exc)
+        return None
+    _search_latency[provider].record(time.monotonic() - start, success=bool(rows))
+    return rows
+
+
+def _hedged_web_search(query: str, max_results: int) -> Optional[str]:
+    """
+    Query the best-ranked provider first and fire the backup after an
+    adaptive delay (or immediately if the primary comes back empty).
+    The first usable result wins; the slower call is abandoned.
+    Returns None only when every provider errored.
+    """
+    primary, *backups = _ranked_search_providers()
+    futures: dict[Future, str] = {
+        _search_executor.submit(context_bound(_timed_provider_search), primary, query, max_results): primary
+    }
+    hedge_at = time.monotonic() + _search_hedge_delay(primary)
+    saw_empty = False
+
+    while futures:
+        timeouts = [hedge_at - time.monotonic()] if backups else []
+        remaining = remaining_seconds()
+        if remaining is not None:
+            timeouts.append(remaining)
+        timeout = max(0.0, min(timeouts)) if timeouts else None
+        done, _ = wait([*futures, *cancellation_waitables()], timeout=timeout, return_when=FIRST_COMPLETED)
+        raise_if_cancelled("web_search")
+        if not done and remaining is not None and remaining_seconds() <= 0:
+            logger.info("External web search abandoned at the request deadline")
+            return "" if saw_empty else None
+        for future in done:
+            provider = futures.pop(future)
+            rows = future.result()
+            if rows:
+                for pending in futures:
+                    pending.cancel()
+                logger.info("External web search answered by %s", provider)
+                return rows
+            if rows is not None:
+                saw_empty = True
+        if backups and (not done or not futures):
+            backup = backups.pop(0)
+            logger.info("Hedging external web search with %s", backup)
+            futures[_search_executor.submit(context_bound(_timed_provider_search), backup, query, max_results)] = backup
+            hedge_at = time.monotonic() + _search_hedge_delay(backup)
+
+    return "" if saw_empty else None
+
+
 def search_web_general(query: str, max_results: int = 5) -> str:
     """
     Lightweight general web search fallback (outside the target website).
@@ -240,76 +669,14 @@ def search_web_general(query: str, max_results: int = 5) -> str:
     if not query_clean:
         return ""
 
-    cache_key = query_clean.lower()
-    with _cache_lock:
-        cached = _external_search_cache.get(cache_key)
-        if cached and _is_cache_valid(cached[0], SEARCH_CACHE_TTL_SECONDS):
-            logger.info("Using cached external web search for query: %s", query_clean[:80])
-            return cached[1]
-
-    try:
-        url = "https://duckduckgo.com/html/"
-        resp = _session.get(url, params={"q": query_clean}, timeout=REQUEST_TIMEOUT_SECONDS)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.content, "lxml")
-
-        rows: list[str] = []
-        for result in soup.select(".result")[:max_results]:
-            a = result.select_one(".result__a")
-            snippet = result.select_one(".result__snippet")
-            if not a:
-                continue
-            title = a.get_text(" ", strip=True)
-            href = a.get("href", "").strip()
-            desc = snippet.get_text(" ", strip=True) if snippet else ""
-            rows.append(f"- {title}\n  {desc}\n  Source: {href}")
-
-        combined = "\n".join(rows)
-        if not combined:
-            # Fallback parser for Bing when DuckDuckGo markup or anti-bot blocks snippets.
-            bing_url = "https://www.bing.com/search"
-            bing_resp = _session.get(
-                bing_url,
-                params={"q": query_clean, "setlang": "en"},
-                timeout=REQUEST_TIMEOUT_SECONDS,
-            )
-            bing_resp.raise_for_status()
-            bing_soup = BeautifulSoup(bing_resp.content, "lxml")
-            bing_rows: list[str] = []
-            keep_keywords = (
-                "agency", "agencies", "advertising", "media", "marketing",
-                "digital", "companies", "india", "indian"
-            )
-            for item in bing_soup.select("li.b_algo")[:max_results]:
-                a = item.select_one("h2 a")
-                snippet_tag = item.select_one(".b_caption p")
-                if not a:
-                    continue
-                title = a.get_text(" ", strip=True)
-                href = a.get("href", "").strip()
-                # Decode Bing redirect URL when possible.
-                parsed_href = urlparse(href)
-                if "bing.com" in parsed_href.netloc and parsed_href.path.startswith("/ck/a"):
-                    qs = parse_qs(parsed_href.query)
-                    target = qs.get("u", [""])[0]
-                    if target.startswith("a1"):
-                        try:
-                            import base64
-                            decoded = base64.b64decode(target[2:] + "===").decode("utf-8", errors="ignore")
-                            if decoded.startswith("http"):
-                                href = decoded
-                        except Exception:
-                            pass
-                desc = snippet_tag.get_text(" ", strip=True) if snippet_tag else ""
-                relevance_text = f"{title} {desc}".lower()
-                if not any(k in relevance_text for k in keep_keywords):
-                    continue
-                bing_rows.append(f"- {title}\n  {desc}\n  Source: {href}")
-            combined = "\n".join(bing_rows)
+    cache_key = ("external", query_clean.lower())
+    cached = _cached_text(cache_key, SEARCH_CACHE_TTL_SECONDS)
+    if cached is not None:
+        logger.info("Using cached external web search for query: %s", query_clean[:80])
+        return cached
 
-        with _cache_lock:
-            _external_search_cache[cache_key] = (time.time(), combined)
-        return combined
-    except Exception as exc:
-        logger.warning("External web search failed for '%s': %s", query_clean[:80], exc)
+    combined = _hedged_web_search(query_clean, max_results)
+    if combined is None:
         return ""
+    _store_text(cache_key, combined, SEARCH_CACHE_TTL_SECONDS)
+    return combined
@@ -0,0 +1,3 @@
+"""
+Offline performance benchmarks. Run modules with `python -m benchmarks.<name>`.
+"""
@@ -0,0 +1,151 @@
+"""
+Local stand-in for a Redis server, for exercising the shared cache tier
+(app.utils.shared_cache.RedisBackend) without a real Redis. Speaks RESP2
+and implements the commands the app uses plus a few for inspection:
+PING, AUTH, SELECT, GET, PTTL, SET (EX/PX), DEL, EXISTS, DBSIZE, FLUSHALL.
+Keys expire lazily on access.
+
+Usage (standalone):
+    python -m benchmarks.fake_redis --port 6399
+
+Then start the app with SHARED_CACHE_URL=redis://127.0.0.1:6399/0.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, Optional
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, Exception):
+        return f"-ERR {value}\r\n".encode()
+    return f"+{value}\r\n".encode()
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[bytes, tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: list[bytes]) -> Any:
+        self.commands += 1
+        name = args[0].upper()
+        if name == b"PING":
+            return "PONG"
+        if name in (b"AUTH", b"SELECT"):
+            return "OK"
+        if name == b"GET":
+            return self._live(args[1])
+        if name == b"PTTL":
+            if self._live(args[1]) is None:
+                return -2
+            expires_at = self.data[args[1]][1]
+            return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+        if name == b"SET":
+            expires_at = None
+            options = [arg.upper() for arg in args[3:]]
+            for index, option in enumerate(options):
+                if option in (b"EX", b"PX"):
+                    amount = int(args[3 + index + 1])
+                    expires_at = time.monotonic() + (amount if option == b"EX" else amount / 1000)
+            self.data[args[1]] = (args[2], expires_at)
+            return "OK"
+        if name == b"DEL":
+            return sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+        if name == b"EXISTS":
+            return sum(1 for key in args[1:] if self._live(key) is not None)
+        if name == b"DBSIZE":
+            return len(self.data)
+        if name == b"FLUSHALL":
+            self.data.clear()
+            return "OK"
+        return ValueError(f"unknown command '{name.decode(errors='replace')}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    return
+                if not header.startswith(b"*"):
+                    writer.write(_encode(ValueError("protocol error")))
+                    return
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(_encode(self.execute(args)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class BackgroundRedis:
+    """Run a FakeRedis on a daemon thread with its own event loop."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.store = FakeRedis()
+        self.host, self.port = host, port
+        self._loop = asyncio.new_event_loop()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-redis", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    def start(self) -> "BackgroundRedis":
+        self._server = self._loop.run_until_complete(asyncio.start_server(self.store.handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        async def shutdown() -> None:
+            self._server.close()
+            # wait_closed() also waits for open client connections (3.12+).
+            if hasattr(self._server, "close_clients"):
+                self._server.close_clients()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6399)
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        server = await asyncio.start_server(FakeRedis().handle, args.host, args.port)
+        print(f"fake redis listening on redis://{args.host}:{args.port}/0")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
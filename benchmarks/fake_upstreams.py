@@ -0,0 +1,167 @@
+"""
+Local stand-ins for everything the app calls over the network during a
+load test: the Gemini REST API (via benchmarks.gemini_emulator),
+ritzmediaworld.com (pages and the contact-enquiry API) and the two search
+providers. Pages and search results are served from benchmarks/fixtures.
+
+Usage (standalone, e.g. to run the app by hand against it):
+    python -m benchmarks.fake_upstreams --port 8765 --ttft fixed:0.4
+
+Then start the app with:
+    GEMINI_API_KEY=bench GEMINI_BASE_URL=http://127.0.0.1:8765 \\
+    WEBSITE_URL=http://127.0.0.1:8765/site \\
+    DUCKDUCKGO_SEARCH_URL=http://127.0.0.1:8765/search/duckduckgo \\
+    BING_SEARCH_URL=http://127.0.0.1:8765/search/bing \\
+    LEAD_ENQUIRY_URL=http://127.0.0.1:8765/api/system-settings/contact-enquiry \\
+    uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+from benchmarks.gemini_emulator import (
+    EmulatorConfig,
+    GeminiEmulator,
+    add_emulator_arguments,
+    emulator_config_from_args,
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@dataclass
+class FakeUpstreamConfig:
+    gemini: EmulatorConfig = field(default_factory=EmulatorConfig)
+    page_latency: float = 0.02
+    search_latency: float = 0.15
+    lead_latency: float = 0.3
+    # Share of contact-enquiry posts answered with a 503.
+    lead_error_rate: float = 0.0
+
+
+def create_app(config: FakeUpstreamConfig) -> FastAPI:
+    app = FastAPI(title="Fake upstreams")
+    emulator = GeminiEmulator(config.gemini)
+    app.state.emulator = emulator
+    app.state.calls = {"page": 0, "search": 0, "lead": 0, "lead_failed": 0}
+    app.state.leads = []
+    app.include_router(emulator.router())
+
+    @app.get("/site/{page:path}")
+    async def site_page(page: str):
+        app.state.calls["page"] += 1
+        await asyncio.sleep(config.page_latency)
+        path = FIXTURES_DIR / "site" / (page or "index.html")
+        if not path.is_file() or path.suffix != ".html":
+            return Response(status_code=404)
+        return HTMLResponse(path.read_text(encoding="utf-8"))
+
+    @app.get("/search/{provider}")
+    async def search(provider: str):
+        app.state.calls["search"] += 1
+        await asyncio.sleep(config.search_latency)
+        path = FIXTURES_DIR / "search" / f"{provider}.html"
+        if not path.is_file():
+            return Response(status_code=404)
+        return HTMLResponse(path.read_text(encoding="utf-8"))
+
+    @app.post("/api/system-settings/contact-enquiry")
+    async def contact_enquiry(request: Request):
+        app.state.calls["lead"] += 1
+        lead = await request.json()
+        await asyncio.sleep(config.lead_latency)
+        if random.random() < config.lead_error_rate:
+            app.state.calls["lead_failed"] += 1
+            return JSONResponse({"message": "Service unavailable"}, status_code=503)
+        app.state.leads.append(lead)
+        return {"success": True}
+
+    @app.get("/leads")
+    async def leads():
+        return app.state.leads
+
+    @app.get("/calls")
+    async def calls():
+        return {**app.state.calls, **emulator.stats}
+
+    return app
+
+
+def upstream_env(base_url: str) -> dict[str, str]:
+    """Environment that points the app at fake upstreams served from `base_url`."""
+    base_url = base_url.rstrip("/")
+    return {
+        "GEMINI_API_KEY": "bench-key",
+        "GEMINI_BASE_URL": base_url,
+        "WEBSITE_URL": f"{base_url}/site",
+        "DUCKDUCKGO_SEARCH_URL": f"{base_url}/search/duckduckgo",
+        "BING_SEARCH_URL": f"{base_url}/search/bing",
+        "LEAD_ENQUIRY_URL": f"{base_url}/api/system-settings/contact-enquiry",
+    }
+
+
+class BackgroundServer:
+    """Run a uvicorn app on a daemon thread (used by the load test)."""
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="fake-upstreams", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        sock = self._server.servers[0].sockets[0]
+        host, port = sock.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, timeout: float = 10.0) -> "BackgroundServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("fake upstream server did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeUpstreamConfig()
+    add_emulator_arguments(parser)
+    parser.add_argument("--page-latency", type=float, default=defaults.page_latency)
+    parser.add_argument("--search-latency", type=float, default=defaults.search_latency)
+    parser.add_argument("--lead-latency", type=float, default=defaults.lead_latency)
+    parser.add_argument("--lead-error-rate", type=float, default=defaults.lead_error_rate)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeUpstreamConfig:
+    return FakeUpstreamConfig(
+        gemini=emulator_config_from_args(args),
+        page_latency=args.page_latency,
+        search_latency=args.search_latency,
+        lead_latency=args.lead_latency,
+        lead_error_rate=args.lead_error_rate,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
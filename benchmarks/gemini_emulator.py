@@ -0,0 +1,358 @@
+"""
+Offline emulator for the subset of the Gemini REST API the app uses:
+
+    POST /v1beta/models/{model}:generateContent
+    POST /v1beta/models/{model}:streamGenerateContent?alt=sse
+    POST /v1beta/models/{model}:batchEmbedContents
+
+Embeddings are unit vectors seeded from a hash of the text, so the same
+text always maps to the same vector. Generated text is picked from a fixed
+corpus by prompt hash. Latency comes from configurable distributions
+(time to first token, per-chunk interval, embedding latency) and faults
+can be injected at fixed rates: 429, 5xx, slow streams (a long stall after
+the first chunk) and truncation (streams cut mid-way, non-streaming
+answers ending with MAX_TOKENS).
+
+Usage:
+    python -m benchmarks.gemini_emulator --port 8766 --ttft lognormal:0.6,0.4 --rate-429 0.05
+    GEMINI_API_KEY=any GEMINI_BASE_URL=http://127.0.0.1:8766 uvicorn app.main:app
+
+GET/POST /emulator/config reads or patches the config of a running
+emulator (e.g. to start throttling mid-run); GET /emulator/stats returns
+call and fault counters.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
+import numpy as np
+import uvicorn
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_EMBEDDING_DIM = 3072  # gemini-embedding-001, matches the committed index
+
+_ANSWER_WORDS = (
+    "Ritz Media World plans and runs integrated campaigns across print radio television outdoor and digital "
+    "media. Our team starts with your audience and goals, builds a media plan, produces the creative and "
+    "reports on reach leads and cost per acquisition every week so you can see what each channel delivers. "
+    "For most clients we recommend combining search and social media with one high reach channel such as "
+    "newspaper or FM radio, then shifting budget toward whatever produces qualified enquiries at the lowest "
+    "cost. Share your city, budget and timeline and we will prepare a tailored proposal."
+).split()
+
+_ERROR_STATUS_NAMES = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+
+
+class StreamTruncated(Exception):
+    """Raised inside a streaming body to drop the connection mid-response."""
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """
+    A latency distribution in seconds, written as "kind:params":
+    "fixed:0.4", "uniform:0.2,0.8", "normal:0.5,0.1", "lognormal:0.5,0.4"
+    (lognormal takes the median and sigma of the underlying normal).
+    """
+
+    kind: str
+    params: tuple[float, ...]
+
+    @classmethod
+    def parse(cls, spec: "str | float | Distribution") -> "Distribution":
+        if isinstance(spec, Distribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("fixed", (float(spec),))
+        kind, _, raw = str(spec).partition(":")
+        if not raw:
+            return cls("fixed", (float(kind),))
+        params = tuple(float(p) for p in raw.split(","))
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Unsupported latency distribution: {spec!r}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(max(median, 1e-9)), sigma)
+        return max(0.0, value)
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(str(p) for p in self.params)}"
+
+
+@dataclass
+class EmulatorConfig:
+    ttft: Distribution = field(default_factory=lambda: Distribution.parse("lognormal:0.4,0.3"))
+    chunk_interval: Distribution = field(default_factory=lambda: Distribution.parse("fixed:0.05"))
+    embed_latency: Distribution = field(default_factory=lambda: Distribution.parse("fixed:0.05"))
+    chunk_words: int = 3
+    answer_words: int = 80
+    embedding_dim: int = DEFAULT_EMBEDDING_DIM
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    slow_stream_rate: float = 0.0
+    slow_stream_stall: float = 5.0
+    truncation_rate: float = 0.0
+    seed: int = 0
+
+    def update(self, changes: dict) -> None:
+        names = {f.name for f in fields(self)}
+        for name, value in changes.items():
+            if name not in names:
+                raise ValueError(f"Unknown emulator setting: {name}")
+            current = getattr(self, name)
+            if isinstance(current, Distribution):
+                value = Distribution.parse(value)
+            else:
+                value = type(current)(value)
+            setattr(self, name, value)
+
+    def as_dict(self) -> dict:
+        values = {f.name: getattr(self, f.name) for f in fields(self)}
+        return {name: str(value) if isinstance(value, Distribution) else value for name, value in values.items()}
+
+
+def embedding_for(text: str, dim: int = DEFAULT_EMBEDDING_DIM) -> list[float]:
+    """Deterministic unit vector for `text`."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+def answer_for(prompt: str, words: int) -> list[str]:
+    offset = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=4).digest(), "big")
+    return [_ANSWER_WORDS[(offset + i) % len(_ANSWER_WORDS)] for i in range(words)]
+
+
+def _content_text(content: Optional[dict]) -> str:
+    parts = (content or {}).get("parts") or []
+    return "\n".join(str(part.get("text", "")) for part in parts)
+
+
+def _prompt_text(body: dict) -> str:
+    return "\n".join(_content_text(content) for content in body.get("contents") or [])
+
+
+def _chunks(words: list[str], size: int) -> list[str]:
+    size = max(1, size)
+    groups = [words[i:i + size] for i in range(0, len(words), size)]
+    return [" ".join(group) + ("" if index == len(groups) - 1 else " ") for index, group in enumerate(groups)]
+
+
+def _candidate(text: str, finish: Optional[str] = None) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finish:
+        candidate["finishReason"] = finish
+    return {"candidates": [candidate]}
+
+
+def _usage(prompt: str, words: list[str]) -> dict:
+    prompt_tokens = max(1, len(prompt) // 4)
+    output_tokens = len(words)
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": output_tokens,
+        "totalTokenCount": prompt_tokens + output_tokens,
+    }
+
+
+def _error_response(status: int) -> JSONResponse:
+    headers = {"Retry-After": "1"} if status == 429 else None
+    return JSONResponse(
+        {"error": {"code": status, "message": "Injected fault", "status": _ERROR_STATUS_NAMES.get(status, "UNKNOWN")}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+class GeminiEmulator:
+    def __init__(self, config: Optional[EmulatorConfig] = None) -> None:
+        self.config = config or EmulatorConfig()
+        self.rng = random.Random(self.config.seed)
+        self.stats: dict[str, int] = {
+            "generate": 0, "stream": 0, "embed": 0, "embedded_texts": 0,
+            "fault_429": 0, "fault_5xx": 0, "fault_slow_stream": 0, "fault_truncation": 0,
+        }
+
+    def _roll(self, rate: float) -> bool:
+        return rate > 0 and self.rng.random() < rate
+
+    def _injected_error(self) -> Optional[JSONResponse]:
+        if self._roll(self.config.rate_429):
+            self.stats["fault_429"] += 1
+            return _error_response(429)
+        if self._roll(self.config.rate_5xx):
+            self.stats["fault_5xx"] += 1
+            return _error_response(self.rng.choice((500, 503)))
+        return None
+
+    async def generate(self, body: dict) -> JSONResponse | dict:
+        self.stats["generate"] += 1
+        error = self._injected_error()
+        if error is not None:
+            return error
+        cfg = self.config
+        prompt = _prompt_text(body)
+        words = answer_for(prompt, cfg.answer_words)
+        chunks = _chunks(words, cfg.chunk_words)
+        finish = "STOP"
+        if self._roll(cfg.truncation_rate):
+            self.stats["fault_truncation"] += 1
+            chunks = chunks[: max(1, len(chunks) // 2)]
+            finish = "MAX_TOKENS"
+        delay = cfg.ttft.sample(self.rng) + sum(cfg.chunk_interval.sample(self.rng) for _ in chunks[1:])
+        await asyncio.sleep(delay)
+        return _candidate("".join(chunks), finish=finish) | {"usageMetadata": _usage(prompt, words)}
+
+    async def stream(self, body: dict) -> JSONResponse | StreamingResponse:
+        self.stats["stream"] += 1
+        error = self._injected_error()
+        if error is not None:
+            return error
+        cfg = self.config
+        prompt = _prompt_text(body)
+        words = answer_for(prompt, cfg.answer_words)
+        chunks = _chunks(words, cfg.chunk_words)
+        # Fault decisions and delays are drawn up front so one request's
+        # randomness does not interleave with another's.
+        ttft = cfg.ttft.sample(self.rng)
+        intervals = [cfg.chunk_interval.sample(self.rng) for _ in chunks]
+        slow = self._roll(cfg.slow_stream_rate)
+        truncate_at = len(chunks) // 2 if self._roll(cfg.truncation_rate) else None
+        if slow:
+            self.stats["fault_slow_stream"] += 1
+        if truncate_at is not None:
+            self.stats["fault_truncation"] += 1
+
+        async def frames():
+            await asyncio.sleep(ttft)
+            for index, text in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(intervals[index])
+                if index == 1 and slow:
+                    await asyncio.sleep(cfg.slow_stream_stall)
+                if truncate_at is not None and index == max(1, truncate_at):
+                    raise StreamTruncated("Injected truncation")
+                last = index == len(chunks) - 1
+                payload = _candidate(text, finish="STOP" if last else None)
+                if last:
+                    payload["usageMetadata"] = _usage(prompt, words)
+                yield f"data: {json.dumps(payload)}\r\n\r\n"
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    async def batch_embed(self, body: dict) -> JSONResponse | dict:
+        self.stats["embed"] += 1
+        error = self._injected_error()
+        if error is not None:
+            return error
+        requests = body.get("requests") or []
+        self.stats["embedded_texts"] += len(requests)
+        await asyncio.sleep(self.config.embed_latency.sample(self.rng))
+        embeddings = []
+        for item in requests:
+            dim = int(item.get("outputDimensionality") or self.config.embedding_dim)
+            embeddings.append({"values": embedding_for(_content_text(item.get("content")), dim)})
+        return {"embeddings": embeddings}
+
+    def router(self) -> APIRouter:
+        router = APIRouter()
+
+        @router.post("/{version}/models/{model}:generateContent")
+        async def generate_content(version: str, model: str, request: Request):
+            return await self.generate(await request.json())
+
+        @router.post("/{version}/models/{model}:streamGenerateContent")
+        async def stream_generate_content(version: str, model: str, request: Request):
+            return await self.stream(await request.json())
+
+        @router.post("/{version}/models/{model}:batchEmbedContents")
+        async def batch_embed_contents(version: str, model: str, request: Request):
+            return await self.batch_embed(await request.json())
+
+        @router.get("/emulator/config")
+        async def get_config():
+            return self.config.as_dict()
+
+        @router.post("/emulator/config")
+        async def patch_config(request: Request):
+            try:
+                self.config.update(await request.json())
+            except (TypeError, ValueError) as exc:
+                return JSONResponse({"error": str(exc)}, status_code=400)
+            return self.config.as_dict()
+
+        @router.get("/emulator/stats")
+        async def get_stats():
+            return self.stats
+
+        return router
+
+
+def create_app(config: Optional[EmulatorConfig] = None) -> FastAPI:
+    emulator = GeminiEmulator(config)
+    app = FastAPI(title="Gemini emulator")
+    app.state.emulator = emulator
+    app.include_router(emulator.router())
+    return app
+
+
+def add_emulator_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = EmulatorConfig()
+    group = parser.add_argument_group("Gemini emulator")
+    group.add_argument("--ttft", default=str(defaults.ttft), help="time-to-first-token distribution")
+    group.add_argument("--chunk-interval", default=str(defaults.chunk_interval), help="delay between stream chunks")
+    group.add_argument("--embed-latency", default=str(defaults.embed_latency))
+    group.add_argument("--chunk-words", type=int, default=defaults.chunk_words)
+    group.add_argument("--answer-words", type=int, default=defaults.answer_words)
+    group.add_argument("--rate-429", type=float, default=defaults.rate_429)
+    group.add_argument("--rate-5xx", type=float, default=defaults.rate_5xx)
+    group.add_argument("--slow-stream-rate", type=float, default=defaults.slow_stream_rate)
+    group.add_argument("--slow-stream-stall", type=float, default=defaults.slow_stream_stall)
+    group.add_argument("--truncation-rate", type=float, default=defaults.truncation_rate)
+    group.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def emulator_config_from_args(args: argparse.Namespace) -> EmulatorConfig:
+    return EmulatorConfig(
+        ttft=Distribution.parse(args.ttft),
+        chunk_interval=Distribution.parse(args.chunk_interval),
+        embed_latency=Distribution.parse(args.embed_latency),
+        chunk_words=args.chunk_words,
+        answer_words=args.answer_words,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        slow_stream_rate=args.slow_stream_rate,
+        slow_stream_stall=args.slow_stream_stall,
+        truncation_rate=args.truncation_rate,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    add_emulator_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(emulator_config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+End-to-end load test: runs the FastAPI app in a subprocess against local
+fake upstreams (Gemini, ritzmediaworld.com, search providers), drives the
+chat endpoints at a fixed concurrency with a weighted question mix and
+reports throughput, TTFT and total-latency percentiles plus the app
+process's thread and memory high-water marks.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 8 --requests 200
+    python -m benchmarks.load_test --update-baseline
+    python -m benchmarks.load_test --ttft lognormal:1.5,0.5 --rate-429 0.1 --no-baseline
+
+Each message gets a unique suffix by default so the answer cache does not
+turn the run into a cache benchmark; --repeat-messages disables that.
+
+Results are compared against benchmarks/baselines/load_test.json; latency
+rising or throughput dropping by more than --tolerance is reported as a
+regression (exit code 1 with --fail-on-regression).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.fake_upstreams import (
+    BackgroundServer,
+    FIXTURES_DIR,
+    add_config_arguments,
+    config_from_args,
+    create_app,
+    upstream_env,
+)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).parent / "baselines" / "load_test.json"
+ENDPOINTS = ("message", "chat", "stream")
+STARTUP_TIMEOUT_SECONDS = 60.0
+REQUEST_TIMEOUT_SECONDS = 60.0
+DEFAULT_TOLERANCE = 0.25
+
+# Metrics compared against the baseline; True means higher is better.
+_COMPARED = {
+    "throughput_rps": True,
+    "ttft_p50_ms": False,
+    "ttft_p95_ms": False,
+    "total_p50_ms": False,
+    "total_p95_ms": False,
+    "total_p99_ms": False,
+}
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    kind: str
+    ok: bool
+    ttft: float
+    total: float
+
+
+@dataclass
+class EndpointStats:
+    samples: list[Sample] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+
+def _percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 1)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_questions(path: Path = FIXTURES_DIR / "questions.json") -> list[dict]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class ProcessSampler:
+    """Poll /proc for the app's thread count and resident memory."""
+
+    def __init__(self, pid: int, interval: float = 0.05) -> None:
+        self.pid = pid
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="proc-sampler", daemon=True)
+
+    def _read_status(self) -> dict[str, str]:
+        status: dict[str, str] = {}
+        try:
+            with open(f"/proc/{self.pid}/status", encoding="ascii") as handle:
+                for line in handle:
+                    key, _, value = line.partition(":")
+                    status[key] = value.strip()
+        except OSError:
+            pass
+        return status
+
+    def sample(self) -> None:
+        status = self._read_status()
+        if "Threads" in status:
+            self.peak_threads = max(self.peak_threads, int(status["Threads"]))
+        # VmHWM is the kernel's own RSS high-water mark, so short spikes
+        # between polls are still captured.
+        for key in ("VmHWM", "VmRSS"):
+            if key in status:
+                self.peak_rss_kb = max(self.peak_rss_kb, int(status[key].split()[0]))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def start(self) -> "ProcessSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1)
+        self.sample()
+
+
+def start_app(env_overrides: dict[str, str], port: int) -> subprocess.Popen:
+    env = {**os.environ, **env_overrides, "LOG_LEVEL": "WARNING", "PYTHONUNBUFFERED": "1"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_healthy(base_url: str, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited during startup with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("app did not become healthy in time")
+
+
+async def _call(client: httpx.AsyncClient, endpoint: str, message: str) -> tuple[bool, float, float]:
+    """Returns (ok, ttft, total). TTFT is the first answer chunk for streams."""
+    start = time.perf_counter()
+    if endpoint == "stream":
+        ttft: Optional[float] = None
+        ok = False
+        async with client.stream("POST", "/v1/message/stream", json={"message": message}) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                payload = json.loads(line[len("data: "):])
+                if ttft is None and ("chunk" in payload or payload.get("final")):
+                    ttft = time.perf_counter() - start
+                if payload.get("final"):
+                    ok = response.status_code == 200 and bool(payload.get("answer"))
+        total = time.perf_counter() - start
+        return ok, ttft if ttft is not None else total, total
+
+    path = "/v1/message" if endpoint == "message" else "/v1/chat"
+    response = await client.post(path, json={"message": message})
+    total = time.perf_counter() - start
+    ok = response.status_code == 200 and bool(response.json().get("answer"))
+    return ok, total, total
+
+
+async def run_endpoint(
+    base_url: str,
+    endpoint: str,
+    questions: list[dict],
+    concurrency: int,
+    total_requests: int,
+    seed: int,
+    cache_busting: bool,
+) -> EndpointStats:
+    rng = random.Random(seed)
+    weights = [q.get("weight", 1) for q in questions]
+    plan = rng.choices(questions, weights=weights, k=total_requests)
+    stats = EndpointStats()
+    next_index = 0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT_SECONDS, limits=limits) as client:
+
+        async def worker() -> None:
+            nonlocal next_index
+            while next_index < len(plan):
+                index = next_index
+                next_index += 1
+                question = plan[index]
+                message = question["message"]
+                if cache_busting:
+                    message = f"{message} (ref {index})"
+                try:
+                    ok, ttft, total = await _call(client, endpoint, message)
+                except (httpx.HTTPError, ValueError):
+                    ok, ttft, total = False, 0.0, 0.0
+                stats.samples.append(Sample(endpoint, question.get("kind", ""), ok, ttft, total))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        stats.wall_seconds = time.perf_counter() - start
+    return stats
+
+
+def summarize(stats: EndpointStats) -> dict:
+    ok_samples = [s for s in stats.samples if s.ok]
+    ttfts = [s.ttft for s in ok_samples]
+    totals = [s.total for s in ok_samples]
+    return {
+        "requests": len(stats.samples),
+        "errors": len(stats.samples) - len(ok_samples),
+        "throughput_rps": round(len(ok_samples) / stats.wall_seconds, 2) if stats.wall_seconds else 0.0,
+        "ttft_p50_ms": _ms(_percentile(ttfts, 50)),
+        "ttft_p95_ms": _ms(_percentile(ttfts, 95)),
+        "ttft_p99_ms": _ms(_percentile(ttfts, 99)),
+        "total_p50_ms": _ms(_percentile(totals, 50)),
+        "total_p95_ms": _ms(_percentile(totals, 95)),
+        "total_p99_ms": _ms(_percentile(totals, 99)),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for endpoint, stats in current.get("endpoints", {}).items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if not base:
+            continue
+        for metric, higher_is_better in _COMPARED.items():
+            now, then = stats.get(metric), base.get(metric)
+            if not now or not then:
+                continue
+            change = (now - then) / then
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{endpoint}.{metric}: {then} -> {now} ({change:+.0%})")
+    return regressions
+
+
+def print_report(report: dict, baseline: Optional[dict]) -> None:
+    header = f"{'endpoint':<9} {'reqs':>5} {'err':>4} {'rps':>7} {'ttft p50':>9} {'ttft p95':>9} " \
+             f"{'total p50':>10} {'total p95':>10} {'total p99':>10}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, s in report["endpoints"].items():
+        print(
+            f"{endpoint:<9} {s['requests']:>5} {s['errors']:>4} {s['throughput_rps']:>7} "
+            f"{s['ttft_p50_ms']!s:>9} {s['ttft_p95_ms']!s:>9} "
+            f"{s['total_p50_ms']!s:>10} {s['total_p95_ms']!s:>10} {s['total_p99_ms']!s:>10}"
+        )
+        base = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if base:
+            print(
+                f"{'  base':<9} {'':>5} {'':>4} {base.get('throughput_rps')!s:>7} "
+                f"{base.get('ttft_p50_ms')!s:>9} {base.get('ttft_p95_ms')!s:>9} "
+                f"{base.get('total_p50_ms')!s:>10} {base.get('total_p95_ms')!s:>10} {base.get('total_p99_ms')!s:>10}"
+            )
+    process = report["process"]
+    print(f"\npeak threads: {process['peak_threads']}   peak RSS: {process['peak_rss_mb']} MiB")
+
+
+def run(args: argparse.Namespace) -> dict:
+    upstream_config = config_from_args(args)
+    upstreams = BackgroundServer(create_app(upstream_config)).start()
+    port = _free_port()
+    app_url = f"http://127.0.0.1:{port}"
+    process = start_app(upstream_env(upstreams.base_url), port)
+    sampler: Optional[ProcessSampler] = None
+    try:
+        wait_until_healthy(app_url, process)
+        sampler = ProcessSampler(process.pid).start()
+        questions = load_questions()
+        endpoints = {}
+        for offset, endpoint in enumerate(args.endpoints):
+            stats = asyncio.run(
+                run_endpoint(
+                    app_url, endpoint, questions, args.concurrency, args.requests,
+                    seed=args.seed + offset, cache_busting=args.cache_busting,
+                )
+            )
+            endpoints[endpoint] = summarize(stats)
+        sampler.stop()
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        upstreams.stop()
+
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "cache_busting": args.cache_busting,
+            "gemini": upstream_config.gemini.as_dict(),
+        },
+        "endpoints": endpoints,
+        "process": {
+            "peak_threads": sampler.peak_threads if sampler else None,
+            "peak_rss_mb": round(sampler.peak_rss_kb / 1024, 1) if sampler else None,
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=120, help="requests per endpoint")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument(
+        "--repeat-messages",
+        dest="cache_busting",
+        action="store_false",
+        help="send the fixture messages verbatim so repeats hit the answer cache",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--no-baseline", action="store_true", help="skip the baseline comparison")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    report = run(args)
+    baseline = None
+    if not args.no_baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    print_report(report, baseline)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if baseline is not None:
+        if baseline.get("config") != report["config"]:
+            print("note: baseline was recorded with a different config; comparison is indicative only")
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
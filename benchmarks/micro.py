@@ -0,0 +1,278 @@
+"""
+Micro-benchmarks for the pure-CPU helpers that run on every request:
+intent routing, the chat_service fast-path checks, SSE word chunking,
+answer clean-up and response text extraction.
+
+Each case runs over a fixed set of representative inputs. ns/op is the
+best of several timed repeats divided by the number of calls; peak B/op is
+the tracemalloc high-water mark of transient allocations for one pass
+over the inputs, divided by the number of inputs.
+
+Usage:
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter intent --repeats 7
+    python -m benchmarks.micro --update-baseline
+
+Results are compared against benchmarks/baselines/micro.json; a case whose
+ns/op grows by more than --tolerance is flagged as a regression (exit code
+1 with --fail-on-regression).
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from benchmarks.fake_upstreams import FIXTURES_DIR
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "micro.json"
+DEFAULT_TOLERANCE = 0.3
+TARGET_REPEAT_SECONDS = 0.2
+
+_QUESTIONS = [q["message"] for q in json.loads((FIXTURES_DIR / "questions.json").read_text(encoding="utf-8"))] + [
+    "Which are the top FM radio stations in Delhi for advertising?",
+    "Can you run social media management and performance ads together for my brand?",
+    "Which brands has Ritz Media World worked with?",
+    "What should I do next to get started with a campaign?",
+    "Do you produce corporate videos and ad films?",
+    "I need more leads for my coaching institute, can you help with lead generation?",
+    "Tell me something about the weather today",
+    "Hello there! I'm looking for a digital marketing partner for our new restaurant chain in Noida and Gurgaon.",
+]
+
+_ANSWERS = [
+    "The provided information does not specify the exact turnaround time. However, we typically launch "
+    "radio campaigns within a week of approval.",
+    "Ritz Media World offers print, radio, outdoor and digital campaigns. However, the provided context does not "
+    "specify pricing for each channel. Please share your requirement through the enquiry form.",
+    "We plan and execute integrated campaigns across print, radio, television, outdoor and digital media, with "
+    "weekly reporting on reach, leads and cost per acquisition, and",
+    "Something went wrong. Please contact us: +91-7290002168",
+    "Our creative studio handles video production, graphic design and copywriting in English and Hindi; "
+    "campaigns are optimised while they run, " * 3,
+]
+
+_STREAM_BUFFERS = [
+    "We plan and exe",
+    "Ritz Media World plans and runs integrated campaigns across print radio ",
+    "Our team starts with your audience and goals,\nbuilds a media plan, produces the creative and reports on reach",
+    "no-whitespace-token",
+    "",
+]
+
+
+class _FakeDoc:
+    def __init__(self, page_content: str) -> None:
+        self.page_content = page_content
+
+
+_FOUNDED_DOCS = [
+    _FakeDoc("Ritz Media World was founded in 2008 in Noida and has served clients across India since then."),
+    _FakeDoc("In 2019 the agency expanded its digital team; by 2023 it ran campaigns in over 40 cities."),
+    _FakeDoc("Print, radio and outdoor media plans for education and real estate clients."),
+]
+_FOUNDED_WEB = "About us: established 2008. Awards 2015, 2018, 2021. " * 10
+
+_PIPELINE_STATES = [
+    (
+        {
+            "question": "Do you run radio campaigns?",
+            "docs": _FOUNDED_DOCS,
+            "answer": "Yes, we plan and run radio campaigns across India.",
+            "web_context": _FOUNDED_WEB,
+            "developer_context": "",
+            "external_context": "",
+        },
+    ),
+]
+
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[..., Any]
+    inputs: list[tuple]
+
+
+def _response_chunks() -> list[Any]:
+    from google.genai import types
+
+    with_text = types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text="integrated campaigns ")]))]
+    )
+    multi_part = types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text="print "), types.Part(text="radio ")])
+            )
+        ]
+    )
+    return ["plain string chunk ", {"text": "dict chunk "}, with_text, multi_part]
+
+
+def build_cases() -> list[Case]:
+    from app.api.v1 import chat
+    from app.rag.graph import _extract_text, build_rag_graph, build_rag_pipeline
+    from app.services import chat_service
+    from app.utils.genai_adapter import _extract_text_from_chunk
+    from app.utils.intent_engine import detect_intent, get_intent_response
+
+    questions = [(q,) for q in _QUESTIONS]
+    fast_path_checks = [
+        getattr(chat_service, name)
+        for name in sorted(dir(chat_service))
+        if name.startswith("_is_") and name.endswith("_query")
+    ]
+
+    def all_fast_path_checks(question: str) -> bool:
+        # Mirrors run_chat, which can evaluate every check for a general question.
+        return any([check(question) for check in fast_path_checks])
+
+    content_payloads = [
+        ("plain answer text",),
+        ({"text": "dict block"},),
+        ([{"type": "text", "text": "first block "}, "second ", {"type": "text", "text": "third"}],),
+        (None,),
+    ]
+    return [
+        Case("intent.get_intent_response", get_intent_response, questions),
+        Case("intent.detect_intent", detect_intent, questions),
+        Case("chat_service.fast_path_checks", all_fast_path_checks, questions),
+        Case("chat.split_word_safe_chunks", chat._split_word_safe_chunks, [(b,) for b in _STREAM_BUFFERS]),
+        Case("chat.iter_word_chunks", chat._iter_word_chunks, [(a,) for a in _ANSWERS]),
+        Case(
+            "chat_service.remove_preface",
+            chat_service._remove_unwanted_provided_information_preface,
+            [(a,) for a in _ANSWERS],
+        ),
+        Case("chat_service.clean_internal_answer", chat_service._clean_internal_answer, [(a,) for a in _ANSWERS]),
+        Case(
+            "chat_service.extract_founded_year",
+            chat_service.extract_founded_year_answer,
+            [(q, _FOUNDED_DOCS, _FOUNDED_WEB) for q in _QUESTIONS],
+        ),
+        Case("graph.extract_text", _extract_text, content_payloads),
+        Case("genai_adapter.extract_text_from_chunk", _extract_text_from_chunk, [(c,) for c in _response_chunks()]),
+        # Runner overhead only: docs and answer are preset, so no node calls out.
+        Case("graph.pipeline_invoke", build_rag_pipeline().invoke, _PIPELINE_STATES),
+        Case("graph.langgraph_invoke", build_rag_graph().invoke, _PIPELINE_STATES),
+    ]
+
+
+def _run_pass(case: Case) -> None:
+    func = case.func
+    for args in case.inputs:
+        func(*args)
+
+
+def _calibrate(case: Case) -> int:
+    """Number of passes over the inputs that takes roughly TARGET_REPEAT_SECONDS."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            _run_pass(case)
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_REPEAT_SECONDS / 5 or loops >= 1 << 20:
+            return max(1, int(loops * TARGET_REPEAT_SECONDS / max(elapsed, 1e-9)))
+        loops *= 4
+
+
+def measure(case: Case, repeats: int) -> dict:
+    _run_pass(case)  # warm caches (regex compilation, lazy imports)
+    loops = _calibrate(case)
+    calls = loops * len(case.inputs)
+    best = float("inf")
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            for _ in range(loops):
+                _run_pass(case)
+            best = min(best, time.perf_counter_ns() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline_bytes, _ = tracemalloc.get_traced_memory()
+        _run_pass(case)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ns_per_op": round(best / calls, 1),
+        "peak_bytes_per_op": round(max(0, peak - baseline_bytes) / len(case.inputs)),
+        "inputs": len(case.inputs),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base or not base.get("ns_per_op"):
+            continue
+        change = (current["ns_per_op"] - base["ns_per_op"]) / base["ns_per_op"]
+        if change > tolerance:
+            regressions.append(f"{name}: {base['ns_per_op']} -> {current['ns_per_op']} ns/op ({change:+.0%})")
+    return regressions
+
+
+def print_report(results: dict, baseline: Optional[dict]) -> None:
+    header = f"{'case':<40} {'ns/op':>10} {'peak B/op':>10} {'base ns/op':>11} {'change':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, current in results.items():
+        base = (baseline or {}).get("cases", {}).get(name, {})
+        base_ns = base.get("ns_per_op")
+        change = f"{(current['ns_per_op'] - base_ns) / base_ns:+.0%}" if base_ns else ""
+        print(
+            f"{name:<40} {current['ns_per_op']:>10} {current['peak_bytes_per_op']:>10} "
+            f"{base_ns if base_ns is not None else '':>11} {change:>8}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = {
+        case.name: measure(case, args.repeats)
+        for case in build_cases()
+        if args.filter in case.name
+    }
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    print_report(results, baseline)
+
+    if args.update_baseline:
+        payload = {"python": sys.version.split()[0], "cases": results}
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
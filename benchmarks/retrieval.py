@@ -0,0 +1,388 @@
+"""
+Retrieval quality-vs-latency benchmark over the ingested corpus.
+
+For every combination of chunking parameters, embedding dimension and
+retriever it reports recall@k (share of labelled questions with a relevant
+chunk in the top k), MRR, per-query search latency and index memory.
+Labels live in benchmarks/fixtures/retrieval_labels.json: a chunk counts
+as relevant if it contains one of the question's labelled phrases, so the
+same labels work for any chunking.
+
+Retrievers:
+    flat_l2   exact L2 search on raw vectors (what get_retriever uses today)
+    flat_ip   exact cosine search on normalised vectors
+    hnsw      HNSW graph (M=32, efSearch=64)
+    ivf_flat  inverted lists, nlist=sqrt(n), nprobe=2
+    sq8       8-bit scalar-quantised flat index
+    bm25      lexical only
+    hybrid    flat_l2 and bm25 fused with reciprocal rank fusion
+
+Embeddings (all offline by default):
+    hashed    feature-hashed unigrams+bigrams; deterministic and keyless,
+              lexical by nature, so absolute quality is only indicative
+    cached    Gemini vectors from benchmarks/.cache; the committed index
+              seeds the cache for the default chunking
+    live      Gemini API (needs GEMINI_API_KEY); fills the cache so later
+              runs can use --embeddings cached
+
+Usage:
+    python -m benchmarks.retrieval
+    python -m benchmarks.retrieval --embeddings live --chunking 1000:200 && \\
+        python -m benchmarks.retrieval --embeddings cached --chunking 1000:200
+    python -m benchmarks.retrieval --dims 0 768 --retrievers flat_l2 hnsw hybrid --json out.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+
+from benchmarks.fake_upstreams import FIXTURES_DIR
+
+CACHE_DIR = Path(__file__).parent / ".cache"
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+HASHED_DIM = 3072
+RRF_K = 60
+RETRIEVERS = ("flat_l2", "flat_ip", "hnsw", "ivf_flat", "sq8", "bm25", "hybrid")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _text_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# ---------------------------------------------------------------- embeddings
+
+def hashed_embeddings(texts: list[str], dim: int = HASHED_DIM) -> np.ndarray:
+    """Signed feature hashing of unigrams and bigrams, L2-normalised."""
+    matrix = np.zeros((len(texts), dim), dtype="float32")
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % dim
+            matrix[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class EmbeddingCache:
+    """Text-hash -> vector store for Gemini embeddings, kept in an .npz."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.vectors: dict[str, np.ndarray] = {}
+        if path.exists():
+            with np.load(path) as data:
+                self.vectors = {key: data[key] for key in data.files}
+
+    def seed_from_index(self, index_dir: Path) -> None:
+        """Add the chunk vectors of the committed FAISS index."""
+        import pickle
+
+        if not (index_dir / "index.faiss").exists():
+            return
+        index = faiss.read_index(str(index_dir / "index.faiss"))
+        with open(index_dir / "index.pkl", "rb") as handle:
+            docstore, id_map = pickle.load(handle)
+        for position, doc_id in id_map.items():
+            text = docstore.search(doc_id).page_content
+            self.vectors.setdefault(_text_key(text), index.reconstruct(position))
+
+    def lookup(self, texts: list[str]) -> tuple[Optional[np.ndarray], list[str]]:
+        missing = [t for t in texts if _text_key(t) not in self.vectors]
+        if missing:
+            return None, missing
+        return np.stack([self.vectors[_text_key(t)] for t in texts]).astype("float32"), []
+
+    def add(self, texts: list[str], vectors: np.ndarray) -> None:
+        for text, vector in zip(texts, vectors):
+            self.vectors[_text_key(text)] = np.asarray(vector, dtype="float32")
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(self.path, **self.vectors)
+
+
+def make_embedder(mode: str) -> Callable[[list[str], bool], np.ndarray]:
+    if mode == "hashed":
+        return lambda texts, is_query: hashed_embeddings(texts)
+
+    from app.core.config import settings
+
+    cache = EmbeddingCache(CACHE_DIR / "gemini-embedding-001.npz")
+    cache.seed_from_index(Path(settings.CHROMA_PERSIST_DIR))
+
+    def embed(texts: list[str], is_query: bool) -> np.ndarray:
+        vectors, missing = cache.lookup(texts)
+        if vectors is not None:
+            return vectors
+        if mode == "cached":
+            raise SystemExit(
+                f"{len(missing)} texts have no cached embedding; run once with --embeddings live "
+                "(needs GEMINI_API_KEY) to fill the cache."
+            )
+        from app.utils.genai_adapter import GeminiEmbeddings
+
+        embedder = GeminiEmbeddings(model=EMBEDDING_MODEL)
+        if is_query:
+            fresh = [embedder.embed_query(text) for text in missing]
+        else:
+            fresh = embedder.embed_documents(missing)
+        cache.add(missing, np.asarray(fresh, dtype="float32"))
+        cache.save()
+        return cache.lookup(texts)[0]
+
+    return embed
+
+
+def truncate_dims(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Keep the leading `dim` components (Matryoshka-style) and renormalise."""
+    if not dim or dim >= vectors.shape[1]:
+        return vectors
+    cut = np.ascontiguousarray(vectors[:, :dim])
+    norms = np.linalg.norm(cut, axis=1, keepdims=True)
+    return cut / np.maximum(norms, 1e-12)
+
+
+# ---------------------------------------------------------------- retrievers
+
+class BM25:
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.docs = [Counter(tokenize(text)) for text in texts]
+        self.lengths = [sum(doc.values()) for doc in self.docs]
+        self.avg_length = sum(self.lengths) / max(1, len(self.lengths))
+        df: Counter = Counter()
+        for doc in self.docs:
+            df.update(doc.keys())
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+
+    def search(self, query: str, k: int) -> list[int]:
+        terms = [t for t in tokenize(query) if t in self.idf]
+        scores = []
+        for position, (doc, length) in enumerate(zip(self.docs, self.lengths)):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length)
+            for term in terms:
+                freq = doc.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append((score, position))
+        scores.sort(reverse=True)
+        return [position for score, position in scores[:k] if score > 0]
+
+    def memory_bytes(self) -> int:
+        return sum(sys.getsizeof(doc) for doc in self.docs) + sys.getsizeof(self.idf)
+
+
+def build_faiss(kind: str, vectors: np.ndarray) -> faiss.Index:
+    n, dim = vectors.shape
+    if kind == "flat_l2":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "flat_ip":
+        index = faiss.IndexFlatIP(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32)
+        index.hnsw.efSearch = 64
+    elif kind == "ivf_flat":
+        nlist = max(1, int(math.sqrt(n)))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+        index.train(vectors)
+        index.nprobe = 2
+    elif kind == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+        index.train(vectors)
+    else:
+        raise ValueError(kind)
+    index.add(vectors)
+    return index
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def rrf(rankings: list[list[int]], k: int) -> list[int]:
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return [position for position, _ in sorted(scores.items(), key=lambda item: -item[1])[:k]]
+
+
+# ---------------------------------------------------------------- evaluation
+
+@dataclass
+class Labelled:
+    question: str
+    relevant: set[int]
+
+
+def label_chunks(texts: list[str], labels: list[dict]) -> list[Labelled]:
+    labelled = []
+    for label in labels:
+        relevant = {i for i, text in enumerate(texts) if any(p in text for p in label["relevant"])}
+        if relevant:
+            labelled.append(Labelled(label["question"], relevant))
+    return labelled
+
+
+def evaluate(
+    search: Callable[[int], list[int]],
+    queries: list[Labelled],
+    ks: list[int],
+) -> dict:
+    depth = max(ks)
+    latencies = []
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks = []
+    for number, query in enumerate(queries):
+        start = time.perf_counter()
+        ranking = search(number)[:depth]
+        latencies.append(time.perf_counter() - start)
+        first = next((rank for rank, position in enumerate(ranking) if position in query.relevant), None)
+        reciprocal_ranks.append(0.0 if first is None else 1.0 / (first + 1))
+        for k in ks:
+            if first is not None and first < k:
+                hits[k] += 1
+    latencies.sort()
+    return {
+        **{f"recall@{k}": round(hits[k] / len(queries), 3) for k in ks},
+        "mrr": round(sum(reciprocal_ranks) / len(queries), 3),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p95_us": round(latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)] * 1e6, 1),
+    }
+
+
+def run_config(
+    texts: list[str],
+    doc_vectors: np.ndarray,
+    query_vectors: np.ndarray,
+    queries: list[Labelled],
+    retriever: str,
+    ks: list[int],
+) -> dict:
+    depth = max(ks)
+    start = time.perf_counter()
+    memory = 0
+    if retriever in ("bm25", "hybrid"):
+        bm25 = BM25(texts)
+        memory += bm25.memory_bytes()
+    if retriever != "bm25":
+        kind = "flat_l2" if retriever == "hybrid" else retriever
+        vectors, queries_matrix = doc_vectors, query_vectors
+        if kind == "flat_ip":
+            vectors, queries_matrix = _normalise(doc_vectors), _normalise(query_vectors)
+        index = build_faiss(kind, np.ascontiguousarray(vectors, dtype="float32"))
+        memory += faiss.serialize_index(index).nbytes
+    build_seconds = time.perf_counter() - start
+
+    def dense(number: int, k: int) -> list[int]:
+        _, ids = index.search(queries_matrix[number:number + 1], k)
+        return [int(i) for i in ids[0] if i >= 0]
+
+    if retriever == "bm25":
+        search = lambda n: bm25.search(queries[n].question, depth)  # noqa: E731
+    elif retriever == "hybrid":
+        search = lambda n: rrf([dense(n, depth * 2), bm25.search(queries[n].question, depth * 2)], depth)  # noqa: E731
+    else:
+        search = lambda n: dense(n, depth)  # noqa: E731
+
+    return {
+        **evaluate(search, queries, ks),
+        "index_kib": round(memory / 1024, 1),
+        "build_ms": round(build_seconds * 1000, 1),
+    }
+
+
+def _parse_chunking(value: str) -> tuple[int, int]:
+    size, _, overlap = value.partition(":")
+    return int(size), int(overlap or 0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", choices=("hashed", "cached", "live"), default="hashed")
+    parser.add_argument("--chunking", nargs="+", type=_parse_chunking, default=["500:100", "1000:200", "1500:300"],
+                        help="chunk_size:chunk_overlap pairs")
+    parser.add_argument("--dims", nargs="+", type=int, default=[0, 768, 256], help="0 keeps the full dimension")
+    parser.add_argument("--retrievers", nargs="+", choices=RETRIEVERS, default=list(RETRIEVERS))
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 3, 10], help="recall cut-offs")
+    parser.add_argument("--labels", type=Path, default=FIXTURES_DIR / "retrieval_labels.json")
+    parser.add_argument("--json", type=Path, help="also write all rows here")
+    args = parser.parse_args()
+
+    from app.rag.ingest import load_chunks
+
+    chunkings = [c if isinstance(c, tuple) else _parse_chunking(c) for c in args.chunking]
+    labels = json.loads(args.labels.read_text(encoding="utf-8"))
+    embed = make_embedder(args.embeddings)
+    rows = []
+
+    for chunk_size, overlap in chunkings:
+        texts = [chunk.page_content for chunk in load_chunks(chunk_size=chunk_size, chunk_overlap=overlap)]
+        queries = label_chunks(texts, labels)
+        if not queries:
+            print(f"chunking {chunk_size}:{overlap}: no labelled phrase survives chunking, skipped")
+            continue
+        doc_vectors = embed(texts, False)
+        query_vectors = embed([q.question for q in queries], True)
+        for dim in args.dims:
+            if args.embeddings == "hashed":
+                # Hash buckets carry no ordering, so truncation would just drop
+                # features; hash straight into the smaller space instead.
+                docs_d = hashed_embeddings(texts, dim or HASHED_DIM)
+                queries_d = hashed_embeddings([q.question for q in queries], dim or HASHED_DIM)
+            else:
+                docs_d = truncate_dims(doc_vectors, dim)
+                queries_d = truncate_dims(query_vectors, dim)
+            for retriever in args.retrievers:
+                if retriever == "bm25" and dim != args.dims[0]:
+                    continue  # lexical results do not depend on the dimension
+                result = run_config(texts, docs_d, queries_d, queries, retriever, args.k)
+                rows.append({
+                    "chunking": f"{chunk_size}:{overlap}",
+                    "chunks": len(texts),
+                    "labelled": len(queries),
+                    "dim": "-" if retriever == "bm25" else docs_d.shape[1],
+                    "retriever": retriever,
+                    **result,
+                })
+
+    metric_keys = [f"recall@{k}" for k in args.k] + ["mrr", "p50_us", "p95_us", "index_kib", "build_ms"]
+    header = f"{'chunking':<10} {'chunks':>6} {'q':>3} {'dim':>5} {'retriever':<9} " + " ".join(
+        f"{key:>9}" for key in metric_keys
+    )
+    print(f"embeddings: {args.embeddings}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['chunking']:<10} {row['chunks']:>6} {row['labelled']:>3} {row['dim']!s:>5} {row['retriever']:<9} "
+            + " ".join(f"{row[key]!s:>9}" for key in metric_keys)
+        )
+    if args.json:
+        args.json.write_text(json.dumps({"embeddings": args.embeddings, "rows": rows}, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Cold-start profile and startup budget check.
+
+Two parts:
+  * import profile: `python -X importtime -c "import app.main"` in a fresh
+    interpreter, reported per app module (self and cumulative time) and per
+    third-party top-level package (summed self time), so a new eager import
+    on the startup path shows up by name;
+  * cold start: the app is started in a subprocess against the local fake
+    upstreams and timed from spawn to the first 200 from /healthz, to the
+    first instant-intent answer (a greeting on /v1/message/stream) and to
+    the end of the background warmup (startup_warmup_seconds in /metrics).
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --top 30
+    python -m benchmarks.startup --update-baseline
+
+The medians are checked against the budgets in
+benchmarks/baselines/startup.json; any figure over its budget is reported
+and the exit code is 1. --update-baseline records the measured values next
+to the budgets (the budgets themselves are edited by hand).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.fake_upstreams import BackgroundServer, FakeUpstreamConfig, create_app, upstream_env
+from benchmarks.load_test import REPO_ROOT, STARTUP_TIMEOUT_SECONDS, _free_port, start_app
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "startup.json"
+IMPORT_TARGET = "app.main"
+INTENT_MESSAGE = "hi"
+POLL_INTERVAL_SECONDS = 0.005
+
+
+def profile_imports(module: str = IMPORT_TARGET) -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every import made by `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not self_us.isdigit():
+            continue  # header line
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize_imports(rows: list[tuple[str, int, int]], module: str = IMPORT_TARGET) -> dict:
+    app_modules = {name: (self_us, cumulative_us) for name, self_us, cumulative_us in rows if name.startswith("app.")}
+    packages: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        if not name.startswith("app.") and name != "app":
+            packages[name.split(".")[0]] += self_us
+    total_us = app_modules.get(module, (0, sum(self_us for _, self_us, _ in rows)))[1]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "app_modules": {
+            name: {"self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)}
+            for name, (s, c) in sorted(app_modules.items(), key=lambda item: -item[1][1])
+        },
+        "packages_ms": {
+            name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=lambda item: -item[1])
+        },
+    }
+
+
+def _warmup_seconds(client: httpx.Client, app_url: str) -> Optional[float]:
+    for line in client.get(f"{app_url}/metrics").text.splitlines():
+        if line.startswith("startup_warmup_seconds_sum"):
+            return float(line.split()[-1])
+    return None
+
+
+def measure_cold_start(upstreams_url: str) -> dict[str, Optional[float]]:
+    """Milliseconds from spawning the app to /healthz, first intent answer and warmup end."""
+    port = _free_port()
+    app_url = f"http://127.0.0.1:{port}"
+    spawned = time.perf_counter()
+    process = start_app(upstream_env(upstreams_url), port)
+    try:
+        with httpx.Client(timeout=STARTUP_TIMEOUT_SECONDS) as client:
+            deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"app exited during startup with code {process.returncode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError("app did not become healthy in time")
+                try:
+                    if client.get(f"{app_url}/healthz", timeout=1.0).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    time.sleep(POLL_INTERVAL_SECONDS)
+            healthz = time.perf_counter() - spawned
+
+            response = client.post(f"{app_url}/v1/message/stream", json={"message": INTENT_MESSAGE})
+            response.raise_for_status()
+            if '"final"' not in response.text:
+                raise RuntimeError("intent answer stream did not complete")
+            intent = time.perf_counter() - spawned
+
+            # The warmup runs in the background; wait for it to report.
+            warmup = None
+            while warmup is None and time.monotonic() < deadline:
+                warmup = _warmup_seconds(client, app_url)
+                if warmup is None:
+                    time.sleep(0.05)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        "healthz_ms": round(healthz * 1000, 1),
+        "first_intent_answer_ms": round(intent * 1000, 1),
+        "warmup_ms": round(warmup * 1000, 1) if warmup is not None else None,
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    import_runs = [summarize_imports(profile_imports()) for _ in range(args.runs)]
+    upstreams = BackgroundServer(create_app(FakeUpstreamConfig())).start()
+    try:
+        starts = [measure_cold_start(upstreams.base_url) for _ in range(args.runs)]
+    finally:
+        upstreams.stop()
+
+    def median(values: list[Optional[float]]) -> Optional[float]:
+        present = [value for value in values if value is not None]
+        return round(statistics.median(present), 1) if present else None
+
+    profile = min(import_runs, key=lambda item: item["total_ms"])
+    return {
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "measured_ms": {
+            "import_ms": median([item["total_ms"] for item in import_runs]),
+            **{key: median([start[key] for start in starts]) for key in starts[0]},
+        },
+        "profile": profile,
+    }
+
+
+def print_report(report: dict, baseline: Optional[dict], top: int) -> None:
+    profile = report["profile"]
+    print(f"import {IMPORT_TARGET}: {profile['total_ms']} ms (fastest of {report['runs']})\n")
+    print(f"{'app module':<36} {'self ms':>9} {'cum ms':>9}")
+    for name, row in list(profile["app_modules"].items())[:top]:
+        print(f"{name:<36} {row['self_ms']:>9} {row['cumulative_ms']:>9}")
+    print(f"\n{'package (self time)':<36} {'ms':>9}")
+    for name, value in list(profile["packages_ms"].items())[:top]:
+        print(f"{name:<36} {value:>9}")
+
+    budgets = (baseline or {}).get("budget_ms", {})
+    print(f"\n{'startup (median)':<36} {'ms':>9} {'budget':>9}")
+    for name, value in report["measured_ms"].items():
+        print(f"{name:<36} {value!s:>9} {budgets.get(name, '-')!s:>9}")
+
+
+def over_budget(report: dict, baseline: dict) -> list[str]:
+    failures = []
+    for name, budget in baseline.get("budget_ms", {}).items():
+        value = report["measured_ms"].get(name)
+        if value is not None and value > budget:
+            failures.append(f"{name}: {value} ms > budget {budget} ms")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="import profiles and cold starts to take the median of")
+    parser.add_argument("--top", type=int, default=15, help="rows per profile table")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--no-baseline", action="store_true", help="skip the budget check")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    args = parser.parse_args()
+
+    report = run(args)
+    baseline = None
+    if not args.no_baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    print_report(report, baseline, args.top)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        updated = {
+            "python": report["python"],
+            "budget_ms": (baseline or {}).get("budget_ms", {}),
+            "measured_ms": report["measured_ms"],
+        }
+        args.baseline.write_text(json.dumps(updated, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if baseline is not None:
+        failures = over_budget(report, baseline)
+        for line in failures:
+            print(f"OVER BUDGET {line}")
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
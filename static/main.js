@@ -3,6 +3,10 @@ let chatConfig = {};
 let contactInfo = {};
 let formSchema = {};
 const developerContext = (window.RMW_DEV_CONTEXT || "").trim();
+// One conversation per page load; lets the server reuse context across turns.
+const sessionId = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
 const leadApiBase = '/v1/submit-lead';
 const SpeechRecognitionApi = window.SpeechRecognition || window.webkitSpeechRecognition;
 let speechRecognition = null;
@@ -233,7 +237,7 @@ async function sendMessage() {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ 
                 message: message,
-                session_id: null,
+                session_id: sessionId,
                 developer_context: developerContext,
             }),
             signal: controller.signal
@@ -0,0 +1,55 @@
+import threading
+import time
+import unittest
+
+from app.utils.batching import MicroBatcher
+from app.utils.cancellation import RequestCancelledError, begin_cancellation_scope, raise_if_cancelled
+
+
+class MicroBatcherContextTest(unittest.TestCase):
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        release = threading.Event()
+        batches: list[list[str]] = []
+
+        def run_batch(items: list[str]) -> list[str]:
+            if "block" in items:
+                release.wait(5)
+            # What embed_queries does first: fails if the batch runs under the
+            # leader's (cancelled) token.
+            raise_if_cancelled("embed")
+            batches.append(items)
+            return [item.upper() for item in items]
+
+        batcher = MicroBatcher("test", run_batch, max_batch_size=2, max_wait_seconds=5.0)
+        results: dict[str, object] = {}
+
+        def submit(item: str, cancel: bool = False) -> None:
+            token = begin_cancellation_scope()
+            if cancel:
+                token.cancel("disconnect")
+            try:
+                results[item] = batcher.submit(item)
+            except Exception as exc:
+                results[item] = exc
+
+        # Keep one batch running so the next leader waits for its batch to fill.
+        blocker = threading.Thread(target=submit, args=("block",))
+        blocker.start()
+        time.sleep(0.1)
+        leader = threading.Thread(target=submit, args=("leader", True))
+        leader.start()
+        time.sleep(0.1)
+        follower = threading.Thread(target=submit, args=("follower",))
+        follower.start()
+        follower.join(5)
+        leader.join(5)
+        release.set()
+        blocker.join(5)
+
+        self.assertIn(["leader", "follower"], batches)
+        self.assertEqual(results["follower"], "FOLLOWER")
+        self.assertNotIsInstance(results["leader"], RequestCancelledError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import time
+import unittest
+
+from app.utils.llm_gate import AIMDLimiter, CircuitBreaker, GeminiGate
+
+
+class AIMDLimiterLatencyTest(unittest.TestCase):
+    def test_baseline_is_kept_per_latency_key(self):
+        limiter = AIMDLimiter(initial_limit=8)
+        for _ in range(10):
+            limiter.record("success", 0.5, "answer:ttft")
+        limit = limiter._limit
+
+        # A slow extraction prompt is not compared with fast answer streams.
+        limiter.record("success", 5.0, "extract:invoke")
+        self.assertGreater(limiter._limit, limit)
+
+        limiter.record("success", 5.0, "answer:ttft")
+        self.assertLess(limiter._limit, limit)
+
+    def test_stream_reports_time_to_first_token(self):
+        recorded: list[tuple] = []
+        limiter = AIMDLimiter()
+        limiter.record = lambda *args: recorded.append(args)
+        gate = GeminiGate("test", limiter, CircuitBreaker())
+
+        with gate.slot(latency_key="answer:ttft") as slot:
+            slot.first_token()
+            time.sleep(0.2)
+
+        outcome, latency, key = recorded[0]
+        self.assertEqual((outcome, key), ("success", "answer:ttft"))
+        self.assertLess(latency, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()